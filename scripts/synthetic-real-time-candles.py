@@ -93,7 +93,7 @@ def setup_fake_market_data_feeds() -> Tuple[MockChainAndReorganisationMonitor, D
     )
 
     candle_feeds = {
-        label: CandleFeed(pairs, timeframe=timeframe) for label, timeframe in CANDLE_OPTIONS.items()
+        label: CandleFeed(pairs, timeframe=timeframe, trade_feed=trade_feed) for label, timeframe in CANDLE_OPTIONS.items()
     }
     return mock_chain, candle_feeds, trade_feed
 
@@ -165,7 +165,7 @@ def setup_uniswap_v2_market_data_feeds(
 
     pair_addresses = [p.checksum_free_address for p in pairs]
     candle_feeds = {
-        label: CandleFeed(pair_addresses, timeframe=timeframe) for label, timeframe in candle_choices.items()
+        label: CandleFeed(pair_addresses, timeframe=timeframe, trade_feed=trade_feed) for label, timeframe in candle_choices.items()
     }
 
     chain_id = ChainId(web3.eth.chain_id)
@@ -2,7 +2,8 @@ import pandas as pd
 
 from eth_defi.price_oracle.oracle import TrustedStablecoinOracle, FixedPriceOracle
 
-from tradingstrategy.direct_feed.candle_feed import CandleFeed
+from tradingstrategy.direct_feed.candle_feed import CandleFeed, MultiTimeframeCandleFeed, prepare_raw_candle_data
+from tradingstrategy.direct_feed.ohlcv_aggregate import resample_trades_into_ohlcv
 from eth_defi.event_reader.reorganisation_monitor import MockChainAndReorganisationMonitor
 from tradingstrategy.direct_feed.synthetic_feed import SyntheticTradeFeed
 from tradingstrategy.direct_feed.timeframe import Timeframe
@@ -260,3 +261,162 @@ def test_candle_feed_two_pairs():
     assert candle_feed.get_last_block_number() == 201
     flat = candle_feed.candle_df.reset_index(drop=True)
     assert len(flat) == 82
+
+
+def test_candle_feed_streaming_matches_resample():
+    """Incrementally folded candles are the same as resampling all trades at once."""
+
+    mock_chain = MockChainAndReorganisationMonitor(block_duration_seconds=12, check_depth=100)
+    mock_chain.produce_blocks(100)
+    timeframe = Timeframe("1min")
+
+    pairs = ["ETH-USD", "AAVE-ETH"]
+
+    feed = SyntheticTradeFeed(
+        pairs,
+        {
+            "ETH-USD": TrustedStablecoinOracle(),
+            "AAVE-ETH": FixedPriceOracle(1600),
+        },
+        mock_chain,
+        timeframe=timeframe,
+        min_amount=-50,
+        max_amount=50,
+    )
+
+    candle_feed = CandleFeed(
+        pairs,
+        timeframe=timeframe,
+    )
+
+    delta = feed.backfill_buffer(100, None)
+    candle_feed.apply_delta(delta)
+
+    for i in range(10):
+        mock_chain.produce_blocks(3)
+        delta = feed.perform_duty_cycle()
+        candle_feed.apply_delta(delta)
+
+    mock_chain.produce_fork(120, fork_marker="0x8888")
+    delta = feed.perform_duty_cycle()
+    assert delta.reorg_detected
+    candle_feed.apply_delta(delta)
+
+    mock_chain.produce_blocks(5)
+    delta = feed.perform_duty_cycle()
+    candle_feed.apply_delta(delta)
+
+    expected = resample_trades_into_ohlcv(feed.trades_df, timeframe).sort_index()
+    candles = candle_feed.candle_df
+    assert len(candles) == len(expected)
+    # Resample keeps Decimal means in object columns, streaming uses floats
+    pd.testing.assert_frame_equal(candles, expected, check_exact=True, check_dtype=False)
+    assert len(candle_feed.closed_candle_df) == len(candles) - len(pairs)
+
+
+def test_multi_timeframe_candle_feed():
+    """All timeframes are rolled up from the same base candles."""
+
+    mock_chain = MockChainAndReorganisationMonitor(block_duration_seconds=12, check_depth=100)
+    mock_chain.produce_blocks(200)
+
+    pairs = ["ETH-USD", "AAVE-ETH"]
+    timeframes = [Timeframe("1h"), Timeframe("1min"), Timeframe("5min")]
+
+    feed = SyntheticTradeFeed(
+        pairs,
+        {
+            "ETH-USD": TrustedStablecoinOracle(),
+            "AAVE-ETH": FixedPriceOracle(1600),
+        },
+        mock_chain,
+        timeframe=Timeframe("1min"),
+        min_amount=-50,
+        max_amount=50,
+    )
+
+    candle_feed = MultiTimeframeCandleFeed(pairs, timeframes)
+    assert candle_feed.base_timeframe == Timeframe("1min")
+
+    delta = feed.backfill_buffer(200, None)
+    candle_feed.apply_delta(delta)
+
+    for i in range(20):
+        mock_chain.produce_blocks(13)
+        delta = feed.perform_duty_cycle()
+        candle_feed.apply_delta(delta)
+
+    mock_chain.produce_fork(430, fork_marker="0x8888")
+    delta = feed.perform_duty_cycle()
+    assert delta.reorg_detected
+    candle_feed.apply_delta(delta)
+
+    mock_chain.produce_blocks(7)
+    delta = feed.perform_duty_cycle()
+    candle_feed.apply_delta(delta)
+
+    assert candle_feed.get_last_block_number() == 467
+
+    for timeframe in timeframes:
+        expected = resample_trades_into_ohlcv(feed.trades_df, timeframe).sort_index()
+        candles = candle_feed.get_candle_df(timeframe)
+        # Decimal sums are rounded in a different order when rolled up
+        pd.testing.assert_frame_equal(prepare_raw_candle_data(candles), prepare_raw_candle_data(expected), check_dtype=False)
+
+    # 467 blocks * 12 seconds spans two hourly candles
+    assert len(candle_feed.get_candles_by_pair("ETH-USD", Timeframe("1h"))) == 2
+
+
+def test_coarse_candles_reorg_over_fine_trade_feed():
+    """A reorg rebuilds candles coarser than the trade feed timeframe from the trade feed buffer."""
+
+    mock_chain = MockChainAndReorganisationMonitor(block_duration_seconds=12, check_depth=100)
+    mock_chain.produce_blocks(100)
+
+    pairs = ["ETH-USD", "AAVE-ETH"]
+
+    feed = SyntheticTradeFeed(
+        pairs,
+        {
+            "ETH-USD": TrustedStablecoinOracle(),
+            "AAVE-ETH": FixedPriceOracle(1600),
+        },
+        mock_chain,
+        timeframe=Timeframe("1min"),
+        min_amount=-50,
+        max_amount=50,
+    )
+
+    candle_feed = CandleFeed(pairs, timeframe=Timeframe("5min"), trade_feed=feed)
+    multi_feed = MultiTimeframeCandleFeed(pairs, [Timeframe("5min"), Timeframe("15min")], trade_feed=feed)
+
+    delta = feed.backfill_buffer(100, None)
+    candle_feed.apply_delta(delta)
+    multi_feed.apply_delta(delta)
+
+    for i in range(10):
+        mock_chain.produce_blocks(3)
+        delta = feed.perform_duty_cycle()
+        candle_feed.apply_delta(delta)
+        multi_feed.apply_delta(delta)
+
+    # Fork in the middle of a 5 minute candle
+    mock_chain.produce_fork(123, fork_marker="0x8888")
+    delta = feed.perform_duty_cycle()
+    assert delta.reorg_detected
+    assert delta.start_ts > Timeframe("5min").round_timestamp_down(delta.start_ts)
+    candle_feed.apply_delta(delta)
+    multi_feed.apply_delta(delta)
+
+    mock_chain.produce_blocks(5)
+    delta = feed.perform_duty_cycle()
+    candle_feed.apply_delta(delta)
+    multi_feed.apply_delta(delta)
+
+    expected = resample_trades_into_ohlcv(feed.trades_df, Timeframe("5min")).sort_index()
+    pd.testing.assert_frame_equal(candle_feed.candle_df, expected, check_exact=True, check_dtype=False)
+
+    for timeframe in (Timeframe("5min"), Timeframe("15min")):
+        expected = resample_trades_into_ohlcv(feed.trades_df, timeframe).sort_index()
+        candles = multi_feed.get_candle_df(timeframe)
+        pd.testing.assert_frame_equal(prepare_raw_candle_data(candles), prepare_raw_candle_data(expected), check_dtype=False)
@@ -8,6 +8,7 @@ from eth_defi.price_oracle.oracle import TrustedStablecoinOracle
 from eth_defi.event_reader.reorganisation_monitor import MockChainAndReorganisationMonitor
 
 from tradingstrategy.direct_feed.synthetic_feed import SyntheticTradeFeed
+from tradingstrategy.direct_feed.trade_buffer import TradeBuffer
 from tradingstrategy.direct_feed.trade_feed import Trade
 
 
@@ -112,6 +113,73 @@ def test_truncate():
     assert len(feed.trades_df) == 246
 
 
+def test_data_retention_time():
+    """Old trades are evicted from the buffer."""
+
+    mock_chain = MockChainAndReorganisationMonitor()
+
+    feed = SyntheticTradeFeed(
+        ["ETH-USD"],
+        {"ETH-USD": TrustedStablecoinOracle()},
+        mock_chain,
+        data_retention_time=pd.Timedelta(seconds=30),
+    )
+
+    mock_chain.produce_blocks(100)
+    feed.backfill_buffer(100, None)
+
+    for i in range(5):
+        mock_chain.produce_blocks(20)
+        feed.perform_duty_cycle()
+
+    df = feed.trades_df
+    assert 0 < len(df) < 400
+    assert df["timestamp"].iloc[0] >= df["timestamp"].iloc[-1] - pd.Timedelta(seconds=30)
+    assert df.index.is_monotonic_increasing
+    assert feed.get_trade_count() == len(df)
+
+
+def test_trade_buffer_views_survive_writes():
+    """DataFrame views handed out are not changed by later appends, truncations and reallocations."""
+
+    buffer = TradeBuffer(capacity=4)
+
+    def _make_columns(blocks: list) -> dict:
+        return {
+            "pair": ["ETH-USD"] * len(blocks),
+            "block_number": blocks,
+            "block_hash": [f"0x{b}" for b in blocks],
+            "timestamp": [pd.Timestamp("2020-01-01") + pd.Timedelta(minutes=b) for b in blocks],
+            "tx_hash": [f"0x{b}" for b in blocks],
+            "log_index": [1] * len(blocks),
+            "price": [Decimal(b) for b in blocks],
+            "amount": [Decimal(1)] * len(blocks),
+            "exchange_rate": [Decimal(1)] * len(blocks),
+        }
+
+    buffer.append(_make_columns([1, 2, 3]))
+    first = buffer.get_dataframe()
+    assert buffer.get_dataframe() is first
+
+    # Truncate and write over the rows the first view sees
+    assert buffer.truncate(after=1) == 2
+    buffer.append(_make_columns([4, 5]))
+
+    # Grow the buffer
+    buffer.append(_make_columns(list(range(6, 20))))
+    assert buffer.get_capacity() >= 30
+
+    assert first.index.tolist() == [1, 2, 3]
+    assert first["price"].tolist() == [Decimal(1), Decimal(2), Decimal(3)]
+
+    second = buffer.get_dataframe()
+    assert second.index.tolist() == [1, 4, 5] + list(range(6, 20))
+
+    assert buffer.evict_before(pd.Timestamp("2020-01-01 00:10")) == 7
+    assert buffer.get_dataframe()["block_number"].iloc[0] == 10
+    assert len(buffer) == 10
+
+
 def test_initial_load_no_progress_bar():
     """Read trades from a synthetic feed, do not use progress br."""
 
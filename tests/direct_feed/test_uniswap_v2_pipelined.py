@@ -0,0 +1,161 @@
+"""Pipelined Uniswap v2 trade reading against a mocked log source."""
+import random
+from types import SimpleNamespace
+from typing import Iterable, List
+
+import pandas as pd
+import pytest
+from web3 import Web3
+
+from eth_defi.event_reader.conversion import convert_uin256_to_bytes
+from eth_defi.event_reader.logresult import LogResult
+from eth_defi.event_reader.reorganisation_monitor import MockChainAndReorganisationMonitor
+from eth_defi.price_oracle.oracle import TrustedStablecoinOracle
+from eth_defi.token import TokenDetails
+from eth_defi.uniswap_v2.pair import PairDetails
+
+from tradingstrategy.direct_feed.pipeline import run_pipeline
+from tradingstrategy.direct_feed.timeframe import Timeframe
+from tradingstrategy.direct_feed.uniswap_v2 import UniswapV2TradeFeed
+
+
+PAIR_ADDRESSES = [
+    "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc",
+    "0x0d4a11d5EEaaC28EC3F61d100daF4d40471f1852",
+]
+
+
+class MockedLogTradeFeed(UniswapV2TradeFeed):
+    """Read Swap and Sync logs from a list instead of JSON-RPC."""
+
+    def __init__(self, logs: List[LogResult], **kwargs):
+        self.logs = logs
+        super().__init__(**kwargs)
+
+    def create_log_reader(self, start_block: int, end_block: int) -> Iterable[LogResult]:
+        for log in self.logs:
+            if start_block <= int(log["blockNumber"], 16) <= end_block:
+                yield log
+
+
+def _make_log(event_name: str, address: str, block_number: int, tx_hash: str, log_index: int, values: list) -> LogResult:
+    return {
+        "address": address.lower(),
+        "blockHash": hex(block_number),
+        "blockNumber": hex(block_number),
+        "data": "0x" + b"".join(convert_uin256_to_bytes(v) for v in values).hex(),
+        "logIndex": hex(log_index),
+        "transactionHash": tx_hash,
+        "timestamp": None,
+        "chunk_id": 0,
+        "event": SimpleNamespace(event_name=event_name),
+    }
+
+
+def _make_logs(block_count: int) -> List[LogResult]:
+    """Generate Sync + Swap log pairs, like a swap in a real Uniswap v2 pool."""
+    rng = random.Random(1)
+    logs = []
+    for block_number in range(1, block_count + 1):
+        log_index = 0
+        for tx_idx in range(rng.randint(0, 4)):
+            address = rng.choice(PAIR_ADDRESSES)
+            tx_hash = f"0x{block_number:08x}{tx_idx:04x}"
+            reserve0 = rng.randint(10**20, 10**21)
+            reserve1 = rng.randint(10**20, 10**21)
+            amount = rng.randint(10**16, 10**18)
+            if rng.random() < 0.5:
+                swap = [amount, 0, 0, amount * 2]
+            else:
+                swap = [0, amount * 2, amount, 0]
+            logs.append(_make_log("Sync", address, block_number, tx_hash, log_index, [reserve0, reserve1]))
+            logs.append(_make_log("Swap", address, block_number, tx_hash, log_index + 1, swap))
+            log_index += 2
+    return logs
+
+
+def _create_feed(logs: List[LogResult], pipelined: bool) -> MockedLogTradeFeed:
+    web3 = Web3()
+
+    def _make_token(symbol: str, address: str) -> TokenDetails:
+        return TokenDetails(contract=web3.eth.contract(address=Web3.to_checksum_address(address), abi=[]), symbol=symbol, decimals=18)
+
+    pairs = [
+        PairDetails(
+            contract=web3.eth.contract(address=Web3.to_checksum_address(address), abi=[]),
+            token0=_make_token(f"BASE{idx}", f"0x{idx + 1:040x}"),
+            token1=_make_token("USDC", f"0x{100:040x}"),
+            reverse_token_order=False,
+        )
+        for idx, address in enumerate(PAIR_ADDRESSES)
+    ]
+
+    mock_chain = MockChainAndReorganisationMonitor(block_duration_seconds=12)
+    mock_chain.produce_blocks(200)
+
+    return MockedLogTradeFeed(
+        logs,
+        pairs=pairs,
+        web3_factory=lambda context: web3,
+        oracles={p.checksum_free_address: TrustedStablecoinOracle() for p in pairs},
+        reorg_mon=mock_chain,
+        timeframe=Timeframe("1min"),
+        threads=1,
+        pipelined=pipelined,
+        pipeline_batch_size=16,
+        pipeline_queue_size=2,
+    )
+
+
+def test_uniswap_v2_pipelined_same_as_sequential():
+    """Pipelined backfill produces the same trade buffer as the sequential read."""
+    logs = _make_logs(199)
+
+    sequential = _create_feed(logs, pipelined=False)
+    sequential.backfill_buffer(199, None)
+
+    pipelined = _create_feed(logs, pipelined=True)
+    delta = pipelined.backfill_buffer(199, None)
+
+    assert len(delta.new_trades) > 300
+    pd.testing.assert_frame_equal(pipelined.trades_df, sequential.trades_df)
+
+
+def test_run_pipeline_order_and_state():
+    """Stages see batches in order and can keep state."""
+    total = 0
+
+    def _running_sum(batch: list) -> list:
+        nonlocal total
+        out = []
+        for x in batch:
+            total += x
+            out.append(total)
+        return out
+
+    result = list(run_pipeline(range(1000), [lambda batch: [x * 2 for x in batch], _running_sum], batch_size=7, queue_size=1))
+    assert len(result) == 1000
+    assert result[-1] == sum(x * 2 for x in range(1000))
+    assert result == sorted(result)
+
+
+def test_run_pipeline_error():
+    """Source and stage errors are raised in the consumer."""
+
+    def _broken_source():
+        yield from range(10)
+        raise RuntimeError("RPC failed")
+
+    with pytest.raises(RuntimeError, match="RPC failed"):
+        list(run_pipeline(_broken_source(), [lambda batch: batch], batch_size=3))
+
+    def _broken_stage(batch: list) -> list:
+        raise ValueError("Cannot decode")
+
+    with pytest.raises(ValueError, match="Cannot decode"):
+        list(run_pipeline(range(10), [_broken_stage], batch_size=3))
+
+    # Consumer stops early and the threads are shut down
+    items = run_pipeline(range(10_000), [lambda batch: batch], batch_size=10, queue_size=1)
+    assert next(items) == 0
+    items.close()
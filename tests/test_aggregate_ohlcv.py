@@ -1,13 +1,15 @@
 """Test creating aggregates of volume data across multiple pairs."""
 import datetime
 
+import numpy as np
 import pandas as pd
 import pytest
 
 import flaky
 
 from tradingstrategy.chain import ChainId
-from tradingstrategy.pair import PandasPairUniverse
+from tradingstrategy.exchange import ExchangeType
+from tradingstrategy.pair import PandasPairUniverse, DEXPair
 from tradingstrategy.timebucket import TimeBucket
 from tradingstrategy.utils.aggregate_ohlcv import calculate_volume_weighted_ohlcv, aggregate_ohlcv_across_pairs
 from tradingstrategy.utils.forward_fill import forward_fill, xxx_forward_fill
@@ -107,3 +109,58 @@ def test_aggregate_ohlcv_across_pairs(persistent_test_client):
     # 2024-03-03  3111.652078  3611.985609  3040.088687  3490.146173  2.901353e+09  2.764194e+08  1-WETH-USDC-0xc02aaa39b223fe8d0a0e5c4f27ead908...  WETH  USDC  [2697600, 2697585, 2697765]
 
     assert len(aggregated_df) == 9
+
+
+def test_aggregate_ohlcv_across_pairs_vectorised():
+    """Single pass aggregation gives the same output as aggregating asset by asset."""
+
+    def _make_pair(pair_id: int, base: str, base_address: str, quote: str, quote_address: str) -> DEXPair:
+        return DEXPair(
+            pair_id=pair_id,
+            chain_id=ChainId.ethereum,
+            exchange_id=1,
+            exchange_slug="uniswap-v3",
+            address=f"0x{pair_id:040x}",
+            dex_type=ExchangeType.uniswap_v3,
+            base_token_symbol=base,
+            quote_token_symbol=quote,
+            token0_symbol=base,
+            token1_symbol=quote,
+            token0_address=base_address,
+            token1_address=quote_address,
+            token0_decimals=18,
+            token1_decimals=6,
+        )
+
+    weth = "0x0000000000000000000000000000000000000001"
+    pepe = "0x0000000000000000000000000000000000000002"
+    usdc = "0x0000000000000000000000000000000000000003"
+    pairs = [
+        _make_pair(10, "WETH", weth, "USDC", usdc),
+        _make_pair(7, "PEPE", pepe, "WETH", weth),
+        _make_pair(11, "WETH", weth, "USDC", usdc),
+        _make_pair(3, "PEPE", pepe, "USDC", usdc),
+    ]
+    pair_universe = PandasPairUniverse(DEXPair.convert_to_pyarrow_table(pairs).to_pandas())
+
+    rng = np.random.default_rng(1)
+    rows = []
+    for pair_id in (3, 7, 10, 11, 99):
+        for timestamp in pd.date_range("2024-01-01", periods=20, freq="D")[pair_id % 4:]:
+            price = rng.uniform(1, 100)
+            # Some zero volume days
+            volume = 0.0 if rng.uniform() < 0.2 else rng.uniform(0, 1000)
+            rows.append((pair_id, timestamp, price, price * 1.1, price * 0.9, price, volume, rng.uniform(0, 1e6)))
+
+    df = pd.DataFrame(rows, columns=["pair_id", "timestamp", "open", "high", "low", "close", "volume", "liquidity"])
+    candles_df = df.set_index("timestamp").groupby("pair_id")
+    candles_df = forward_fill(candles_df, "D")
+    liquidity_df = df.drop(columns=["liquidity"]).set_index("timestamp").groupby("pair_id")
+    liquidity_df = forward_fill(liquidity_df, "D", columns=("close",))
+
+    for liquidity in (liquidity_df["close"], None):
+        expected = aggregate_ohlcv_across_pairs(pair_universe, candles_df, liquidity, vectorised=False)
+        aggregated_df = aggregate_ohlcv_across_pairs(pair_universe, candles_df, liquidity)
+        pd.testing.assert_frame_equal(aggregated_df, expected, check_exact=True)
+
+    assert aggregated_df["base"].unique().tolist() == ["WETH", "PEPE"]
@@ -1,11 +1,13 @@
 """Synthetic candle data tests."""
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from tradingstrategy.candle import Candle, GroupedCandleUniverse, CandleSampleUnavailable
 from tradingstrategy.timebucket import TimeBucket
-from tradingstrategy.utils.forward_fill import forward_fill
+from tradingstrategy.utils.forward_fill import forward_fill, resample_candles_multiple_pairs
+from tradingstrategy.utils.wrangle import heal_anomalies, heal_anomalies_multipair
 
 
 @pytest.fixture()
@@ -319,3 +321,254 @@ def test_forward_fill_until_multi_pair_completed_partially():
     assert last_entry.close == pytest.approx(101.80)
     assert last_entry.volume == 0
     assert last_entry.timestamp == pd.Timestamp("2020-02-01")
+
+
+def test_offset_index_candle_universe():
+    """Per-pair lookups over pair-sorted data with an offset index give the same results as groupby."""
+
+    data = [
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-01"), 2.5),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-01"), 100.10),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-03"), 2.2),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-02"), 100.50),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-03"), 101.10),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-05"), 2.1),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-09"), 101.80),
+    ]
+
+    df = pd.DataFrame(data, columns=Candle.DATAFRAME_FIELDS)
+
+    grouped = GroupedCandleUniverse(df)
+    indexed = GroupedCandleUniverse(df, offset_index=True)
+
+    assert indexed.get_pair_count() == 2
+    assert list(indexed.get_pair_ids()) == [1, 2]
+    assert indexed.get_timestamp_range() == grouped.get_timestamp_range()
+
+    for pair_id in (1, 2):
+        candles = indexed.get_candles_by_pair(pair_id)
+        pd.testing.assert_frame_equal(candles, grouped.get_candles_by_pair(pair_id))
+        # Slices are views over the shared universe data, not copies
+        assert np.shares_memory(candles["close"].to_numpy(), indexed.df["close"].to_numpy())
+
+    price, distance = indexed.get_price_with_tolerance(
+        pair=2,
+        when=pd.Timestamp("2020-01-04"),
+        tolerance=pd.Timedelta(7, "d"))
+    assert price == pytest.approx(2.2)
+    assert distance == pd.Timedelta("1d")
+
+    assert indexed.get_candles_by_pair(3) is None
+
+    # Offset index is rebuilt after forward fill
+    indexed.forward_fill()
+    assert len(indexed.get_candles_by_pair(1)) == 9
+    assert len(indexed.get_candles_by_pair(2)) == 5
+
+
+@pytest.mark.parametrize("offset_index", [False, True])
+def test_get_prices_with_tolerance_batch(offset_index: bool):
+    """Batch price lookup gives the same results as looking up pairs one by one."""
+
+    data = [
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-01"), 100.10),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-02"), 100.50),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-03"), 101.10),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-09"), 101.80),
+
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-01"), 2.5),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-03"), 2.2),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-05"), 2.1),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-18"), 3.8),
+    ]
+
+    df = pd.DataFrame(data, columns=Candle.DATAFRAME_FIELDS)
+    universe = GroupedCandleUniverse(df, offset_index=offset_index)
+    tolerance = pd.Timedelta(3, "d")
+
+    def check(ignore_forward_fill: bool):
+        pair_ids = []
+        timestamps = []
+        for pair_id in (1, 2, 3):
+            for ts in pd.date_range("2019-12-31", "2020-01-20", freq="6h"):
+                pair_ids.append(pair_id)
+                timestamps.append(ts)
+
+        prices, distances = universe.get_prices_with_tolerance(
+            pair_ids,
+            pd.DatetimeIndex(timestamps),
+            tolerance,
+            ignore_forward_fill=ignore_forward_fill,
+        )
+
+        for pair_id, ts, price, distance in zip(pair_ids, timestamps, prices, distances):
+            try:
+                expected_price, expected_distance = universe.get_price_with_tolerance(
+                    pair_id,
+                    ts,
+                    tolerance,
+                    ignore_forward_fill=ignore_forward_fill,
+                )
+            except CandleSampleUnavailable:
+                assert np.isnan(price), f"Pair {pair_id} at {ts} should not have a price, got {price}"
+                assert np.isnat(distance)
+                continue
+            assert price == pytest.approx(expected_price), f"Pair {pair_id} at {ts}"
+            assert pd.Timedelta(distance) == expected_distance, f"Pair {pair_id} at {ts}"
+
+    check(ignore_forward_fill=False)
+
+    # Single timestamp for all pairs
+    prices, distances = universe.get_prices_with_tolerance([2, 1], pd.Timestamp("2020-01-04"), tolerance)
+    assert prices.tolist() == pytest.approx([2.2, 101.10])
+    assert list(pd.to_timedelta(distances)) == [pd.Timedelta("1d"), pd.Timedelta("1d")]
+
+    with pytest.raises(CandleSampleUnavailable):
+        universe.get_prices_with_tolerance([1, 3], pd.Timestamp("2020-01-04"), tolerance, raise_on_unavailable=True)
+
+    universe.forward_fill()
+    check(ignore_forward_fill=False)
+    check(ignore_forward_fill=True)
+
+
+@pytest.mark.parametrize("offset_index", [False, True])
+def test_cross_section(offset_index: bool):
+    """Point-in-time lookups over all pairs."""
+
+    data = [
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-01"), 100.10),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-02"), 100.50),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-03"), 101.10),
+        Candle.generate_synthetic_sample(1, pd.Timestamp("2020-01-09"), 101.80),
+
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-01"), 2.5),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-03"), 2.2),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-05"), 2.1),
+        Candle.generate_synthetic_sample(2, pd.Timestamp("2020-01-18"), 3.8),
+    ]
+
+    df = pd.DataFrame(data, columns=Candle.DATAFRAME_FIELDS)
+    universe = GroupedCandleUniverse(df, offset_index=offset_index)
+
+    # Exact timestamp and range lookups match full scans
+    for ts in (pd.Timestamp("2020-01-03"), pd.Timestamp("2020-01-04")):
+        expected = universe.df.loc[universe.df["timestamp"] == ts]
+        pd.testing.assert_frame_equal(universe.get_all_samples_by_timestamp(ts), expected)
+
+    start, end = pd.Timestamp("2020-01-02"), pd.Timestamp("2020-01-09")
+    expected = universe.df.loc[(universe.df.index >= start) & (universe.df.index <= end)]
+    pd.testing.assert_frame_equal(universe.get_all_samples_by_range(start, end), expected)
+
+    # Exact lookups do not create the pair-sorted copy of the data
+    assert universe.sorted_lookup_cache is None
+
+    cross_section = universe.get_cross_section()
+
+    candles = cross_section.get_samples_as_of(pd.Timestamp("2020-01-05"))
+    assert candles["pair_id"].tolist() == [1, 2]
+    assert candles["close"].tolist() == pytest.approx([101.10, 2.1])
+
+    # Exclude the current candle
+    candles = cross_section.get_samples_as_of(pd.Timestamp("2020-01-05"), allow_current=False)
+    assert candles["close"].tolist() == pytest.approx([101.10, 2.2])
+
+    # Pair 1 last traded over a day ago
+    candles = cross_section.get_samples_as_of(pd.Timestamp("2020-01-05"), tolerance=pd.Timedelta(days=1))
+    assert candles["pair_id"].tolist() == [2]
+
+    # Nothing before the data starts
+    assert len(cross_section.get_samples_as_of(pd.Timestamp("2019-12-31"))) == 0
+
+    # As-of lookups use the offset index over the original data if there is one
+    assert (universe.sorted_lookup_cache is None) == offset_index
+
+    candles = cross_section.get_last_samples(pd.Timestamp("2020-01-09"), 2)
+    assert candles["pair_id"].tolist() == [1, 1, 2, 2]
+    assert candles["close"].tolist() == pytest.approx([100.50, 101.10, 2.2, 2.1])
+
+    pair_ids, closes = cross_section.get_last_values(pd.Timestamp("2020-01-02"), 3)
+    assert pair_ids.tolist() == [1, 2]
+    assert np.isnan(closes[0, 0])
+    assert np.isnan(closes[0, 1])
+    assert closes[0, 2] == pytest.approx(100.10)
+    assert np.isnan(closes[1, :2]).all()
+    assert closes[1, 2] == pytest.approx(2.5)
+
+
+def test_heal_anomalies_multipair():
+    """Vectorised multipair healing gives the same result as healing pair by pair."""
+    rng = np.random.default_rng(1)
+    timestamps = pd.date_range("2024-01-01", periods=100, freq="h")
+    dfs = []
+    for pair_id in range(1, 21):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(timestamps))))
+        # MEV spike and dip, one at the pair boundary
+        close[rng.integers(1, 99)] *= 1000
+        close[rng.integers(1, 99)] *= 0.005
+        close[-1 if pair_id % 2 else 0] *= 1000
+        if pair_id % 5 == 0:
+            close[50] = np.nan
+        dfs.append(pd.DataFrame({
+            "timestamp": timestamps,
+            "pair_id": pair_id,
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": rng.uniform(1, 10, len(timestamps)),
+        }, index=timestamps))
+    df = pd.concat(dfs)
+
+    healed = heal_anomalies_multipair(df)
+    assert healed["healed"].notna().sum() > 20
+
+    for pair_id, pair_df in df.groupby("pair_id"):
+        expected = heal_anomalies(pair_df.copy())
+        result = healed[healed["pair_id"] == pair_id]
+        if expected is None:
+            assert result["healed"].isna().all()
+            continue
+        for column in ("open", "high", "low", "close", "volume"):
+            assert result[column].equals(expected[column]), f"Pair {pair_id} column {column} differs"
+        assert (result["healed"] == True).tolist() == (expected["healed"] == True).tolist()
+
+
+def test_autoheal_large_universe():
+    """Candle universes with thousands of pairs are healed too."""
+    timestamps = pd.date_range("2024-01-01", periods=5, freq="d")
+    pair_count = 2_000
+    close = np.tile([1.0, 1.0, 1000.0, 1.0, 1.0], pair_count)
+    df = pd.DataFrame({
+        "timestamp": np.tile(timestamps.values, pair_count),
+        "pair_id": np.repeat(np.arange(pair_count), len(timestamps)),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1.0,
+    })
+
+    universe = GroupedCandleUniverse(df, time_bucket=TimeBucket.d1)
+    assert universe.get_pair_count() == pair_count
+    assert (universe.df["close"] == 1.0).all()
+
+
+
+@pytest.mark.parametrize("forward_fill_until", [None, pd.Timestamp("2020-02-01")])
+@pytest.mark.parametrize("frequency", ["1d", "4h", pd.Timedelta(hours=7)])
+def test_resample_candles_multiple_pairs_vectorised(forward_fill_until, frequency):
+    """Vectorised multipair resample gives the same result as resampling pair by pair."""
+    rng = np.random.default_rng(1)
+    data = []
+    for pair_id in (3, 1, 2):
+        timestamps = pd.date_range("2020-01-01 03:00", periods=200, freq="h") + pd.Timedelta(minutes=17 * pair_id)
+        for ts in np.sort(rng.choice(timestamps, 80, replace=False)):
+            data.append(Candle.generate_synthetic_sample(pair_id, pd.Timestamp(ts), rng.uniform(1, 2), volume=rng.uniform(1, 10)))
+
+    df = pd.DataFrame(data, columns=Candle.DATAFRAME_FIELDS).sample(frac=1, random_state=1)
+    df.loc[df.index[0:5], "close"] = np.nan
+
+    expected = resample_candles_multiple_pairs(df, frequency, forward_fill_until=forward_fill_until, vectorised=False)
+    resampled = resample_candles_multiple_pairs(df, frequency, forward_fill_until=forward_fill_until)
+    pd.testing.assert_frame_equal(resampled, expected, check_exact=True)
+    assert resampled.attrs == expected.attrs
@@ -2,8 +2,11 @@
 
 import datetime
 
+import numpy as np
 import pandas
 import pandas as pd
+import pyarrow as pa
+from pyarrow import parquet as pq
 import pytest
 from pandas import Timestamp
 from pandas.core.groupby import DataFrameGroupBy
@@ -13,7 +16,7 @@ from tradingstrategy.candle import GroupedCandleUniverse, is_candle_green, is_ca
 from tradingstrategy.chain import ChainId
 from tradingstrategy.client import Client
 from tradingstrategy.pair import PandasPairUniverse
-from tradingstrategy.reader import read_parquet
+from tradingstrategy.reader import read_parquet, read_parquet_filtered
 from tradingstrategy.timebucket import TimeBucket
 from tradingstrategy.transport.jsonl import JSONLMaxResponseSizeExceeded
 from tradingstrategy.utils.groupeduniverse import resample_candles, resample_dataframe, resample_price_series
@@ -533,6 +536,32 @@ def test_filter_pyarrow(persistent_test_client: Client, default_pairs_df):
     # print(f"Max mem {mem_used/(1024*1024)} MB")
 
 
+def test_read_parquet_filtered(tmp_path):
+    """Filtered Parquet read gives the same rows as loading everything and filtering in pandas."""
+    timestamps = pd.date_range("2024-01-01", periods=500, freq="h")
+    pair_ids = np.arange(1, 101)
+    df = pd.DataFrame({
+        "pair_id": np.repeat(pair_ids, len(timestamps)).astype("uint32"),
+        "timestamp": np.tile(timestamps.values, len(pair_ids)),
+        "open": 1.0,
+        "close": np.arange(len(pair_ids) * len(timestamps), dtype="float64"),
+    })
+    path = tmp_path / "candles.parquet"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=5_000)
+
+    start = pd.Timestamp("2024-01-05")
+    end = pd.Timestamp("2024-01-10")
+    wanted = [5, 50, 77]
+    loaded = read_parquet_filtered(path, pair_ids=wanted, start_time=start, end_time=end, columns=["pair_id", "timestamp", "close"])
+
+    full = read_parquet(path).to_pandas()
+    expected = full.loc[full["pair_id"].isin(wanted) & (full["timestamp"] >= start) & (full["timestamp"] <= end), ["pair_id", "timestamp", "close"]]
+    pd.testing.assert_frame_equal(loaded, expected.reset_index(drop=True))
+
+    # No filters
+    pd.testing.assert_frame_equal(read_parquet_filtered(path), full)
+
+
 def test_load_candles_using_jsonl(persistent_test_client: Client, default_pairs_df):
     """Load data using JSONL endpoint"""
 
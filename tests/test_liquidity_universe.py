@@ -14,7 +14,8 @@ from tradingstrategy.pair import DEXPair, PandasPairUniverse
 from tradingstrategy.timebucket import TimeBucket
 from tradingstrategy.transport.cache import OHLCVCandleType
 from tradingstrategy.utils.forward_fill import forward_fill
-from tradingstrategy.utils.liquidity_filter import build_liquidity_summary
+from tradingstrategy.utils.liquidity_filter import build_liquidity_summary, get_somewhat_realistic_max_liquidity, get_liquidity_today
+from tradingstrategy.utils.time import floor_pandas_week
 from tradingstrategy.utils.token_filter import filter_pairs_default
 
 
@@ -239,6 +240,31 @@ def test_build_liquidity_summary(
         assert liquidity_usd > 0, f"Got zero liquidity for pair {pair_id}"
 
 
+def test_build_liquidity_summary_synthetic():
+    """Vectorised liquidity summary matches per-pair lookups."""
+
+    today = floor_pandas_week(pd.Timestamp.now() - pd.Timedelta(days=21))
+    timestamps = pd.date_range(today - pd.Timedelta(weeks=20), today + pd.Timedelta(weeks=2), freq="W-MON")
+    rows = []
+    for pair_id in (1, 2, 5):
+        for i, timestamp in enumerate(timestamps):
+            if pair_id == 2 and i % 3 == 0:
+                continue
+            # Pair 5 has unrealistic liquidity
+            close = float(i * pair_id) * (1e8 if pair_id == 5 else 1)
+            rows.append({"pair_id": pair_id, "timestamp": timestamp, "close": close})
+
+    liquidity_df = pd.DataFrame(rows).set_index("timestamp").groupby("pair_id")
+    pair_ids = [1, 2, 3, 5]
+
+    historical_max, today_liquidity = build_liquidity_summary(liquidity_df, pair_ids)
+    assert historical_max == {pair_id: get_somewhat_realistic_max_liquidity(liquidity_df, pair_id) for pair_id in pair_ids}
+    assert today_liquidity == {pair_id: get_liquidity_today(liquidity_df, pair_id, delay=pd.Timedelta(days=21)) for pair_id in pair_ids}
+    assert historical_max[3] == -1
+    assert historical_max[5] == -1
+    assert today_liquidity[2] == 40
+
+
 def test_load_tvl_one_pair(
     persistent_test_client: Client,
     default_exchange_universe,
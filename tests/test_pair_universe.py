@@ -1,4 +1,6 @@
+import dataclasses
 import datetime
+import warnings
 from typing import Set, List, Tuple
 
 import pytest
@@ -6,7 +8,7 @@ import pytest
 from tradingstrategy.chain import ChainId
 from tradingstrategy.client import Client
 from tradingstrategy.exchange import ExchangeType, ExchangeNotFoundError
-from tradingstrategy.pair import PandasPairUniverse, resolve_pairs_based_on_ticker, PairNotFoundError, DEXPair, generate_address_columns, TokenNotFound, MultipleTokensWithSymbol
+from tradingstrategy.pair import PandasPairUniverse, resolve_pairs_based_on_ticker, resolve_pair_descriptions, PairNotFoundError, DEXPair, generate_address_columns, TokenNotFound, MultipleTokensWithSymbol
 from tradingstrategy.utils.token_filter import filter_pairs_default
 
 
@@ -76,6 +78,138 @@ def test_get_all_tokens(sample_pair):
     assert len(tokens) == 2
 
 
+@pytest.mark.parametrize("via_pyarrow", [True, False])
+def test_pair_row_index(sample_pair, via_pyarrow):
+    """Column array backed pair index gives the same pair data as transposing the DataFrame."""
+
+    items = [
+        dataclasses.replace(
+            sample_pair,
+            pair_id=pair_id,
+            address=f"0x{pair_id:040X}",
+            base_token_symbol=f"T{pair_id}",
+            buy_volume_30d=float(pair_id) if pair_id % 3 else None,
+        )
+        for pair_id in range(1, 51)
+    ]
+
+    if via_pyarrow:
+        df = DEXPair.convert_to_pyarrow_table(items).to_pandas()
+    else:
+        df = DEXPair.convert_to_dataframe(items)
+
+    universe = PandasPairUniverse(df)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        expected_map = df.set_index(df["pair_id"]).T.to_dict()
+
+    assert len(universe.pair_map) == 50
+    assert list(universe.pair_map.keys()) == list(expected_map.keys())
+
+    for pair_id, expected in expected_map.items():
+        row = universe.pair_map[pair_id]
+        assert row.keys() == expected.keys()
+        for key, value in expected.items():
+            assert type(row[key]) == type(value), f"{key}: {type(row[key])} vs {type(value)}"
+            assert row[key] == value or (value != value and row[key] != row[key])
+
+        pair = universe.get_pair_by_id(pair_id)
+        assert pair.to_dict() == DEXPair.from_dict({k: None if v != v else v for k, v in expected.items()}).to_dict()
+
+    # Address lookups are case-insensitive
+    pair = universe.get_pair_by_smart_contract(f"0x{7:040x}")
+    assert pair.pair_id == 7
+    assert pair is universe.get_pair_by_id(7)
+
+    with pytest.raises(PairNotFoundError):
+        universe.get_pair_by_smart_contract("0x0000000000000000000000000000000000000999")
+
+
+def test_token_index(sample_pair):
+    """Token, symbol, base and quote token lookups use the prebuilt token index."""
+
+    usdc = sample_pair.token0_address
+    items = [
+        dataclasses.replace(
+            sample_pair,
+            pair_id=pair_id,
+            address=f"0x{pair_id:040x}",
+            token1_address=f"0x{pair_id + 100:040x}",
+            token1_symbol="SCAM" if pair_id > 1 else "WETH",
+            base_token_symbol="SCAM" if pair_id > 1 else "WETH",
+            buy_volume_30d=1000.0 if pair_id == 3 else 1.0,
+        )
+        for pair_id in range(1, 5)
+    ]
+    universe = PandasPairUniverse(DEXPair.convert_to_pyarrow_table(items).to_pandas())
+
+    token = universe.get_token(usdc.upper())
+    assert token.symbol == "USDC"
+    assert token.decimals == 6
+    assert universe.get_token(usdc, chain_id=ChainId.bsc) is None
+    assert universe.get_token("0x0000000000000000000000000000000000000999") is None
+
+    # Highest volume SCAM token wins
+    assert universe.get_token_by_symbol("scam").address == f"0x{103:040x}"
+    with pytest.raises(MultipleTokensWithSymbol):
+        universe.get_token_by_symbol("SCAM", pick_by_highest_volume=False)
+    assert universe.get_token_by_symbol("weth").address == f"0x{101:040x}"
+
+    assert len(universe.get_all_tokens()) == 5
+    assert [t.symbol for t in universe.iterate_tokens()] == ["WETH", "USDC", "SCAM", "SCAM", "SCAM"]
+
+    assert universe.get_pair_ids_by_quote_token(usdc).tolist() == [1, 2, 3, 4]
+    assert universe.get_pair_ids_by_quote_token(usdc, chain_id=ChainId.bsc).tolist() == []
+    assert universe.get_pair_ids_by_base_token(f"0x{102:040x}", chain_id=ChainId.ethereum).tolist() == [2]
+
+
+def test_resolve_pair_descriptions(sample_pair):
+    """Bulk resolve descriptions, pick the tie-breaker winner and report misses per row."""
+
+    items = [
+        dataclasses.replace(sample_pair, pair_id=1, fee=30, buy_volume_all_time=10.0),
+        dataclasses.replace(sample_pair, pair_id=2, fee=30, buy_volume_all_time=1000.0),
+        dataclasses.replace(sample_pair, pair_id=3, fee=5, buy_volume_all_time=1.0),
+        dataclasses.replace(sample_pair, pair_id=4, exchange_slug="sushi", fee=30, buy_volume_all_time=1.0),
+    ]
+    df = DEXPair.convert_to_pyarrow_table(items).to_pandas()
+
+    resolved = resolve_pair_descriptions(
+        df,
+        [
+            (ChainId.ethereum, "uniswap-v2", "weth", "USDC", 0.0030),
+            (ChainId.ethereum, "uniswap-v2", "WETH", "USDC"),
+            (ChainId.ethereum, "sushi", "WETH", "USDC"),
+            (ChainId.ethereum, None, "WETH", "USDC", 0.0030),
+            (ChainId.ethereum, "uniswap-v2", "WETH", "USDT"),
+            (ChainId.bsc, "uniswap-v2", "WETH", "USDC"),
+        ]
+    )
+
+    assert resolved["pair_id"].tolist()[0:4] == [2, 3, 4, 2]
+    assert resolved["pair_id"].isna().tolist() == [False, False, False, False, True, True]
+    assert resolved["error"].isna().tolist() == [True, True, True, True, False, False]
+    assert "WETH-USDT" in resolved.loc[4, "error"]
+
+    # Legacy format
+    legacy = resolve_pairs_based_on_ticker(df, ChainId.ethereum, "sushi", {("WETH", "USDC")})
+    assert legacy["pair_id"].tolist() == [4]
+
+    universe = PandasPairUniverse(df)
+    pairs = universe.get_pairs_by_human_descriptions([
+        (ChainId.ethereum, "sushi", "WETH", "USDC"),
+        (ChainId.ethereum, "uniswap-v2", "WETH", "USDC", 0.0030),
+    ])
+    assert [p.pair_id for p in pairs] == [4, 2]
+
+    with pytest.raises(PairNotFoundError):
+        universe.get_pairs_by_human_descriptions([(ChainId.ethereum, "uniswap-v2", "WETH", "USDT")])
+
+    created = PandasPairUniverse.create_pair_universe(df, [(ChainId.ethereum, "uniswap-v2", "WETH", "USDC", 0.0005)])
+    assert created.get_single().pair_id == 3
+
+
 def test_resolve_pairs_based_on_ticker(persistent_test_client):
     """Check that we can find multiple pairs."""
 
@@ -1,4 +1,5 @@
 """Optimised liquidity universe tests."""
+import numpy as np
 import pandas as pd
 import pytest
 from tradingstrategy.candle import GroupedCandleUniverse
@@ -37,3 +38,76 @@ def test_resampled_liquidity_universe(persistent_test_client: Client, default_pa
     assert samples.iloc[0]["value"] == pytest.approx(1135.985474)
 
     assert resampled_liquidity_universe.get_liquidity_fast(sushi_usdt.pair_id, pd.Timestamp("2020-09-02")) == pytest.approx(1135.985474)
+
+
+@pytest.mark.parametrize("resample_period", ["1D", "7D"])
+def test_resampled_liquidity_universe_cache(tmp_path, resample_period):
+    """Resampled liquidity is stored on disk and the array lookups match the DataFrame lookups."""
+    rng = np.random.default_rng(1)
+    frames = []
+    for pair_id in (5, 2, 9):
+        timestamps = pd.date_range("2021-01-01", periods=60, freq="D") + pd.Timedelta(days=int(pair_id))
+        keep = np.sort(rng.choice(len(timestamps), 30, replace=False))
+        frames.append(pd.DataFrame({
+            "timestamp": timestamps[keep],
+            "pair_id": pair_id,
+            "close": rng.uniform(1_000, 2_000, len(keep)),
+        }))
+    df = pd.concat(frames)
+
+    resampled = ResampledLiquidityUniverse(df, resample_period=resample_period, cache_path=tmp_path)
+    assert len(list((tmp_path / "resampled-liquidity").iterdir())) == 1
+
+    # Second instance is memory-mapped from the cache
+    cached = ResampledLiquidityUniverse(df, resample_period=resample_period, cache_path=tmp_path)
+    assert cached._df is None
+    pd.testing.assert_frame_equal(cached.df, resampled.df)
+
+    for pair_id in (2, 5, 9):
+        samples = resampled.df.xs(pair_id)
+        pd.testing.assert_frame_equal(cached.get_samples_by_pair(pair_id), samples)
+        for when in pd.date_range("2020-12-25", "2021-04-01", freq="13h"):
+            try:
+                expected = samples.loc[when.floor(resample_period)]["value"]
+            except KeyError:
+                expected = 0.0
+            assert resampled.get_liquidity_fast(pair_id, when) == expected
+            assert cached.get_liquidity_fast(pair_id, when) == expected
+
+    with pytest.raises(LiquidityDataUnavailable):
+        cached.get_liquidity_fast(1, pd.Timestamp("2021-02-01"))
+
+    # A different resample period or source data gets a new cache entry
+    df.loc[df.index[0], "close"] = 1
+    ResampledLiquidityUniverse(df, resample_period=resample_period, cache_path=tmp_path)
+    assert len(list((tmp_path / "resampled-liquidity").iterdir())) == 2
+
+
+@pytest.mark.parametrize("resample_period", ["W", "MS"])
+def test_resampled_liquidity_universe_calendar_period(tmp_path, resample_period):
+    """Calendar resample periods look up the period the timestamp falls into."""
+    rng = np.random.default_rng(1)
+    frames = []
+    for pair_id in (5, 2):
+        timestamps = pd.date_range("2021-01-01", periods=90, freq="D") + pd.Timedelta(days=int(pair_id) * 5)
+        frames.append(pd.DataFrame({
+            "timestamp": timestamps,
+            "pair_id": pair_id,
+            "close": rng.uniform(1_000, 2_000, len(timestamps)),
+        }))
+    df = pd.concat(frames)
+
+    resampled = ResampledLiquidityUniverse(df, resample_period=resample_period, cache_path=tmp_path)
+    assert resampled.period_ns is None
+    assert not (tmp_path / "resampled-liquidity").exists()
+
+    for pair_id in (2, 5):
+        samples = resampled.get_samples_by_pair(pair_id)
+        for when in pd.date_range("2020-12-01", "2021-05-01", freq="13h"):
+            # The period pandas resamples the timestamp into
+            label = pd.Series([0], index=[when]).resample(resample_period, origin="epoch").sum().index[0]
+            expected = samples["value"].get(label, 0.0)
+            assert resampled.get_liquidity_fast(pair_id, when) == expected
+
+    with pytest.raises(LiquidityDataUnavailable):
+        resampled.get_liquidity_fast(1, pd.Timestamp("2021-02-01"))
@@ -0,0 +1,45 @@
+"""Token filter predicates."""
+
+import pandas as pd
+
+from tradingstrategy.pair import generate_address_columns
+from tradingstrategy.utils.token_filter import filter_for_nonascii_tokens, filter_for_derivatives, filter_for_rebases, \
+    deduplicate_pairs_by_volume, is_derivative, is_rebase
+
+
+def _create_pairs_df() -> pd.DataFrame:
+    return pd.DataFrame({
+        "pair_id": [1, 2, 3, 4, 5, 6, 7],
+        "token0_symbol": ["WETH", "wstETH", "USDC", "OHM", "🐸PEPE", "AAVE", "WETH"],
+        "token1_symbol": ["USDC", "WETH", "stETH", "DAI", "WETH", "aUSDC", "USDT"],
+        "base_token_symbol": ["WETH", "wstETH", "stETH", "OHM", "🐸PEPE", "AAVE", "WETH"],
+        "quote_token_symbol": ["USDC", "WETH", "USDC", "DAI", "WETH", "aUSDC", "USDT"],
+        "token0_address": ["0x1", "0x2", "0x3", "0x4", "0x5", "0x6", "0x1"],
+        "token1_address": ["0x3", "0x1", "0x7", "0x8", "0x1", "0x9", "0xa"],
+        "buy_volume_30d": [10.0, 1.0, 1.0, 1.0, 1.0, 1.0, 50.0],
+        "sell_volume_30d": [10.0, 1.0, 1.0, 1.0, 1.0, 1.0, 50.0],
+    })
+
+
+def test_token_filter_vectorised():
+    """Vectorised predicates give the same results as the row-by-row checks."""
+    pairs_df = _create_pairs_df()
+
+    assert filter_for_nonascii_tokens(pairs_df)["pair_id"].tolist() == [1, 2, 3, 4, 6, 7]
+
+    derivative = [is_derivative(a) or is_derivative(b) for a, b in zip(pairs_df["token0_symbol"], pairs_df["token1_symbol"])]
+    assert filter_for_derivatives(pairs_df)["pair_id"].tolist() == pairs_df.loc[[not d for d in derivative], "pair_id"].tolist()
+    assert filter_for_derivatives(pairs_df, derivatives=True)["pair_id"].tolist() == pairs_df.loc[derivative, "pair_id"].tolist()
+
+    rebase = [is_rebase(a) or is_rebase(b) for a, b in zip(pairs_df["token0_symbol"], pairs_df["token1_symbol"])]
+    assert rebase == [False, False, False, True, False, False, False]
+    assert filter_for_rebases(pairs_df)["pair_id"].tolist() == [1, 2, 3, 5, 6, 7]
+    assert filter_for_rebases(pairs_df, rebase=True)["pair_id"].tolist() == [4]
+
+    deduplicated = deduplicate_pairs_by_volume(pairs_df.copy())
+    assert deduplicated["pair_id"].tolist()[0] == 7
+    assert sorted(deduplicated["pair_id"].tolist()) == [2, 3, 4, 5, 6, 7]
+
+    with_addresses = generate_address_columns(pairs_df)
+    assert with_addresses["base_token_address"].tolist() == ["0x1", "0x2", "0x7", "0x4", "0x5", "0x6", "0x1"]
+    assert with_addresses["quote_token_address"].tolist() == ["0x3", "0x1", "0x3", "0x8", "0x1", "0x9", "0xa"]
@@ -205,3 +205,52 @@ def test_fetch_vault_price_history_redownloads_when_head_metadata_changed(
     assert cached_path.read_bytes() == b"abcde"
     assert sidecar_path.exists()
     assert orjson.loads(sidecar_path.read_bytes())["etag"] == '"new-version"'
+
+
+def test_expired_dataset_revalidated_with_conditional_head(tmp_path: Path) -> None:
+    """Test expired datasets are downloaded again only if the remote file changed.
+
+    1. Download the dataset and store the remote ETag in the sidecar metadata.
+    2. Expire the cache and mock a 304 Not Modified reply to the conditional HEAD request.
+    3. Expire the cache again and mock a reply with a new ETag, confirm the file is downloaded again.
+    """
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+
+    def fake_download(session, path, url, params, timeout, human_desc) -> None:
+        Path(path).write_bytes(b"candles")
+
+    transport.download_func.side_effect = fake_download
+
+    head_response = Mock(status_code=200, headers={"ETag": '"v1"', "Content-Length": "7"})
+    transport.requests.head = Mock(return_value=head_response)
+
+    # 1. Download the dataset and store the remote ETag in the sidecar metadata.
+    path = transport.fetch_candles_all_time(TimeBucket.d1)
+    assert transport.download_func.call_count == 1
+    sidecar_path = path.with_name("candles-1d.parquet.metadata.json")
+    assert orjson.loads(sidecar_path.read_bytes())["etag"] == '"v1"'
+
+    # 2. Expire the cache and mock a 304 Not Modified reply to the conditional HEAD request.
+    expired_mtime = time.time() - dt.timedelta(days=4).total_seconds()
+    os.utime(path, (expired_mtime, expired_mtime))
+    transport.requests.head = Mock(return_value=Mock(status_code=304, headers={"ETag": '"v1"'}))
+
+    assert transport.fetch_candles_all_time(TimeBucket.d1) == path
+    assert transport.download_func.call_count == 1
+    assert transport.requests.head.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert transport.requests.head.call_args.kwargs["params"] == {"bucket": "1d"}
+    assert path.stat().st_mtime > expired_mtime
+
+    # 3. Expire the cache again and mock a reply with a new ETag, confirm the file is downloaded again.
+    os.utime(path, (expired_mtime, expired_mtime))
+    transport.requests.head = Mock(return_value=Mock(status_code=200, headers={"ETag": '"v2"', "Content-Length": "7"}))
+
+    assert transport.fetch_candles_all_time(TimeBucket.d1) == path
+    assert transport.download_func.call_count == 2
+    assert transport.requests.head.call_count == 1
+    assert orjson.loads(sidecar_path.read_bytes())["etag"] == '"v2"'
+
+    transport.purge_cache(path)
+    assert not sidecar_path.exists()
+
+    transport.close()
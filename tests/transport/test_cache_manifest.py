@@ -0,0 +1,100 @@
+"""Cache manifest index and LRU eviction."""
+import os
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+from filelock import FileLock
+
+from tradingstrategy.timebucket import TimeBucket
+from tradingstrategy.transport.cache import CachedHTTPTransport
+from tradingstrategy.transport.cache_manifest import CacheManifest
+
+
+def test_cache_quota_evicts_least_recently_used(tmp_path: Path):
+    """Downloads over the quota evict the least recently used dataset."""
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix(), max_cache_size=25)
+    # All downloads happen within the grace period of lock-free readers
+    transport.get_cache_manifest().grace_period = 0
+    transport.requests.head = Mock(return_value=Mock(status_code=200, headers={"ETag": '"v1"'}))
+
+    def fake_download(session, path, url, params, timeout, human_desc) -> None:
+        Path(path).write_bytes(b"0123456789")
+
+    transport.download_func.side_effect = fake_download
+
+    daily = transport.fetch_candles_all_time(TimeBucket.d1)
+    hourly = transport.fetch_candles_all_time(TimeBucket.h1)
+
+    manifest = transport.get_cache_manifest()
+    entry = manifest.get_entry("candles-1d.parquet")
+    assert entry.size == 10
+    assert entry.origin.endswith("/candles-all")
+    assert manifest.get_total_size() == 20
+
+    # Cache hit makes the daily candles more recently used
+    time.sleep(0.01)
+    assert transport.fetch_candles_all_time(TimeBucket.d1) == daily
+    assert transport.download_func.call_count == 2
+
+    minute = transport.fetch_candles_all_time(TimeBucket.m5)
+
+    assert daily.exists()
+    assert minute.exists()
+    assert not hourly.exists()
+    assert not hourly.with_name("candles-1h.parquet.metadata.json").exists()
+    assert manifest.get_entry("candles-1h.parquet") is None
+    assert manifest.get_total_size() == 20
+
+    # Manifest is persisted for other processes
+    transport.close()
+    other = CacheManifest(tmp_path)
+    assert {e.name for e in other.get_entries()} == {"candles-1d.parquet", "candles-5m.parquet"}
+
+
+def test_cache_manifest_sync_and_eviction_order(tmp_path: Path):
+    """Existing files get indexed, stale entries go first, never expiring entries are not stale."""
+    (tmp_path / "pair-universe.parquet").write_bytes(b"x" * 100)
+    (tmp_path / "pair-universe.parquet.metadata.json").write_bytes(b"{}")
+    (tmp_path / "pair-universe.parquet.lock").write_bytes(b"")
+    candles_name = "candles-1h-between-2021-01-01_00-00-00-and-any-to_2022-01-01_00-00-00-abc.parquet"
+    (tmp_path / candles_name).write_bytes(b"x" * 100)
+    (tmp_path / "exchange-universe.json").write_bytes(b"x" * 100)
+    (tmp_path / "token-metadata").mkdir()
+    (tmp_path / "token-metadata" / "1-0x1.json").write_bytes(b"x" * 50)
+
+    manifest = CacheManifest(tmp_path, grace_period=0)
+    manifest.sync()
+
+    entries = {e.name: e for e in manifest.get_entries()}
+    assert set(entries) == {"pair-universe.parquet", candles_name, "exchange-universe.json", "token-metadata"}
+    assert entries["token-metadata"].size == 50
+    assert entries[candles_name].never_expires
+
+    # All entries downloaded long ago, the exchange universe read least recently
+    now = time.time()
+    for entry in entries.values():
+        entry.fetched_at = now - 30 * 24 * 3600
+        entry.last_access = now - 60
+    entries["exchange-universe.json"].last_access = now - 120
+    entries["pair-universe.parquet"].last_access = now - 90
+
+    selected = manifest.select_evictions(max_size=200, cache_period=3 * 24 * 3600)
+    assert [e.name for e in selected] == ["exchange-universe.json", "pair-universe.parquet"]
+
+    selected = manifest.select_evictions(max_size=0, cache_period=3 * 24 * 3600, protected={"token-metadata"})
+    assert selected[-1].name == candles_name
+
+    # Locked entries are not deleted
+    with FileLock(tmp_path / "pair-universe.parquet.lock"):
+        assert not manifest.evict(entries["pair-universe.parquet"])
+    assert (tmp_path / "pair-universe.parquet").exists()
+
+    assert manifest.evict(entries["pair-universe.parquet"])
+    assert not (tmp_path / "pair-universe.parquet").exists()
+    assert not (tmp_path / "pair-universe.parquet.metadata.json").exists()
+
+    # Deleted files are dropped from the manifest
+    os.remove(tmp_path / "exchange-universe.json")
+    manifest.sync()
+    assert {e.name for e in CacheManifest(tmp_path).get_entries()} == {candles_name, "token-metadata"}
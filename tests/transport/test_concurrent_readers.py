@@ -0,0 +1,144 @@
+"""Readers of cached files do not wait for the writer lock."""
+import datetime
+import multiprocessing
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pandas as pd
+from filelock import FileLock
+
+from tradingstrategy.timebucket import TimeBucket
+from tradingstrategy.transport.cache import CachedHTTPTransport
+from tradingstrategy.transport.cache_utils import atomic_replace
+from tradingstrategy.transport.pair_candle_cache import PairCandleCache
+
+
+START = datetime.datetime(2023, 1, 1)
+END = datetime.datetime(2023, 1, 31, 23)
+
+
+def _fail_download(session, path, url, params, timeout, human_desc) -> None:
+    raise AssertionError(f"Cached file was downloaded again: {url}")
+
+
+def _read_candles(cache_path: str) -> float:
+    """Read the cached candle file in a subprocess, return seconds it took."""
+    started = time.perf_counter()
+    transport = CachedHTTPTransport(download_func=_fail_download, cache_path=cache_path)
+    path = transport.fetch_candles_all_time(TimeBucket.d1)
+    assert path.read_bytes() == b"candles"
+    return time.perf_counter() - started
+
+
+def _read_candles_slowly(cache_path: str, opened, evicted, result):
+    """Get the cached candle file, and read it only after the other process has tried to evict it."""
+    transport = CachedHTTPTransport(download_func=_fail_download, cache_path=cache_path)
+    path = transport.fetch_candles_all_time(TimeBucket.d1)
+    opened.set()
+    assert evicted.wait(timeout=30)
+    result.put(path.read_bytes())
+
+
+def _read_pair_candles(cache_path: str) -> int:
+    """Read cached pair candles in a subprocess, return the number of candles."""
+    transport = CachedHTTPTransport(download_func=_fail_download, cache_path=cache_path)
+    transport._load_candles_jsonl = Mock(side_effect=AssertionError("Cached candles were loaded again"))
+    df = transport.fetch_candles_by_pair_ids([1, 2], TimeBucket.h1, START, END)
+    return len(df)
+
+
+def test_parallel_readers_do_not_wait_writer_lock(tmp_path: Path):
+    """Many processes read a fresh cached file while a writer holds its lock."""
+    path = tmp_path / "candles-1d.parquet"
+    path.write_bytes(b"candles")
+
+    ctx = multiprocessing.get_context("fork")
+    with FileLock(f"{path}.lock"):
+        with ctx.Pool(4) as pool:
+            result = pool.map_async(_read_candles, [tmp_path.as_posix()] * 4)
+            # Readers would block for the lock timeout of 120 seconds
+            durations = result.get(timeout=60)
+
+    assert len(durations) == 4
+    assert max(durations) < 30
+
+
+def test_reader_waits_file_being_written(tmp_path: Path):
+    """A missing file is waited for, and read from the other writer, not downloaded again."""
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+    path = tmp_path / "candles-1d.parquet"
+    lock = FileLock(f"{path}.lock", thread_local=False)
+    lock.acquire()
+
+    def _write():
+        time.sleep(0.5)
+        with atomic_replace(path) as temp_path:
+            Path(temp_path).write_bytes(b"candles")
+        lock.release()
+
+    writer = threading.Thread(target=_write)
+    writer.start()
+    try:
+        result = transport.fetch_candles_all_time(TimeBucket.d1)
+    finally:
+        writer.join()
+
+    assert result.read_bytes() == b"candles"
+    transport.download_func.assert_not_called()
+    assert not Path(f"{path}.tmp").exists()
+
+
+def test_eviction_skips_entries_being_read(tmp_path: Path):
+    """Cache quota of one process does not delete a file another process is reading."""
+    day_ago = time.time() - 24 * 3600
+    for name in ("candles-1d.parquet", "candles-1h.parquet"):
+        path = tmp_path / name
+        path.write_bytes(b"candles")
+        os.utime(path, (day_ago, day_ago))
+
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+    transport.get_cache_manifest().sync()
+
+    ctx = multiprocessing.get_context("fork")
+    opened = ctx.Event()
+    evicted = ctx.Event()
+    result = ctx.Queue()
+    reader = ctx.Process(target=_read_candles_slowly, args=(tmp_path.as_posix(), opened, evicted, result))
+    reader.start()
+    try:
+        assert opened.wait(timeout=30)
+        # Quota would delete everything
+        transport.enforce_cache_size(max_size=0)
+        evicted.set()
+        assert result.get(timeout=30) == b"candles"
+    finally:
+        reader.join(timeout=30)
+
+    assert reader.exitcode == 0
+    assert (tmp_path / "candles-1d.parquet").exists()
+    assert not (tmp_path / "candles-1h.parquet").exists()
+
+
+def test_parallel_pair_candle_readers_do_not_wait_writer_lock(tmp_path: Path):
+    """Many processes read fully cached pairs from the partitioned cache while a writer holds its lock."""
+    timestamps = pd.date_range(START, END, freq="h")
+    candles = pd.concat([
+        pd.DataFrame({"timestamp": timestamps, "pair_id": pair_id, "open": 1.0, "close": 1.0})
+        for pair_id in range(1, 5)
+    ], ignore_index=True)
+
+    base_path = (tmp_path / "candles-1h").as_posix()
+    with PairCandleCache(base_path, partitioned=True) as cache:
+        cache.update([candles], range(1, 5), START, END)
+
+    ctx = multiprocessing.get_context("fork")
+    with FileLock(f"{base_path}.lock"):
+        with ctx.Pool(4) as pool:
+            result = pool.map_async(_read_pair_candles, [tmp_path.as_posix()] * 4)
+            # Readers would block for the lock timeout of 120 seconds
+            counts = result.get(timeout=60)
+
+    assert counts == [2 * len(timestamps)] * 4
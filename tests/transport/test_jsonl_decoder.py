@@ -0,0 +1,57 @@
+"""Batched JSONL decoding."""
+import io
+
+import orjson
+import pytest
+
+from tradingstrategy.transport.jsonl import (CANDLE_MAPPINGS, JSONLColumnDecoder,
+                                             JSONLMaxResponseSizeExceeded,
+                                             iterate_jsonl_batches)
+
+
+def _make_stream(rows: list[dict], trailing_newline=True) -> io.BytesIO:
+    data = b"\n".join(orjson.dumps(r) for r in rows)
+    if trailing_newline:
+        data += b"\n"
+    return io.BytesIO(data)
+
+
+ROWS = [
+    {"p": i % 3, "ts": 1700000000 + i * 60, "o": i, "h": i + 0.5, "l": None, "c": i, "tc": 1}
+    for i in range(100)
+]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1024 * 1024])
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_iterate_jsonl_batches(block_size, trailing_newline):
+    """Lines split across read blocks are decoded correctly."""
+    stream = _make_stream(ROWS, trailing_newline)
+    rows = [row for batch in iterate_jsonl_batches(stream, block_size=block_size) for row in batch]
+    assert rows == ROWS
+
+
+def test_iterate_jsonl_batches_error():
+    stream = _make_stream(ROWS[0:5] + [{"error": "max_bytes exceeded"}])
+    with pytest.raises(JSONLMaxResponseSizeExceeded):
+        list(iterate_jsonl_batches(stream))
+
+
+def test_jsonl_column_decoder():
+    """Typed columns are NumPy arrays, others pandas-inferred lists, discarded keys dropped."""
+    decoder = JSONLColumnDecoder(CANDLE_MAPPINGS, {"open": "float64", "timestamp": "int64"})
+    for batch in iterate_jsonl_batches(_make_stream(ROWS), block_size=256):
+        decoder.add_rows(batch)
+
+    columns = decoder.get_columns()
+    assert list(columns.keys()) == ["pair_id", "timestamp", "open", "high", "low", "close"]
+    assert columns["open"].dtype == "float64"
+    assert columns["timestamp"].tolist() == [r["ts"] for r in ROWS]
+    assert columns["low"] == [None] * 100
+    assert columns["pair_id"] == [r["p"] for r in ROWS]
+
+
+def test_jsonl_column_decoder_missing_key():
+    decoder = JSONLColumnDecoder(CANDLE_MAPPINGS)
+    with pytest.raises(RuntimeError):
+        decoder.add_rows([{"p": 1, "ts": 1}, {"p": 2}])
@@ -0,0 +1,145 @@
+"""Parallel, chunked JSONL candle download using a fake streaming endpoint."""
+import datetime
+import io
+import threading
+from unittest.mock import Mock
+
+import orjson
+import pytest
+
+from tradingstrategy.timebucket import TimeBucket
+from tradingstrategy.transport.cache import CachedHTTPTransport
+from tradingstrategy.transport.jsonl import load_candles_jsonl, load_candles_jsonl_parallel, split_candle_fetch_chunks
+from tradingstrategy.utils.time import to_int_unix_timestamp
+
+
+START = datetime.datetime(2024, 1, 1)
+END = datetime.datetime(2024, 1, 3)
+
+
+class FakeJSONLSession:
+    """Serve hourly candles for any pair ids, filtered by the request params.
+
+    - Fail the first request of the given pair ids to test per-chunk retry
+    """
+
+    def __init__(self, fail_once_pair_id: int | None = None):
+        self.fail_once_pair_id = fail_once_pair_id
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params, stream):
+        pair_ids = [int(p) for p in params["pair_ids"].split(",")]
+        start = datetime.datetime.fromisoformat(params.get("start", START.isoformat()))
+        end = datetime.datetime.fromisoformat(params.get("end", END.isoformat()))
+
+        with self.lock:
+            self.requests.append(params)
+            if self.fail_once_pair_id in pair_ids:
+                self.fail_once_pair_id = None
+                # Stream terminated forcefully
+                lines = [{"error": "Response ended prematurely"}]
+                return Mock(raw=io.BytesIO(b"\n".join(orjson.dumps(l) for l in lines)))
+
+        lines = []
+        ts = start
+        while ts <= end:
+            for pair_id in pair_ids:
+                # Pairs 101-199 do not trade on the first day
+                if 100 < pair_id < 200 and ts < START + datetime.timedelta(days=1):
+                    continue
+                price = pair_id + ts.hour
+                lines.append({
+                    "p": pair_id,
+                    "ts": to_int_unix_timestamp(ts),
+                    "o": price,
+                    "h": price,
+                    "l": price,
+                    "c": price,
+                    "xr": 1.0,
+                    "b": 1,
+                    "s": 1,
+                    "bv": 10.0,
+                    "sv": 10.0,
+                    "sb": 1,
+                    "eb": 2,
+                })
+            ts += datetime.timedelta(hours=1)
+        return Mock(raw=io.BytesIO(b"\n".join(orjson.dumps(l) for l in lines)))
+
+
+def test_split_candle_fetch_chunks():
+    chunks = split_candle_fetch_chunks(
+        [5, 3, 1, 4, 2],
+        START,
+        END,
+        pairs_per_chunk=2,
+        time_chunk=datetime.timedelta(days=1),
+    )
+    assert [c[0] for c in chunks] == [[1, 2], [1, 2], [3, 4], [3, 4], [5], [5]]
+    assert chunks[0][1:] == (START, START + datetime.timedelta(days=1))
+    assert chunks[1][1:] == (START + datetime.timedelta(days=1), END)
+
+
+@pytest.mark.parametrize("time_chunk", [None, datetime.timedelta(hours=7)])
+def test_load_candles_jsonl_parallel(time_chunk):
+    """Chunked download gives the same result as a single request."""
+    pair_ids = list(range(1, 11)) + [101, 102]
+
+    session = FakeJSONLSession()
+    expected = load_candles_jsonl(session, "http://test", pair_ids, TimeBucket.h1, START, END)
+
+    session = FakeJSONLSession(fail_once_pair_id=4)
+    df = load_candles_jsonl_parallel(
+        session,
+        "http://test",
+        pair_ids,
+        TimeBucket.h1,
+        START,
+        END,
+        pairs_per_chunk=3,
+        time_chunk=time_chunk,
+        max_workers=3,
+        sleep=0,
+    )
+
+    # One chunk was retried
+    chunk_count = len(split_candle_fetch_chunks(pair_ids, START, END, 3, time_chunk))
+    assert len(session.requests) == chunk_count + 1
+
+    assert len(df) == len(expected)
+    assert df.index.is_monotonic_increasing
+    assert df.dtypes.equals(expected.dtypes)
+    assert df.equals(expected.sort_values("pair_id", kind="stable").sort_index(kind="stable"))
+
+
+def test_fetch_candles_by_pair_ids_parallel(tmp_path):
+    """Parallel mode lifts the 1,500 pairs limit and stores the result in the pair candle cache."""
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+    transport.requests = FakeJSONLSession()
+
+    pair_ids = list(range(1000, 3000))
+
+    df = transport.fetch_candles_by_pair_ids(
+        pair_ids,
+        TimeBucket.h1,
+        START,
+        START + datetime.timedelta(hours=2),
+        max_workers=4,
+        pairs_per_chunk=500,
+    )
+    assert len(transport.requests.requests) == 4
+    assert df["pair_id"].nunique() == 2000
+    assert len(df) == 2000 * 3
+
+    # Second fetch is served from the cache
+    transport.requests = FakeJSONLSession()
+    df_2 = transport.fetch_candles_by_pair_ids(
+        pair_ids[0:10],
+        TimeBucket.h1,
+        START,
+        START + datetime.timedelta(hours=2),
+        max_workers=4,
+    )
+    assert len(transport.requests.requests) == 0
+    assert len(df_2) == 10 * 3
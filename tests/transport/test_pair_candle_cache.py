@@ -3,8 +3,10 @@
 import datetime as dt
 import json
 import os
+import pathlib
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -872,3 +874,113 @@ class TestPairCandleCache:
 
             # Pair should need delta fetch, not be skipped
             assert 1 in partition.delta_fetch_ids
+
+
+class TestPairCandleCachePartitioned:
+    """Test the partitioned storage of PairCandleCache."""
+
+    @pytest.fixture
+    def candle_df(self):
+        """Hourly candles for 10 pairs over three months."""
+        timestamps = pd.date_range("2023-01-01", "2023-03-31 23:00", freq="h")
+        df = pd.DataFrame({
+            "timestamp": np.tile(timestamps.values, 10),
+            "pair_id": np.repeat(np.arange(1, 11), len(timestamps)),
+        })
+        df["open"] = df["pair_id"] * 100.0
+        df["close"] = df["open"] + 1
+        return df.set_index("timestamp", drop=False)
+
+    def test_update_and_read(self, tmp_path, candle_df):
+        """Partitioned read gives the same result as masking the full data."""
+        base_path = str(tmp_path / "candles-1h")
+
+        with PairCandleCache(base_path, partitioned=True, pair_buckets=4) as cache:
+            cache.update([candle_df], range(1, 11), dt.datetime(2023, 1, 1), dt.datetime(2023, 3, 31, 23))
+            assert cache.metadata.pairs["1"].end_time == dt.datetime(2023, 3, 31, 23)
+
+        # 4 pair buckets x 3 months
+        assert len(list(pathlib.Path(f"{base_path}.partitioned").glob("*/*/data.parquet"))) == 12
+        assert not os.path.exists(f"{base_path}.parquet")
+
+        with PairCandleCache(base_path, partitioned=True, pair_buckets=4) as cache:
+            start, end = dt.datetime(2023, 1, 31, 12), dt.datetime(2023, 2, 2)
+            df = cache.read([2, 7], start, end)
+            expected = candle_df[
+                candle_df["pair_id"].isin([2, 7]) &
+                (candle_df["timestamp"] >= start) &
+                (candle_df["timestamp"] <= end)
+            ]
+            assert len(df) == len(expected) == 2 * 37
+            assert df.index.name == "timestamp"
+            assert df["pair_id"].tolist() == expected["pair_id"].tolist()
+            assert df["timestamp"].tolist() == expected["timestamp"].tolist()
+
+            # Full data access still works
+            assert len(cache.data) == len(candle_df)
+
+    def test_update_rewrites_touched_partitions_only(self, tmp_path, candle_df):
+        """A delta update does not rewrite old months."""
+        base_path = str(tmp_path / "candles-1h")
+
+        with PairCandleCache(base_path, partitioned=True, pair_buckets=4) as cache:
+            cache.update([candle_df], range(1, 11), dt.datetime(2023, 1, 1), dt.datetime(2023, 3, 31, 23))
+
+        partition_path = pathlib.Path(f"{base_path}.partitioned")
+        mtimes = {p: p.stat().st_mtime_ns for p in partition_path.glob("*/*/data.parquet")}
+
+        delta_df = pd.DataFrame({
+            "timestamp": pd.to_datetime(["2023-03-31 23:00", "2023-04-01 00:00"]),
+            "pair_id": [1, 1],
+            "open": [1.0, 2.0],
+            "close": [1.0, 2.0],
+        })
+
+        with PairCandleCache(base_path, partitioned=True, pair_buckets=4) as cache:
+            cache.update([delta_df], [1], dt.datetime(2023, 3, 31), dt.datetime(2023, 4, 1))
+            assert cache.metadata.pairs["1"].end_time == dt.datetime(2023, 4, 1)
+
+            df = cache.read([1], dt.datetime(2023, 3, 31, 22), dt.datetime(2023, 4, 1))
+            # Updated candle replaced the old one
+            assert df["open"].tolist() == [100.0, 1.0, 2.0]
+
+        changed = {p for p, mtime in mtimes.items() if p.stat().st_mtime_ns != mtime}
+        assert changed == {partition_path / "pair_bucket=1" / "month=2023-03" / "data.parquet"}
+        assert (partition_path / "pair_bucket=1" / "month=2023-04" / "data.parquet").exists()
+
+    def test_migrate_single_file(self, tmp_path, candle_df):
+        """Existing single file cache is moved to partitions."""
+        base_path = str(tmp_path / "candles-1h")
+
+        with PairCandleCache(base_path) as cache:
+            cache.update([candle_df], range(1, 11), dt.datetime(2023, 1, 1), dt.datetime(2023, 3, 31, 23))
+
+        with PairCandleCache(base_path, partitioned=True) as cache:
+            assert not os.path.exists(f"{base_path}.parquet")
+            assert len(cache.metadata.pairs) == 10
+            assert len(cache.read([5])) == len(candle_df) // 10
+
+    def test_read_without_lock(self, tmp_path, candle_df):
+        """Partitioned storage is read without the writer lock, and locked only for updates."""
+        base_path = str(tmp_path / "candles-1h")
+
+        with PairCandleCache(base_path, partitioned=True) as cache:
+            cache.update([candle_df], range(1, 11), dt.datetime(2023, 1, 1), dt.datetime(2023, 3, 31, 23))
+
+        with PairCandleCache(base_path, partitioned=True) as reader:
+            assert reader._lock_context is None
+            partition = reader.metadata.partition_for_fetch([1, 2], dt.datetime(2023, 1, 1), dt.datetime(2023, 2, 1))
+            assert not partition.needs_fetch()
+
+            # Another writer updates the cache meanwhile
+            with PairCandleCache(base_path, partitioned=True) as writer:
+                assert writer.lock_for_update()
+                writer.update([], [11], dt.datetime(2023, 1, 1), dt.datetime(2023, 3, 31, 23))
+
+            assert "11" not in reader.metadata.pairs
+            assert reader.lock_for_update()
+            assert not reader.lock_for_update()
+            # Metadata was loaded again after waiting for the lock
+            assert "11" in reader.metadata.pairs
+
+        assert reader._lock_context is None
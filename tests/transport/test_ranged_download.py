@@ -0,0 +1,172 @@
+"""Segmented and resumable downloads against a local HTTP server."""
+import base64
+import hashlib
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from tradingstrategy.transport.progress_enabled_download import download_with_tqdm_progress_bar
+
+
+DATA = random.Random(1).randbytes(1_000_000)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serve :py:data:`DATA` with optional Range support and broken connections."""
+
+    #: Advertise and honour Range requests
+    ranges = True
+
+    #: Cut this many responses short
+    failures = 0
+
+    #: Bytes sent before cutting a response short
+    fail_after = 50_000
+
+    #: Content-MD5 header to send, if any
+    content_md5 = None
+
+    #: (range header, bytes sent) for each request
+    log = []
+
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        range_header = self.headers.get("Range")
+        start, end = 0, len(DATA)
+        if cls.ranges and range_header:
+            first, last = range_header.removeprefix("bytes=").split("-")
+            start, end = int(first), int(last) + 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(DATA)}")
+        else:
+            self.send_response(200)
+
+        if cls.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if cls.content_md5:
+            self.send_header("Content-MD5", cls.content_md5)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(end - start))
+        self.end_headers()
+
+        body = DATA[start:end]
+        with cls.lock:
+            fail = cls.failures > 0
+            if fail:
+                cls.failures -= 1
+
+        if fail:
+            body = body[0:cls.fail_after]
+            self.close_connection = True
+
+        with cls.lock:
+            cls.log.append((range_header, len(body)))
+
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading the first response after its segment
+            pass
+
+
+@pytest.fixture()
+def server():
+    RangeHandler.ranges = True
+    RangeHandler.failures = 0
+    RangeHandler.content_md5 = None
+    RangeHandler.log = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/candles-all"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _download(url: str, path: str, **kwargs):
+    with requests.Session() as session:
+        return download_with_tqdm_progress_bar(session, path, url, None, 10, "Test", min_segment_size=100_000, chunk_size=10_000, **kwargs)
+
+
+def test_segmented_download(server, tmp_path):
+    """File is downloaded over parallel range requests."""
+    path = (tmp_path / "candles.parquet").as_posix()
+    RangeHandler.content_md5 = base64.b64encode(hashlib.md5(DATA).digest()).decode()
+
+    _download(server, path, segments=4)
+
+    assert open(path, "rb").read() == DATA
+    ranges = sorted(r for r, _ in RangeHandler.log if r)
+    assert ranges == ["bytes=250000-499999", "bytes=500000-749999", "bytes=750000-999999"]
+    assert not os.path.exists(f"{path}.part")
+    assert not os.path.exists(f"{path}.part.json")
+
+
+def test_segmented_download_retry(server, tmp_path):
+    """A broken segment continues from where it stopped."""
+    path = (tmp_path / "candles.parquet").as_posix()
+    RangeHandler.failures = 2
+
+    _download(server, path, segments=2)
+
+    assert open(path, "rb").read() == DATA
+    # Initial response, second segment and two retries
+    assert len(RangeHandler.log) == 4
+    # Retries did not load any byte twice
+    assert sum(size for _, size in RangeHandler.log) == len(DATA)
+
+
+def test_segmented_download_resume(server, tmp_path):
+    """Interrupted download is resumed by the next call."""
+    path = (tmp_path / "candles.parquet").as_posix()
+    RangeHandler.failures = 100
+
+    with pytest.raises(requests.exceptions.RequestException):
+        _download(server, path, segments=4, attempts=1)
+
+    assert not os.path.exists(path)
+    assert os.path.exists(f"{path}.part")
+    assert os.path.exists(f"{path}.part.json")
+
+    RangeHandler.failures = 0
+    RangeHandler.log = []
+    _download(server, path, segments=4)
+
+    assert open(path, "rb").read() == DATA
+    # Only the missing bytes were sent, plus the initial response we did not read
+    sent = sum(size for r, size in RangeHandler.log if r)
+    assert sent == len(DATA) - 4 * 50_000
+
+
+def test_download_without_ranges(server, tmp_path):
+    """Servers without Range support get a single stream download."""
+    path = (tmp_path / "candles.parquet").as_posix()
+    RangeHandler.ranges = False
+    RangeHandler.failures = 1
+
+    _download(server, path)
+
+    assert open(path, "rb").read() == DATA
+    assert len(RangeHandler.log) == 2
+
+
+def test_download_checksum_mismatch(server, tmp_path):
+    """Corrupted file is never moved to the cache path."""
+    path = (tmp_path / "candles.parquet").as_posix()
+    RangeHandler.content_md5 = base64.b64encode(b"x" * 16).decode()
+
+    with pytest.raises(RuntimeError, match="MD5 mismatch"):
+        _download(server, path)
+
+    assert not os.path.exists(path)
+    assert not os.path.exists(f"{path}.part")
+    assert not os.path.exists(f"{path}.part.json")
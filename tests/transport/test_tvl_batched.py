@@ -0,0 +1,146 @@
+"""Batched TVL download using a fake /candles endpoint."""
+import datetime
+import threading
+import time
+from unittest.mock import Mock
+
+import pandas as pd
+
+from tradingstrategy.timebucket import TimeBucket
+from tradingstrategy.transport.cache import CachedHTTPTransport
+from tradingstrategy.utils.time import to_int_unix_timestamp
+
+
+START = datetime.datetime(2024, 1, 1)
+END = datetime.datetime(2024, 1, 10)
+
+
+class FakeCandlesSession:
+    """Serve daily TVL candles for any pair ids, filtered by the request params.
+
+    - Pairs >= 900 have no TVL data
+
+    - Pairs >= 500 are Uniswap v3 pools. If ``reject_mixed`` is set,
+      they cannot be requested together with Uniswap v2 pairs
+
+    - Without ``start`` the data starts from :py:data:`START`
+    """
+
+    def __init__(self, reject_mixed=False):
+        self.requests = []
+        self.lock = threading.Lock()
+        self.reject_mixed = reject_mixed
+
+    def get(self, url, params, timeout):
+        with self.lock:
+            self.requests.append(params)
+
+        pair_ids = [int(p) for p in params["pair_ids"].split(",")]
+
+        if self.reject_mixed and len({pair_id >= 500 for pair_id in pair_ids}) > 1:
+            return Mock(status_code=422, text="Cannot mix Uniswap v2 and v3 pairs")
+
+        start = datetime.datetime.fromisoformat(params["start"]) if "start" in params else START
+        end = datetime.datetime.fromisoformat(params["end"])
+
+        reply = {}
+        for pair_id in pair_ids:
+            if pair_id >= 900:
+                continue
+            candles = []
+            ts = start
+            while ts <= end:
+                value = pair_id * 1000 + ts.day
+                candles.append({"ts": to_int_unix_timestamp(ts), "o": value, "h": value + 1, "l": value - 1, "c": value})
+                ts += datetime.timedelta(days=1)
+            reply[str(pair_id)] = candles
+
+        return Mock(status_code=200, json=Mock(return_value=reply))
+
+
+def test_fetch_tvl_by_pair_ids_batched(tmp_path):
+    """Many pairs are loaded per request and cached in one store."""
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+    transport.requests = FakeCandlesSession()
+
+    pair_ids = list(range(1, 251)) + [901]
+
+    df = transport.fetch_tvl_by_pair_ids(
+        pair_ids,
+        TimeBucket.d1,
+        START,
+        END,
+        pairs_per_request=100,
+    )
+
+    assert len(transport.requests.requests) == 3
+    assert df["pair_id"].nunique() == 250
+    assert len(df) == 250 * 10
+    assert df.index.names == ["pair_id", "timestamp"]
+    assert df.index.is_monotonic_increasing
+
+    row = df.loc[(7, pd.Timestamp("2024-01-03"))]
+    assert row["close"] == 7003
+    assert row["high"] == 7004
+
+    # Served from the cache
+    transport.requests = FakeCandlesSession()
+    df_2 = transport.fetch_tvl_by_pair_ids(
+        pair_ids[0:10],
+        TimeBucket.d1,
+        START,
+        END,
+    )
+    assert len(transport.requests.requests) == 0
+    assert len(df_2) == 10 * 10
+    assert df_2["close"].equals(df.loc[df["pair_id"] <= 10, "close"])
+
+    # Only the new pair is loaded
+    df_3 = transport.fetch_tvl_by_pair_ids(
+        [1, 2, 300],
+        TimeBucket.d1,
+        START,
+        END,
+    )
+    assert len(transport.requests.requests) == 1
+    assert transport.requests.requests[0]["pair_ids"] == "300"
+    assert len(df_3) == 3 * 10
+
+
+def test_fetch_tvl_by_pair_ids_mixed_pool_types(tmp_path):
+    """A batch the server refuses is loaded again pair by pair, without retrying the batch."""
+    pair_ids = [1, 2, 3, 501, 502]
+
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=(tmp_path / "batched").as_posix())
+    transport.requests = FakeCandlesSession()
+    expected = transport.fetch_tvl_by_pair_ids(pair_ids, TimeBucket.d1, START, END)
+    assert len(transport.requests.requests) == 1
+
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=(tmp_path / "mixed").as_posix())
+    transport.requests = FakeCandlesSession(reject_mixed=True)
+    started = time.perf_counter()
+    df = transport.fetch_tvl_by_pair_ids(pair_ids, TimeBucket.d1, START, END)
+
+    # The batch is requested once, then one request per pair, no retry sleeps
+    assert [r["pair_ids"] for r in transport.requests.requests] == ["1,2,3,501,502", "1", "2", "3", "501", "502"]
+    assert time.perf_counter() - started < 10
+
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_fetch_tvl_by_pair_ids_from_genesis_cached(tmp_path):
+    """TVL without a start time is cached for the pair set."""
+    transport = CachedHTTPTransport(download_func=Mock(), cache_path=tmp_path.as_posix())
+    transport.requests = FakeCandlesSession()
+
+    df = transport.fetch_tvl_by_pair_ids([1, 2], TimeBucket.d1, end_time=END)
+    assert len(transport.requests.requests) == 1
+    assert len(df) == 2 * 10
+
+    df_2 = transport.fetch_tvl_by_pair_ids([2, 1], TimeBucket.d1, end_time=END)
+    assert len(transport.requests.requests) == 1
+    pd.testing.assert_frame_equal(df_2, df)
+
+    # Different pair set is a different cache entry
+    transport.fetch_tvl_by_pair_ids([1, 2, 3], TimeBucket.d1, end_time=END)
+    assert len(transport.requests.requests) == 2
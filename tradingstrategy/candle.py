@@ -17,8 +17,9 @@ import logging
 import datetime
 import warnings
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, TypedDict, cast
+from typing import Iterable, List, Optional, Tuple, TypedDict, cast
 
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 from dataclasses_json import dataclass_json
@@ -665,6 +666,118 @@ class GroupedCandleUniverse(PairGroupedUniverse):
             f"Trading pair page link: {link}"
             )
 
+    def get_prices_with_tolerance(
+        self,
+        pairs: Iterable[PrimaryKey] | np.ndarray,
+        when: pd.Timestamp | datetime.datetime | pd.DatetimeIndex | np.ndarray,
+        tolerance: pd.Timedelta,
+        kind="close",
+        ignore_forward_fill: bool = False,
+        raise_on_unavailable: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get prices for many trading pairs at once, or before within a time range tolerance.
+
+        Vectorised version of :py:meth:`get_price_with_tolerance`.
+        All lookups are done in one binary search pass over the pair-sorted
+        timestamp data, instead of pandas index lookups per pair.
+        Useful e.g. for revaluing a portfolio with hundreds of positions.
+
+        Example:
+
+        .. code-block:: python
+
+            prices, distances = universe.get_prices_with_tolerance(
+                pairs=[1, 2, 3],
+                when=pd.Timestamp("2020-02-01 00:05"),
+                tolerance=pd.Timedelta(30, "m"),
+            )
+
+            # Pair 3 had no candle within the tolerance
+            assert np.isnan(prices[2])
+            assert np.isnat(distances[2])
+
+        :param pairs:
+            Array of trading pair ids.
+
+        :param when:
+            Timestamp to query for all pairs, or an array of timestamps, one per pair.
+
+        :param tolerance:
+            How far to the past we can look for a candle. Same as in :py:meth:`get_price_with_tolerance`.
+
+        :param kind:
+            One of OHLC data points: "open", "close", "low", "high", "volume"
+
+        :param ignore_forward_fill:
+            Ignore rows where column ``forward_filled`` is set to True.
+
+        :param raise_on_unavailable:
+            Raise :py:class:`CandleSampleUnavailable` if any of the pairs does not have a price,
+            instead of returning `NaN` for it.
+
+        :return:
+            Tuple (prices, distances) of NumPy arrays in the same order as `pairs`.
+
+            Distances are `timedelta64[ns]` between the wanted timestamp and the candle timestamp.
+
+            If a pair has no candle within the tolerance,
+            its price is `NaN` and its distance is `NaT`.
+
+        :raise CandleSampleUnavailable:
+            If `raise_on_unavailable` is set and prices are missing.
+        """
+
+        assert kind in ("open", "close", "high", "low", "volume"), f"Got kind: {kind}"
+        assert isinstance(tolerance, pd.Timedelta), f"Expected pd.Timedelta, got {tolerance}"
+
+        pair_ids = np.asarray(pairs, dtype=np.int64)
+
+        if isinstance(when, (pd.Timestamp, datetime.datetime, np.datetime64)):
+            when = np.full(len(pair_ids), pd.Timestamp(when).to_datetime64(), dtype="datetime64[ns]")
+        else:
+            when = pd.DatetimeIndex(when).to_numpy(dtype="datetime64[ns]")
+            assert len(when) == len(pair_ids), f"Got {len(when)} timestamps for {len(pair_ids)} pairs"
+
+        offset_index, df = self.get_pair_sorted_data()
+
+        prices = np.full(len(pair_ids), np.nan)
+        distances = np.full(len(pair_ids), np.timedelta64("NaT"), dtype="timedelta64[ns]")
+
+        if len(df) > 0:
+            rows = offset_index.get_rows_at_or_before(pair_ids, when)
+
+            if ignore_forward_fill:
+                if "forward_filled" in df.columns:
+                    real_rows = offset_index.get_last_rows_where(
+                        (df["forward_filled"] != True).to_numpy(),
+                        cache_key="forward_filled",
+                    )
+                    rows = np.where(rows >= 0, real_rows[np.maximum(rows, 0)], -1)
+                else:
+                    logger.warning("get_prices_with_tolerance(ignore_forward_fill=True) called, but no 'forward_filled' column found in the candles dataframe.")
+
+            found = rows >= 0
+            safe_rows = np.maximum(rows, 0)
+            candle_timestamps = offset_index.timestamps[safe_rows].astype("datetime64[ns]")
+            within = found & (candle_timestamps >= when - tolerance.to_timedelta64())
+
+            values = df[kind].to_numpy(dtype="float64")
+            prices = np.where(within, values[safe_rows], np.nan)
+            distances = np.where(within, when - candle_timestamps, distances)
+        else:
+            within = np.zeros(len(pair_ids), dtype=bool)
+
+        if raise_on_unavailable and not within.all():
+            missing = pair_ids[~within]
+            raise CandleSampleUnavailable(
+                f"Could not find candle data for {len(missing)} pairs out of {len(pair_ids)}\n"
+                f"- Column '{kind}'\n"
+                f"- Data lag tolerance is set to {tolerance}\n"
+                f"- First missing pair ids: {missing[:5].tolist()}\n"
+            )
+
+        return prices, distances
+
     def calculate_returns(
         self,
         column="close",
@@ -23,7 +23,7 @@ import pandas as pd
 
 from tradingstrategy.candle import TradingPairDataAvailability
 from tradingstrategy.environment.default_environment import DefaultClientEnvironment, DEFAULT_SETTINGS_PATH
-from tradingstrategy.reader import BrokenData, read_parquet
+from tradingstrategy.reader import BrokenData, read_parquet, read_parquet_filtered
 from tradingstrategy.token_metadata import TokenMetadata
 from tradingstrategy.top import TopPairsReply, TopPairMethod
 from tradingstrategy.transport.pyodide import PYODIDE_API_KEY
@@ -373,6 +373,49 @@ class Client(BaseClient):
         assert path is not None, "fetch_candles_all_time() returned None"
         return read_parquet(path)
 
+    @_retry_corrupted_parquet_fetch
+    def fetch_all_candles_filtered(
+        self,
+        bucket: TimeBucket,
+        pair_ids: Collection[PrimaryKey] | None = None,
+        start_time: datetime.datetime | pd.Timestamp | None = None,
+        end_time: datetime.datetime | pd.Timestamp | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """Load a subset of the all-time candle dataset as a DataFrame.
+
+        - Same data as `fetch_all_candles(bucket).to_pandas()` followed by
+          a pair and time range filter, but without loading the full dataset to the memory
+
+        - Filters are pushed down to the Parquet reader, see :py:func:`tradingstrategy.reader.read_parquet_filtered`
+
+        Example:
+
+        .. code-block:: python
+
+            df = client.fetch_all_candles_filtered(
+                TimeBucket.h1,
+                pair_ids=pair_universe.get_all_pair_ids(),
+                start_time=datetime.datetime(2024, 1, 1),
+                columns=["pair_id", "timestamp", "open", "high", "low", "close", "volume"],
+            )
+
+        :param pair_ids:
+            Pairs to load, or all pairs
+
+        :param start_time:
+            Start time, inclusive
+
+        :param end_time:
+            End time, inclusive
+
+        :param columns:
+            Columns to load, or all columns
+        """
+        path = self.transport.fetch_candles_all_time(bucket)
+        assert path is not None, "fetch_candles_all_time() returned None"
+        return read_parquet_filtered(path, pair_ids=pair_ids, start_time=start_time, end_time=end_time, columns=columns)
+
     def fetch_candles_by_pair_ids(self,
           pair_ids: Collection[PrimaryKey],
           bucket: TimeBucket,
@@ -381,6 +424,9 @@ class Client(BaseClient):
           max_bytes: Optional[int] = None,
           progress_bar_description: Optional[str] = None,
           attempts=5,
+          max_workers: Optional[int] = None,
+          pairs_per_chunk: int = 250,
+          time_chunk: Optional[datetime.timedelta] = None,
         ) -> pd.DataFrame:
         """Fetch candles for particular trading pairs.
 
@@ -412,6 +458,17 @@ class Client(BaseClient):
         :param progress_bar_description:
             Display on download progress bar.
 
+        :param max_workers:
+            Download large pair sets in parallel chunks using this many concurrent requests.
+
+            Lifts the 1,500 pairs limit of a single request.
+
+        :param pairs_per_chunk:
+            Max pair ids per a request when `max_workers` is set.
+
+        :param time_chunk:
+            Split the time range to windows of this length when `max_workers` is set.
+
         :return:
             Candles dataframe
 
@@ -435,6 +492,9 @@ class Client(BaseClient):
             max_bytes=max_bytes,
             progress_bar_description=progress_bar_description,
             attempts=attempts,
+            max_workers=max_workers,
+            pairs_per_chunk=pairs_per_chunk,
+            time_chunk=time_chunk,
         )
 
     def fetch_tvl_by_pair_ids(self,
@@ -444,6 +504,7 @@ class Client(BaseClient):
         end_time: Optional[AnyTimestamp] = None,
         progress_bar_description: Optional[str] = None,
         query_type: OHLCVCandleType = OHLCVCandleType.tvl_v1,
+        pairs_per_request: int = 100,
     ) -> pd.DataFrame:
         """Fetch TVL/liquidity candles for particular trading pairs.
 
@@ -512,6 +573,9 @@ class Client(BaseClient):
         :param progress_bar_description:
             Display a download progress bar using `tqdm_loggable` if given.
 
+        :param pairs_per_request:
+            How many pairs are loaded in a single request.
+
         :return:
             TVL dataframe.
 
@@ -539,6 +603,7 @@ class Client(BaseClient):
             end_time,
             progress_bar_description=progress_bar_description,
             query_type=query_type,
+            pairs_per_request=pairs_per_request,
         )
 
     def fetch_clmm_liquidity_provision_candles_by_pair_ids(self,
@@ -1029,6 +1094,29 @@ class Client(BaseClient):
         path = self.transport.fetch_liquidity_all_time(bucket)
         return read_parquet(path)
 
+    @_retry_corrupted_parquet_fetch
+    def fetch_all_liquidity_samples_filtered(
+        self,
+        bucket: TimeBucket,
+        pair_ids: Collection[PrimaryKey] | None = None,
+        start_time: datetime.datetime | pd.Timestamp | None = None,
+        end_time: datetime.datetime | pd.Timestamp | None = None,
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None,
+    ) -> pd.DataFrame:
+        """Load a subset of the all-time liquidity dataset as a DataFrame.
+
+        - Same data as `fetch_all_liquidity_samples(bucket).to_pandas()` followed by
+          a pair and time range filter, but without loading the full dataset to the memory
+
+        - See :py:meth:`fetch_all_candles_filtered` for the arguments
+
+        - `filters` are additional Parquet row filters, like `[("high", ">", 1_000_000)]`,
+          see :py:func:`tradingstrategy.reader.read_parquet_filtered`
+        """
+        path = self.transport.fetch_liquidity_all_time(bucket)
+        return read_parquet_filtered(path, pair_ids=pair_ids, start_time=start_time, end_time=end_time, columns=columns, filters=filters)
+
     @_retry_corrupted_parquet_fetch
     def fetch_lending_reserve_universe(self) -> LendingReserveUniverse:
         """Load a cache the lending reserve universe.
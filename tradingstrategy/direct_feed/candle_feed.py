@@ -1,14 +1,19 @@
-from dataclasses import dataclass
-from typing import List, Iterable
+import bisect
+import logging
+from dataclasses import dataclass, replace
+from typing import List, Iterable, Optional, Dict
 
 import pandas as pd
 
-from tradingstrategy.direct_feed.ohlcv_aggregate import resample_trades_into_ohlcv, get_feed_for_pair, truncate_ohlcv
+from tradingstrategy.direct_feed.ohlcv_aggregate import get_feed_for_pair, truncate_ohlcv, StreamingOHLCVAggregator, OpenCandle
 from tradingstrategy.direct_feed.timeframe import Timeframe
-from tradingstrategy.direct_feed.trade_feed import TradeDelta
+from tradingstrategy.direct_feed.trade_feed import TradeDelta, TradeFeed
 from tradingstrategy.direct_feed.direct_feed_pair import PairId
 
 
+logger = logging.getLogger(__name__)
+
+
 class CandleFeed:
     """Create candles for certain time frame for multiple pairs.
 
@@ -19,11 +24,15 @@ class CandleFeed:
     - Can only generate candles of one timeframe
 
     - May contain multiple pairs in one candle feed
+
+    - Trades are folded to candles one by one with :py:class:`StreamingOHLCVAggregator`.
+      Only trades new since the last cycle are processed, unless the chain reorganised.
     """
 
     def __init__(self,
                  pairs: List[PairId],
                  timeframe: Timeframe,
+                 trade_feed: Optional[TradeFeed] = None,
                  ):
         """
 
@@ -35,15 +44,29 @@ class CandleFeed:
         :param freq:
             Pandas frequency string e.g. "1H", "min"
 
-        :param candle_offset:
+        :param trade_feed:
+            The trade feed the deltas come from.
+
+            Needed if the candle timeframe is coarser than the trade feed timeframe:
+            a reorg delta starts in the middle of a candle, and the earlier trades
+            of the candle are taken from the trade feed buffer.
         """
         for p in pairs:
             assert type(p) == str, f"Pairs must be a list of pair ids (str). Got: {p}"
         self.pairs = pairs
         self.timeframe = timeframe
-        self.candle_df = pd.DataFrame()
+        self.trade_feed = trade_feed
+        self.aggregator = StreamingOHLCVAggregator(timeframe)
         self.last_cycle = 0
 
+        #: Candles that cannot receive trades anymore
+        self.closed_candle_df = pd.DataFrame()
+
+        #: Last block folded to the candles
+        self.last_block: Optional[int] = None
+
+        self._candle_df: Optional[pd.DataFrame] = None
+
     def __repr__(self):
         if len(self.pairs) == 1:
             name = f"CandleFeed for {self.pairs[0]}"
@@ -60,6 +83,22 @@ class CandleFeed:
 
         return f"<{name} using timeframe {self.timeframe.freq}, having data {first_ts} - {last_ts} total {candle_count:,} candles>"
 
+    @property
+    def candle_df(self) -> pd.DataFrame:
+        """All candles, including the open ones, indexed by (pair, timestamp)."""
+        if self._candle_df is None:
+            open_candles = self.aggregator.get_open_candles()
+            if len(open_candles) > 0:
+                open_df = StreamingOHLCVAggregator.to_dataframe(open_candles)
+                if len(self.closed_candle_df) > 0:
+                    df = pd.concat([self.closed_candle_df, open_df])
+                else:
+                    df = open_df
+                self._candle_df = df.sort_index()
+            else:
+                self._candle_df = self.closed_candle_df
+        return self._candle_df
+
     def apply_delta(self, delta: TradeDelta, initial_load=False, label_candles=True):
         """Add new candle data generated from the latest blockchain input.
 
@@ -79,17 +118,29 @@ class CandleFeed:
             This must be done before candle data is grouped by pairs.
         """
 
-        if len(delta.trades) > 0:
-
-            cropped_df = truncate_ohlcv(self.candle_df, delta.start_ts)
-
-            candles = resample_trades_into_ohlcv(delta.trades, self.timeframe)
-
-            # Only if we have any new candles from our timeframe add them to the
-            # in-memory buffer
-            if len(candles) > 0:
-                self.candle_df = pd.concat([cropped_df, candles])
-
+        if not delta.reorg_detected and self.last_block is not None and delta.unadjusted_start_block > self.last_block:
+            # Normal chain progress, only fold in the trades we have not seen
+            closed = self.aggregator.fold_trades(delta.new_trades)
+        else:
+            # Initial load or chain reorganisation:
+            # throw away candles from the start of the delta and replay its trades
+            reset_ts = self.timeframe.round_timestamp_down(delta.start_ts)
+            self.closed_candle_df = truncate_ohlcv(self.closed_candle_df, reset_ts)
+            self.aggregator.reset(reset_ts)
+            trades = get_replay_trades(delta, reset_ts, self.trade_feed, rebuild=self.last_block is not None)
+            closed = self.aggregator.fold_trades(trades) if len(trades) > 0 else []
+
+        # Only if we have any new closed candles add them to the
+        # in-memory buffer
+        if len(closed) > 0:
+            closed_df = StreamingOHLCVAggregator.to_dataframe(closed)
+            if len(self.closed_candle_df) > 0:
+                self.closed_candle_df = pd.concat([self.closed_candle_df, closed_df])
+            else:
+                self.closed_candle_df = closed_df
+
+        self._candle_df = None
+        self.last_block = delta.end_block
         self.last_cycle = delta.cycle
 
     def get_candles_by_pair(self, pair: PairId) -> pd.DataFrame:
@@ -109,6 +160,229 @@ class CandleFeed:
             yield self.get_candles_by_pair(p)
 
 
+class MultiTimeframeCandleFeed:
+    """Create candles for several timeframes for multiple pairs.
+
+    - Takes :py:class:`TradeFeed` as input, like :py:class:`CandleFeed`
+
+    - Trades are folded to candles of the smallest timeframe only once
+
+    - Closed base candles are rolled up to the higher timeframes incrementally
+
+    - Candles of all timeframes are kept in one store,
+      and a single :py:meth:`apply_delta` updates all of them
+
+    All timeframes must have fixed frequencies that are multiples of the smallest timeframe.
+    """
+
+    def __init__(self,
+                 pairs: List[PairId],
+                 timeframes: List[Timeframe],
+                 trade_feed: Optional[TradeFeed] = None,
+                 ):
+        """
+
+        :param pairs:
+            List of pairs this address contains.
+
+            Symbolic names or addresses.
+
+        :param timeframes:
+            Timeframes to generate candles for, e.g. 1min, 5min, 1h and 1d.
+
+        :param trade_feed:
+            The trade feed the deltas come from.
+
+            See :py:class:`CandleFeed`.
+        """
+        for p in pairs:
+            assert type(p) == str, f"Pairs must be a list of pair ids (str). Got: {p}"
+        assert len(timeframes) > 0, "No timeframes given"
+
+        aggregators = sorted((StreamingOHLCVAggregator(tf) for tf in set(timeframes)), key=lambda a: a.step or 0)
+        base = aggregators[0]
+        for a in aggregators:
+            assert a.step, f"Only fixed frequency timeframes supported, got {a.timeframe}"
+            assert a.step % base.step == 0, f"{a.timeframe} is not a multiple of the base timeframe {base.timeframe}"
+            assert (a.offset - base.offset) % base.step == 0, f"{a.timeframe} offset does not align with the base timeframe {base.timeframe}"
+
+        self.pairs = pairs
+        self.trade_feed = trade_feed
+        self.timeframes = [a.timeframe for a in aggregators]
+        self.base_timeframe = base.timeframe
+        self.aggregator = base
+        self.rollups: Dict[Timeframe, StreamingOHLCVAggregator] = {a.timeframe: a for a in aggregators[1:]}
+        self.last_cycle = 0
+
+        #: Last block folded to the candles
+        self.last_block: Optional[int] = None
+
+        #: Closed candles of all timeframes.
+        #:
+        #: Timeframe -> pair -> candles in time order
+        self.closed_candles: Dict[Timeframe, Dict[PairId, List[OpenCandle]]] = {tf: {} for tf in self.timeframes}
+
+        self._candle_dfs: Dict[Timeframe, pd.DataFrame] = {}
+
+    def __repr__(self):
+        freqs = ", ".join(tf.freq for tf in self.timeframes)
+        return f"<MultiTimeframeCandleFeed for {len(self.pairs)} pairs using timeframes {freqs}>"
+
+    def apply_delta(self, delta: TradeDelta):
+        """Add new candle data of all timeframes from the latest blockchain input.
+
+        :param delta:
+            New trades coming in
+        """
+
+        if not delta.reorg_detected and self.last_block is not None and delta.unadjusted_start_block > self.last_block:
+            # Normal chain progress, only fold in the trades we have not seen
+            closed = self.aggregator.fold_trades(delta.new_trades)
+        else:
+            # Initial load or chain reorganisation:
+            # throw away candles from the start of the delta and replay its trades
+            reset_ts = self.base_timeframe.round_timestamp_down(delta.start_ts)
+            self._reset(reset_ts)
+            trades = get_replay_trades(delta, reset_ts, self.trade_feed, rebuild=self.last_block is not None)
+            closed = self.aggregator.fold_trades(trades) if len(trades) > 0 else []
+
+        self._add_closed(self.base_timeframe, closed)
+        for tf, rollup in self.rollups.items():
+            self._add_closed(tf, [c for c in map(rollup.fold_candle, closed) if c is not None])
+
+        self._candle_dfs = {}
+        self.last_block = delta.end_block
+        self.last_cycle = delta.cycle
+
+    def get_candle_df(self, timeframe: Timeframe) -> pd.DataFrame:
+        """All candles of a timeframe, including the open ones, indexed by (pair, timestamp)."""
+        df = self._candle_dfs.get(timeframe)
+        if df is None:
+            candles = [c for pair_candles in self.closed_candles[timeframe].values() for c in pair_candles]
+            candles += self.get_open_candles(timeframe)
+            df = StreamingOHLCVAggregator.to_dataframe(candles).sort_index()
+            self._candle_dfs[timeframe] = df
+        return df
+
+    def get_open_candles(self, timeframe: Timeframe) -> List[OpenCandle]:
+        """Candles of a timeframe still receiving trades.
+
+        Higher timeframe candles include the open base timeframe candle.
+        """
+        base_open = self.aggregator.open_candles
+        if timeframe == self.base_timeframe:
+            return list(base_open.values())
+
+        rollup = self.rollups[timeframe]
+        candles = []
+        for pair in set(rollup.open_candles) | set(base_open):
+            current = rollup.open_candles.get(pair)
+            base = base_open.get(pair)
+            if base is None:
+                candles.append(current)
+                continue
+
+            candle_ts = rollup.get_candle_timestamp(base.timestamp)
+            if current is not None and current.timestamp == candle_ts:
+                merged = replace(current)
+                merged.merge(base)
+                candles.append(merged)
+            else:
+                if current is not None:
+                    candles.append(current)
+                candles.append(replace(base, timestamp=candle_ts))
+        return candles
+
+    def get_candles_by_pair(self, pair: PairId, timeframe: Timeframe) -> pd.DataFrame:
+        return get_feed_for_pair(self.get_candle_df(timeframe), pair)
+
+    def get_last_block_number(self) -> int:
+        """Get overall last block number for which we have valid data.
+
+        :return:
+            block number (inclusive)
+        """
+        return self.get_candle_df(self.base_timeframe)["end_block"].max()
+
+    def iterate_pairs(self, timeframe: Timeframe) -> Iterable[pd.DataFrame]:
+        """Get candles of a timeframe for all pairs we are tracking."""
+        for p in self.pairs:
+            yield self.get_candles_by_pair(p, timeframe)
+
+    def _add_closed(self, timeframe: Timeframe, candles: List[OpenCandle]):
+        store = self.closed_candles[timeframe]
+        for c in candles:
+            store.setdefault(c.pair, []).append(c)
+
+    def _reset(self, reset_ts: pd.Timestamp):
+        """Drop candles from ``reset_ts`` onwards and rebuild the open higher timeframe candles."""
+        base_store = self.closed_candles[self.base_timeframe]
+        self._truncate(base_store, reset_ts.value)
+        self.aggregator.reset(reset_ts)
+
+        for tf, rollup in self.rollups.items():
+            rollup_reset_ts = tf.round_timestamp_down(reset_ts)
+            self._truncate(self.closed_candles[tf], rollup_reset_ts.value)
+            rollup.reset(rollup_reset_ts)
+
+            # Re-fold the closed base candles belonging to the reset higher timeframe candle
+            for pair_candles in base_store.values():
+                start = bisect.bisect_left(pair_candles, rollup_reset_ts.value, key=lambda c: c.timestamp)
+                for c in pair_candles[start:]:
+                    rollup.fold_candle(c)
+
+    @staticmethod
+    def _truncate(store: Dict[PairId, List[OpenCandle]], ts: int):
+        for pair_candles in store.values():
+            del pair_candles[bisect.bisect_left(pair_candles, ts, key=lambda c: c.timestamp):]
+
+
+def get_replay_trades(
+    delta: TradeDelta,
+    reset_ts: pd.Timestamp,
+    trade_feed: Optional[TradeFeed],
+    rebuild: bool,
+) -> pd.DataFrame:
+    """Get trades to rebuild candles from ``reset_ts`` onwards.
+
+    - The delta trades start from the trade feed timeframe snap at ``delta.start_ts``.
+      If the candle timeframe is coarser, the candle at ``reset_ts`` also needs
+      the earlier trades, which are taken from the trade feed buffer.
+
+    :param reset_ts:
+        Start of the first rebuilt candle
+
+    :param rebuild:
+        We had candles from before, so a partial first candle would be wrong
+    """
+    if reset_ts >= delta.start_ts:
+        return delta.trades
+
+    if trade_feed is None:
+        if rebuild:
+            logger.warning(
+                "Candle at %s rebuilt without trades before %s, pass trade_feed to the candle feed",
+                reset_ts,
+                delta.start_ts,
+            )
+        return delta.trades
+
+    trades_df = trade_feed.trades_df
+    if len(trades_df) == 0:
+        return delta.trades
+
+    # Blocks before the delta start have earlier timestamps
+    timestamps = trades_df["timestamp"]
+    earlier = trades_df[(timestamps >= reset_ts) & (timestamps < delta.start_ts)]
+    if len(earlier) == 0:
+        return delta.trades
+
+    if len(delta.trades) == 0:
+        return earlier
+
+    return pd.concat([earlier, delta.trades])
+
+
 def prepare_raw_candle_data(df: pd.DataFrame) -> pd.DataFrame:
     """Convert all Python Decimal objects to easier to deal floats in DataFrame."""
     return df.astype({
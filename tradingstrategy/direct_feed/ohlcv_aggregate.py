@@ -2,8 +2,10 @@
 
 
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
 from tradingstrategy.direct_feed.timeframe import Timeframe
@@ -154,6 +156,277 @@ def resample_trades_into_ohlcv(
     return df2
 
 
+@dataclass(slots=True)
+class OpenCandle:
+    """Running state of one candle of one pair.
+
+    Updated in place by :py:class:`StreamingOHLCVAggregator` as trades come in.
+    Values are kept in the type of the incoming trade data,
+    e.g. :py:class:`Decimal` for raw trades.
+    """
+
+    pair: PairId
+
+    #: Candle start as UNIX nanoseconds
+    timestamp: int
+
+    start_block: int
+    end_block: int
+
+    open: object
+    high: object
+    low: object
+    close: object
+
+    #: Sum of absolute trade amounts
+    volume: object
+
+    #: Sum of exchange rates, for the average
+    exchange_rate_sum: object
+
+    trade_count: int
+    buys: int
+    sells: int
+
+    def fold(self, block_number: int, price, amount, exchange_rate):
+        """Add a trade to this candle."""
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.end_block = block_number
+        self.volume += abs(amount)
+        self.exchange_rate_sum += exchange_rate
+        self.trade_count += 1
+        if amount > 0:
+            self.buys += 1
+        elif amount < 0:
+            self.sells += 1
+
+    def merge(self, other: "OpenCandle"):
+        """Add a later candle of a finer timeframe to this candle."""
+        if other.high > self.high:
+            self.high = other.high
+        if other.low < self.low:
+            self.low = other.low
+        self.close = other.close
+        self.end_block = other.end_block
+        self.volume += other.volume
+        self.exchange_rate_sum += other.exchange_rate_sum
+        self.trade_count += other.trade_count
+        self.buys += other.buys
+        self.sells += other.sells
+
+    def to_row(self) -> tuple:
+        """Candle as a row in :py:func:`resample_trades_into_ohlcv` column order."""
+        return (
+            self.open,
+            self.high,
+            self.low,
+            self.close,
+            pd.Timestamp(self.timestamp),
+            float(self.exchange_rate_sum) / self.trade_count,
+            self.start_block,
+            self.end_block,
+            self.volume,
+            float(self.volume) / self.trade_count,
+            self.buys,
+            self.sells,
+        )
+
+
+#: Columns of candle DataFrames, as produced by :py:func:`resample_trades_into_ohlcv`
+CANDLE_COLUMNS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "timestamp",
+    "exchange_rate",
+    "start_block",
+    "end_block",
+    "volume",
+    "avg_trade",
+    "buys",
+    "sells",
+]
+
+
+class StreamingOHLCVAggregator:
+    """Build OHLCV candles incrementally, one trade at a time.
+
+    - Keeps one open candle per pair
+
+    - Each trade is folded to the open candle of its pair in O(1)
+
+    - When a trade falls to a later candle, the open candle is closed and returned
+
+    - Produces the same candles as :py:func:`resample_trades_into_ohlcv`
+
+    Trades must be fed in block order.
+    """
+
+    def __init__(self, timeframe: Timeframe):
+        self.timeframe = timeframe
+        self.offset = timeframe.offset.value
+
+        # Fixed frequencies can be floored with integer math,
+        # calendar frequencies like months go through Pandas
+        try:
+            self.step = pd.Timedelta(timeframe.freq).value
+        except ValueError:
+            self.step = None
+
+        self.open_candles: Dict[PairId, OpenCandle] = {}
+
+    def __repr__(self):
+        return f"<StreamingOHLCVAggregator {self.timeframe} with {len(self.open_candles)} open candles>"
+
+    def get_candle_timestamp(self, ts: int) -> int:
+        """Get the candle start for a UNIX nanosecond timestamp.
+
+        Same as :py:meth:`Timeframe.round_timestamp_down`.
+        """
+        if self.step:
+            return ts - ts % self.step + self.offset
+        return self.timeframe.round_timestamp_down(pd.Timestamp(ts)).value
+
+    def fold_trade(
+        self,
+        pair: PairId,
+        timestamp: int,
+        block_number: int,
+        price,
+        amount,
+        exchange_rate,
+    ) -> Optional[OpenCandle]:
+        """Add one trade.
+
+        :param timestamp:
+            Trade timestamp as UNIX nanoseconds
+
+        :return:
+            The previous candle of the pair, if this trade closed it
+        """
+        candle_ts = self.get_candle_timestamp(timestamp)
+        candle = self.open_candles.get(pair)
+
+        if candle is not None and candle.timestamp == candle_ts:
+            candle.fold(block_number, price, amount, exchange_rate)
+            return None
+
+        assert candle is None or candle.timestamp < candle_ts, f"Trades out of order for {pair}: candle {candle.timestamp} already open, got trade for {candle_ts}"
+
+        self.open_candles[pair] = OpenCandle(
+            pair=pair,
+            timestamp=candle_ts,
+            start_block=block_number,
+            end_block=block_number,
+            open=price,
+            high=price,
+            low=price,
+            close=price,
+            volume=abs(amount),
+            exchange_rate_sum=exchange_rate,
+            trade_count=1,
+            buys=int(amount > 0),
+            sells=int(amount < 0),
+        )
+        return candle
+
+    def fold_candle(self, candle: OpenCandle) -> Optional[OpenCandle]:
+        """Add a closed candle of a finer timeframe.
+
+        Used to roll up candles to higher timeframes.
+        The finer timeframe must divide this timeframe.
+
+        :return:
+            The previous candle of the pair, if this candle closed it
+        """
+        candle_ts = self.get_candle_timestamp(candle.timestamp)
+        current = self.open_candles.get(candle.pair)
+
+        if current is not None and current.timestamp == candle_ts:
+            current.merge(candle)
+            return None
+
+        assert current is None or current.timestamp < candle_ts, f"Candles out of order for {candle.pair}: candle {current.timestamp} already open, got candle for {candle_ts}"
+
+        self.open_candles[candle.pair] = replace(candle, timestamp=candle_ts)
+        return current
+
+    def fold_trades(self, df: pd.DataFrame) -> List[OpenCandle]:
+        """Add trades from a trade DataFrame.
+
+        :param df:
+            Trades with columns of :py:class:`tradingstrategy.direct_feed.trade_feed.Trade`
+
+        :return:
+            Candles closed by these trades
+        """
+        closed = []
+        timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64).tolist()
+        for pair, ts, block_number, price, amount, exchange_rate in zip(
+            df["pair"].tolist(),
+            timestamps,
+            df["block_number"].tolist(),
+            df["price"].tolist(),
+            df["amount"].tolist(),
+            df["exchange_rate"].tolist(),
+        ):
+            candle = self.fold_trade(pair, ts, block_number, price, amount, exchange_rate)
+            if candle is not None:
+                closed.append(candle)
+        return closed
+
+    def close_candles(self, before: pd.Timestamp) -> List[OpenCandle]:
+        """Close candles that cannot receive trades anymore.
+
+        :param before:
+            Close all candles starting before the candle of this timestamp.
+
+        :return:
+            Closed candles
+        """
+        threshold = self.get_candle_timestamp(before.value)
+        closed = [c for c in self.open_candles.values() if c.timestamp < threshold]
+        for c in closed:
+            del self.open_candles[c.pair]
+        return closed
+
+    def reset(self, ts: pd.Timestamp):
+        """Forget open candles starting at ``ts`` or later.
+
+        Used when trades are replayed after a chain reorganisation.
+        """
+        ts = ts.value
+        for pair in [p for p, c in self.open_candles.items() if c.timestamp >= ts]:
+            del self.open_candles[pair]
+
+    def get_open_candles(self) -> List[OpenCandle]:
+        """Candles still receiving trades."""
+        return list(self.open_candles.values())
+
+    @staticmethod
+    def to_dataframe(candles: List[OpenCandle]) -> pd.DataFrame:
+        """Convert candles to a DataFrame like :py:func:`resample_trades_into_ohlcv` output.
+
+        :return:
+            Candles indexed by (pair, timestamp)
+        """
+        df = pd.DataFrame(
+            [c.to_row() for c in candles],
+            columns=CANDLE_COLUMNS,
+            index=pd.MultiIndex.from_arrays(
+                [[c.pair for c in candles], pd.to_datetime([c.timestamp for c in candles])],
+                names=["pair", "timestamp"],
+            ),
+        )
+        # Keep the integer types when the list is empty
+        return df.astype({"start_block": "int64", "end_block": "int64", "buys": "int64", "sells": "int64"})
+
+
 def get_feed_for_pair(df: pd.DataFrame, pair: PairId) -> pd.DataFrame:
     """Get candles for a single pair.
 
@@ -0,0 +1,163 @@
+"""Pipelined processing of event streams.
+
+- Each stage runs in its own thread and processes items in batches
+
+- Stages are connected with bounded queues, so a fast producer
+  cannot fill the RAM when a later stage falls behind
+
+- Blocking I/O, like JSON-RPC reads, releases the GIL and overlaps
+  with the decoding done in the other stages
+
+Used by :py:class:`tradingstrategy.direct_feed.uniswap_v2.UniswapV2TradeFeed`.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List
+
+
+logger = logging.getLogger(__name__)
+
+
+#: Function turning a batch of items to a batch of output items
+Stage = Callable[[List[Any]], List[Any]]
+
+
+#: Marks the end of the stream in a queue
+_DONE = object()
+
+
+class _Failure:
+    """Carry an exception from a stage thread to the consumer."""
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class _Stopped(Exception):
+    """The consumer went away."""
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    stages: List[Stage],
+    batch_size: int = 500,
+    queue_size: int = 8,
+    name: str = "pipeline",
+) -> Iterator[Any]:
+    """Run stages over a source stream, each in its own thread.
+
+    - The source is read in its own thread and chunked to batches of ``batch_size`` items
+
+    - Each stage gets batches in the source order and its output batch is passed to the next stage.
+      Stages can keep state between batches, as a stage is always run by the same thread.
+
+    - The output of the last stage is yielded item by item in the calling thread
+
+    - Any exception in the source or a stage is re-raised in the calling thread
+
+    - If the caller stops iterating early, the threads are stopped
+
+    :param source:
+        Items to process, e.g. an event log reader.
+
+    :param stages:
+        Batch processing functions.
+
+    :param batch_size:
+        How many source items are passed between stages at once.
+
+    :param queue_size:
+        How many batches can wait between two stages.
+
+    :param name:
+        Thread name prefix, for debugging.
+
+    :return:
+        Iterator of the output items of the last stage
+    """
+    assert batch_size > 0, f"Bad batch size {batch_size}"
+    assert queue_size > 0, f"Bad queue size {queue_size}"
+
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def _put(q: queue.Queue, item):
+        # Do not block forever if the consumer has gone away
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Stopped()
+
+    def _get(q: queue.Queue):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        raise _Stopped()
+
+    def _read_source():
+        out = queues[0]
+        try:
+            batch = []
+            for item in source:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    _put(out, batch)
+                    batch = []
+            if batch:
+                _put(out, batch)
+            _put(out, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                _put(out, _Failure(e))
+            except _Stopped:
+                pass
+
+    def _run_stage(stage: Stage, inp: queue.Queue, out: queue.Queue):
+        try:
+            while True:
+                batch = _get(inp)
+                if batch is _DONE or isinstance(batch, _Failure):
+                    _put(out, batch)
+                    return
+                _put(out, stage(batch))
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                _put(out, _Failure(e))
+            except _Stopped:
+                pass
+
+    threads = [threading.Thread(target=_read_source, name=f"{name}-source", daemon=True)]
+    for idx, stage in enumerate(stages):
+        threads.append(threading.Thread(
+            target=_run_stage,
+            args=(stage, queues[idx], queues[idx + 1]),
+            name=f"{name}-stage-{idx}",
+            daemon=True,
+        ))
+
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            batch = queues[-1].get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, _Failure):
+                raise batch.exception
+            yield from batch
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        logger.debug("Pipeline %s finished", name)
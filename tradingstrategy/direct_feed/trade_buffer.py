@@ -0,0 +1,218 @@
+"""Columnar in-memory buffer for real-time trades.
+
+Backs :py:class:`tradingstrategy.direct_feed.trade_feed.TradeFeed`.
+
+- Preallocated NumPy arrays, one per column, with amortised O(1) append
+
+- Old rows are evicted by moving the head of the live window,
+  reorganised rows are truncated by moving the tail
+
+- Live rows are always stored contiguously, so the DataFrame handed out
+  is a zero-copy view over the arrays
+"""
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+#: NumPy storage type of each trade column.
+#:
+#: Matches the dtypes Pandas infers for :py:class:`tradingstrategy.direct_feed.trade_feed.Trade`
+#: data, so the buffer views look the same as the DataFrames the feed used to build.
+TRADE_BUFFER_DTYPES: Dict[str, np.dtype] = {
+    "pair": np.dtype("object"),
+    "block_number": np.dtype("int64"),
+    "block_hash": np.dtype("object"),
+    "timestamp": np.dtype("datetime64[ns]"),
+    "tx_hash": np.dtype("object"),
+    "log_index": np.dtype("int64"),
+    "price": np.dtype("object"),
+    "amount": np.dtype("object"),
+    "exchange_rate": np.dtype("object"),
+}
+
+
+class TradeBuffer:
+    """Preallocated columnar ring buffer for trades.
+
+    - Rows must be appended in block order, so the block number and timestamp
+      columns are sorted and can be binary searched
+
+    - When the arrays are full, the live window is moved to freshly allocated
+      arrays with at least half of the capacity free
+
+    - DataFrames returned by :py:meth:`get_dataframe` share memory with the buffer.
+      Rows behind a view are never overwritten in place:
+      if an append would write over rows a view has seen
+      (after :py:meth:`truncate`), the live window is first moved to new arrays.
+    """
+
+    def __init__(
+        self,
+        dtypes: Dict[str, np.dtype] = TRADE_BUFFER_DTYPES,
+        capacity: int = 4096,
+        index_column: str = "block_number",
+        timestamp_column: str = "timestamp",
+    ):
+        """
+        :param dtypes:
+            Column name -> NumPy dtype.
+
+        :param capacity:
+            Initial number of preallocated rows.
+
+        :param index_column:
+            Sorted integer column used as the DataFrame index.
+
+        :param timestamp_column:
+            Sorted timestamp column used for eviction.
+        """
+        assert capacity > 0, f"Bad capacity {capacity}"
+        assert index_column in dtypes
+        assert timestamp_column in dtypes
+        self.dtypes = dtypes
+        self.initial_capacity = capacity
+        self.index_column = index_column
+        self.timestamp_column = timestamp_column
+        self.clear()
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"<TradeBuffer {len(self):,} rows, capacity {self.get_capacity():,}>"
+
+    def get_capacity(self) -> int:
+        """How many rows fit in the currently allocated arrays."""
+        return len(self.arrays[self.index_column])
+
+    def clear(self):
+        """Drop all rows and release the allocated memory."""
+        self.arrays = {name: np.empty(self.initial_capacity, dtype=dtype) for name, dtype in self.dtypes.items()}
+
+        #: First live row (inclusive)
+        self.start = 0
+
+        #: Last live row (exclusive)
+        self.end = 0
+
+        #: Rows below this position may be referred by DataFrame views
+        self.exported_end = 0
+
+        self.view: Optional[pd.DataFrame] = None
+
+    def append(self, columns: Dict[str, np.ndarray]) -> int:
+        """Append rows to the end of the buffer.
+
+        :param columns:
+            Column name -> array of new values.
+            All columns must be present and have the same length.
+
+        :return:
+            Number of rows added
+        """
+        count = len(columns[self.index_column])
+        if count == 0:
+            return 0
+
+        if self.end + count > self.get_capacity() or self.end < self.exported_end:
+            self._reallocate(count)
+
+        end = self.end + count
+        for name, arr in self.arrays.items():
+            values = columns[name]
+            assert len(values) == count, f"Column {name} has {len(values)} rows, expected {count}"
+            arr[self.end:end] = values
+
+        self.end = end
+        self.view = None
+        return count
+
+    def append_dataframe(self, df: pd.DataFrame) -> int:
+        """Append rows from a DataFrame with the buffer columns."""
+        if self.index_column not in df.columns and df.index.name == self.index_column:
+            df = df.reset_index()
+        return self.append({name: df[name].to_numpy(dtype=dtype) for name, dtype in self.dtypes.items()})
+
+    def evict_before(self, ts: pd.Timestamp) -> int:
+        """Drop rows with timestamp older than ``ts``.
+
+        :return:
+            Number of rows evicted
+        """
+        timestamps = self.arrays[self.timestamp_column][self.start:self.end]
+        count = int(np.searchsorted(timestamps, np.datetime64(ts, "ns"), side="left"))
+        if count:
+            self.start += count
+            self.view = None
+        return count
+
+    def truncate(self, after: int) -> int:
+        """Drop rows with index value greater than ``after``.
+
+        Used to discard data of reorganised blocks.
+
+        :return:
+            Number of rows dropped
+        """
+        blocks = self.arrays[self.index_column][self.start:self.end]
+        keep = int(np.searchsorted(blocks, after, side="right"))
+        count = len(blocks) - keep
+        if count:
+            self.end = self.start + keep
+            self.view = None
+        return count
+
+    def get_dataframe(self) -> pd.DataFrame:
+        """Get all live rows as a DataFrame.
+
+        - Columns are zero-copy views over the buffer arrays
+
+        - Indexed by :py:attr:`index_column`, which is also kept as a column
+
+        - The same DataFrame instance is returned until the buffer is modified
+        """
+        if self.view is None:
+            live = slice(self.start, self.end)
+            index = pd.Index(self.arrays[self.index_column][live], name=self.index_column, copy=False)
+            self.view = pd.DataFrame(
+                {name: arr[live] for name, arr in self.arrays.items()},
+                index=index,
+                copy=False,
+            )
+            self.exported_end = max(self.exported_end, self.end)
+        return self.view
+
+    def get_last(self, column: str):
+        """Get the value of a column on the last row, or ``None`` if empty."""
+        if self.end == self.start:
+            return None
+        return self.arrays[column][self.end - 1]
+
+    def _reallocate(self, incoming: int):
+        """Move the live window to new arrays with room for ``incoming`` rows.
+
+        The old arrays are left untouched, as existing DataFrame views may still refer to them.
+        """
+        live = len(self)
+        capacity = max(self.initial_capacity, self.get_capacity())
+        while capacity < 2 * (live + incoming):
+            capacity *= 2
+
+        logger.debug("Reallocating trade buffer, %d live rows, new capacity %d", live, capacity)
+
+        arrays = {}
+        for name, arr in self.arrays.items():
+            new_arr = np.empty(capacity, dtype=arr.dtype)
+            new_arr[0:live] = arr[self.start:self.end]
+            arrays[name] = new_arr
+
+        self.arrays = arrays
+        self.start = 0
+        self.end = live
+        self.exported_end = 0
@@ -1,15 +1,15 @@
 """Trade feed.
 
-Blockchain / exchange agnostic trade feed using Pandas :py:class:`DataFrame` as internal memory buffer.e
+Blockchain / exchange agnostic trade feed using :py:class:`TradeBuffer` as internal memory buffer.
 """
 import logging
 from abc import abstractmethod
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from decimal import Decimal
 from typing import Dict, Optional, List, Iterable, Type, TypeAlias, Protocol
 
+import numpy as np
 import pandas as pd
-from numpy import isnan
 from tqdm_loggable.auto import tqdm
 
 from eth_defi.price_oracle.oracle import BasePriceOracle
@@ -17,6 +17,7 @@ from eth_defi.event_reader.reorganisation_monitor import ReorganisationMonitor,
 
 from .direct_feed_pair import PairId
 from .timeframe import Timeframe
+from .trade_buffer import TradeBuffer, TRADE_BUFFER_DTYPES
 
 
 logger = logging.getLogger(__name__)
@@ -206,6 +207,8 @@ class TradeFeed:
             Discard entries older than this to avoid
             filling the RAM.
 
+            Measured from the timestamp of the latest trade.
+
         :param save_hook:
             Sync the downloaded data to disk.
 
@@ -227,7 +230,7 @@ class TradeFeed:
         self.cycle = 1
         self.last_save = 0
 
-        self.trades_df = pd.DataFrame()
+        self.trade_buffer = TradeBuffer()
 
         # Check that every pair has a exchange rate conversion oracle
         for p in self.pairs:
@@ -242,17 +245,28 @@ class TradeFeed:
 
         return f"<TradeFeed {first_ts} - {last_ts} with {len(self.trades_df)} trades>"
 
-    def get_block_number_of_last_trade(self) -> Optional[int]:
-        """Get the last block number for which we have good data."""
+    @property
+    def trades_df(self) -> pd.DataFrame:
+        """All trades in the buffer, indexed by block number.
 
-        if len(self.trades_df) == 0:
-            return None
+        A zero-copy view over :py:attr:`trade_buffer`.
+        The same DataFrame is returned until new trades are added or old ones discarded.
+        """
+        return self.trade_buffer.get_dataframe()
 
-        return self.trades_df.iloc[-1]["block_number"]
+    @trades_df.setter
+    def trades_df(self, df: pd.DataFrame):
+        self.trade_buffer.clear()
+        if len(df) > 0:
+            self.trade_buffer.append_dataframe(df)
+
+    def get_block_number_of_last_trade(self) -> Optional[int]:
+        """Get the last block number for which we have good data."""
+        return self.trade_buffer.get_last("block_number")
 
     def get_trade_count(self) -> int:
         """How many trades we track currently."""
-        return len(self.trades_df)
+        return len(self.trade_buffer)
 
     def add_trades(self, trades: Iterable[Trade], start_block: Optional[int]=None, end_block: Optional[int]=None) -> pd.DataFrame:
         """Add trade to the ring buffer with support for fixing chain reorganisations.
@@ -277,52 +291,63 @@ class TradeFeed:
             Used for debug assets
 
         :return:
-            DataFrame of new trades
+            DataFrame of new trades.
+
+            A view over the trade buffer.
 
         :raise ChainReorganisationDetected:
             If we have detected a block reorganisation
             during importing the data
 
         """
-        data = []
+        trades = list(trades)
 
         # For each trade added, check that
         for evt in trades:
             assert isinstance(evt, Trade)
             assert type(evt.block_number) == int, f"Got bad block number {evt.block_number} {type(evt.block_number)}"
             self.reorg_mon.check_block_reorg(evt.block_number, evt.block_hash)
-            data.append(asdict(evt))
 
-        new_data = pd.DataFrame(data, columns=list(Trade.get_dataframe_columns().keys()))
-        new_data.set_index("block_number", inplace=True, drop=False)
+        # Build the columns directly, without going through per-trade dicts
+        columns = {}
+        for name, dtype in TRADE_BUFFER_DTYPES.items():
+            if name == "timestamp":
+                columns[name] = np.array([evt.timestamp.value for evt in trades], dtype="int64").view(dtype)
+            else:
+                columns[name] = np.array([getattr(evt, name) for evt in trades], dtype=dtype)
 
-        if len(new_data) > 0:
+        blocks = columns["block_number"]
+
+        if len(trades) > 0:
 
             if start_block:
-                min_block = new_data["block_number"].min()
-                if isnan(min_block):
-                    logger.error("Bad trade event data:")
-                    for idx, r in new_data.iterrows():
-                        logger.error("%s: %s", idx, r)
+                min_block = blocks.min()
                 assert min_block >= start_block, f"Trade event outside desired block range. {min_block} earlier than {start_block}"
 
             if end_block:
-                max_block = new_data["block_number"].max()
+                max_block = blocks.max()
                 assert max_block <= end_block, f"Trade event outside desired block range. {max_block} later than {end_block}"
 
+            assert (np.diff(blocks) >= 0).all(), f"Trades must be added in block order"
+
         # Check that there is no overlap, any block data should not be duplicated
-        if len(self.trades_df) > 0 and len(new_data) > 0:
-            last_block_in_buffer = self.trades_df.iloc[-1].block_number
-            incoming_block = new_data.iloc[0].block_number
+        last_block_in_buffer = self.get_block_number_of_last_trade()
+        if last_block_in_buffer is not None and len(trades) > 0:
+            incoming_block = blocks[0]
             assert incoming_block > last_block_in_buffer, f"Tried to insert existing data. Last block we have {last_block_in_buffer:,}, incoming data starts with block {incoming_block:,}"
 
-        logger.debug("add_trades(): Existing trades: %s, new trades: %s", len(self.trades_df), len(new_data))
+        logger.debug("add_trades(): Existing trades: %s, new trades: %s", len(self.trade_buffer), len(trades))
 
-        self.check_duplicates_data_frame(new_data)
+        self.check_duplicates_data_frame(pd.DataFrame(columns, copy=False))
 
-        self.trades_df = pd.concat([self.trades_df, new_data])
+        added = self.trade_buffer.append(columns)
 
-        return new_data
+        if self.data_retention_time is not None and added > 0:
+            evicted = self.trade_buffer.evict_before(self.trade_buffer.get_last("timestamp") - self.data_retention_time)
+            logger.debug("add_trades(): Evicted %d trades older than %s", evicted, self.data_retention_time)
+
+        df = self.trades_df
+        return df.iloc[len(df) - min(added, len(df)):]
 
     def get_latest_trades(self, n: int, pair: Optional[PairId] = None) -> pd.DataFrame:
         """Returns the latest trades.
@@ -343,13 +368,12 @@ class TradeFeed:
             Return empty DataFrame if no trades.
         """
 
-        if len(self.trades_df) == 0:
+        if len(self.trade_buffer) == 0:
             return pd.DataFrame()
 
+        df = self.trades_df
         if pair:
-            df = self.trades_df.loc[self.trades_df["pair"] == pair]
-        else:
-            df = self.trades_df
+            df = df.loc[df["pair"] == pair]
         return df.tail(n)
 
     def get_latest_price(self, pair: PairId) -> Decimal:
@@ -368,8 +392,7 @@ class TradeFeed:
             The last block that we cannot discard.
         """
 
-        if len(self.trades_df) > 0:
-            self.trades_df = self.trades_df.truncate(after=latest_good_block, copy=False)
+        self.trade_buffer.truncate(after=latest_good_block)
 
     def check_current_trades_for_duplicates(self):
         """Check for duplicate trades.
@@ -549,10 +572,13 @@ class TradeFeed:
             If there is no data, return None.
         """
 
-        after_df = self.trades_df.loc[self.trades_df["timestamp"] >= ts]
+        df = self.trades_df
+
+        # Timestamps are sorted, as trades are added in block order
+        idx = df["timestamp"].searchsorted(ts, side="left")
 
-        if len(after_df) > 0:
-            return after_df.iloc[0]["block_number"]
+        if idx < len(df):
+            return df["block_number"].iloc[idx]
         else:
             return None
 
@@ -675,7 +701,7 @@ class TradeFeed:
     def to_pandas(self, partition_size: int) -> pd.DataFrame:
         df = self.trades_df
         if len(df) > 0:
-            df["partition"] = df["block_number"].apply(lambda x: max((x // partition_size) * partition_size, 1))
+            df = df.assign(partition=np.maximum((df["block_number"] // partition_size) * partition_size, 1))
         return df
 
     def restore(self, df: pd.DataFrame):
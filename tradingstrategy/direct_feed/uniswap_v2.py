@@ -1,7 +1,7 @@
 import datetime
 import enum
 from decimal import Decimal
-from typing import List, Dict, Tuple, Optional, Iterable, Type, Set
+from typing import List, Dict, Tuple, Optional, Iterable, Type, Set, Callable
 import logging
 
 import pandas as pd
@@ -18,6 +18,7 @@ from eth_defi.price_oracle.oracle import PriceOracle, BasePriceOracle
 from eth_defi.uniswap_v2.pair import PairDetails
 from eth_defi.event_reader.reorganisation_monitor import ReorganisationMonitor
 
+from .pipeline import run_pipeline
 from .timeframe import Timeframe
 from .trade_feed import Trade, TradeFeed
 
@@ -95,7 +96,11 @@ class UniswapV2TradeFeed(TradeFeed):
                  timeframe: Timeframe,
                  data_retention_time: Optional[pd.Timedelta] = None,
                  threads=10,
-                 chunk_size=100):
+                 chunk_size=100,
+                 pipelined=False,
+                 pipeline_batch_size=500,
+                 pipeline_queue_size=8,
+                 ):
         """
 
         :param pairs:
@@ -127,6 +132,17 @@ class UniswapV2TradeFeed(TradeFeed):
 
         :param chunk_size:
             Max block chunk read at a time
+
+        :param pipelined:
+            Read logs, decode events and construct trades in overlapping threads.
+
+            See :py:meth:`fetch_trades_pipelined`.
+
+        :param pipeline_batch_size:
+            How many logs are passed between pipeline stages at once.
+
+        :param pipeline_queue_size:
+            How many batches can wait between two pipeline stages.
         """
 
         super().__init__(
@@ -146,6 +162,9 @@ class UniswapV2TradeFeed(TradeFeed):
         self.web3 = web3_factory(self.event_reader_context)
         self.chunk_size = chunk_size
         self.max_threads = threads
+        self.pipelined = pipelined
+        self.pipeline_batch_size = pipeline_batch_size
+        self.pipeline_queue_size = pipeline_queue_size
 
         # Get data from ABI
         Pair = get_contract(self.web3, "sushi/UniswapV2Pair.json")
@@ -160,27 +179,20 @@ class UniswapV2TradeFeed(TradeFeed):
     def get_block_number_at_chain_tip(self) -> int:
         return self.web3.eth.block_number
 
-    def fetch_trades(self,
-                     start_block: int,
-                     end_block: Optional[int],
-                     tqdm: Optional[Type[tqdm]] = None) -> Iterable[Trade]:
-        """Read data between logs.
-
-        :raise ChainReorganisationDetected:
-            In the case we notice chain data has changed during the reading
-        """
+    def create_log_reader(self, start_block: int, end_block: int) -> Iterable[LogResult]:
+        """Create the event log source for a block range.
 
-        logger.debug("Fetching uniswap trades %d - %d", start_block, end_block)
+        Override to read logs from somewhere else than JSON-RPC, e.g. in tests.
 
-        last_block = None
+        :param start_block:
+            Start reading from this block (inclusive)
 
-        max_blocks = end_block - start_block
+        :param end_block:
+            End at this block (inclusive)
 
-        if tqdm:
-            progress_bar = tqdm(total=max_blocks)
-            progress_bar.set_description(f"Loading Uniswap v2 event data {start_block:,} - {end_block:,}, {len(self.pairs)} trading pairs")
-        else:
-            progress_bar = None
+        :return:
+            Swap and Sync logs of our pairs in the chain order
+        """
 
         # Listen only pairs we are interested in
         filter = Filter.create_filter(
@@ -217,6 +229,36 @@ class UniswapV2TradeFeed(TradeFeed):
                  filter=filter,
              )
 
+        return generator
+
+    def fetch_trades(self,
+                     start_block: int,
+                     end_block: Optional[int],
+                     tqdm: Optional[Type[tqdm]] = None) -> Iterable[Trade]:
+        """Read data between logs.
+
+        :raise ChainReorganisationDetected:
+            In the case we notice chain data has changed during the reading
+        """
+
+        if self.pipelined:
+            yield from self.fetch_trades_pipelined(start_block, end_block, tqdm)
+            return
+
+        logger.debug("Fetching uniswap trades %d - %d", start_block, end_block)
+
+        last_block = None
+
+        max_blocks = end_block - start_block
+
+        if tqdm:
+            progress_bar = tqdm(total=max_blocks)
+            progress_bar.set_description(f"Loading Uniswap v2 event data {start_block:,} - {end_block:,}, {len(self.pairs)} trading pairs")
+        else:
+            progress_bar = None
+
+        generator = self.create_log_reader(start_block, end_block)
+
         sync = None
 
         # Read specified events in block range.
@@ -273,6 +315,87 @@ class UniswapV2TradeFeed(TradeFeed):
         if progress_bar:
             progress_bar.close()
 
+    def fetch_trades_pipelined(self,
+                               start_block: int,
+                               end_block: Optional[int],
+                               tqdm: Optional[Type[tqdm]] = None) -> Iterable[Trade]:
+        """Read trades with overlapping log read, event decoding and trade construction.
+
+        - Logs are read from :py:meth:`create_log_reader` in its own thread
+
+        - Events are decoded in batches with :py:func:`decode_events` in another thread
+
+        - Trades are constructed in a third thread, while the caller adds
+          the previous trades to the buffer
+
+        - Stages are connected with bounded queues, see :py:func:`run_pipeline`
+
+        Produces the same trades as the sequential read.
+
+        :raise ChainReorganisationDetected:
+            In the case we notice chain data has changed during the reading
+        """
+
+        logger.debug("Fetching uniswap trades %d - %d, pipelined", start_block, end_block)
+
+        if tqdm:
+            progress_bar = tqdm(total=end_block - start_block)
+            progress_bar.set_description(f"Loading Uniswap v2 event data {start_block:,} - {end_block:,}, {len(self.pairs)} trading pairs")
+        else:
+            progress_bar = None
+
+        trades = run_pipeline(
+            self.create_log_reader(start_block, end_block),
+            [decode_events, self.create_trade_constructor()],
+            batch_size=self.pipeline_batch_size,
+            queue_size=self.pipeline_queue_size,
+            name="uniswap-v2-trades",
+        )
+
+        last_block = start_block
+        trades_processed = 0
+        for trade in trades:
+            trades_processed += 1
+            if progress_bar and trade.block_number != last_block:
+                progress_bar.set_postfix({"trades": trades_processed}, refresh=False)
+                progress_bar.update(trade.block_number - last_block)
+                last_block = trade.block_number
+            yield trade
+
+        logger.debug("Mapped %d trades", trades_processed)
+
+        if progress_bar:
+            progress_bar.close()
+
+    def create_trade_constructor(self) -> Callable[[List[dict]], List[Trade]]:
+        """Create a stateful pipeline stage turning decoded events to trades.
+
+        The previous Sync() event is kept between batches,
+        as it gives the price for the following Swap().
+        """
+        sync = None
+
+        # Self sanity check that we don't create duplicates
+        processed_swaps: Set[tuple] = set()
+
+        def _construct(events: List[dict]) -> List[Trade]:
+            nonlocal sync
+            trades = []
+            for evt in events:
+                if evt["type"] == "swap":
+                    swap_id = (evt["tx_hash"], evt["log_index"])
+                    assert swap_id not in processed_swaps, f"Tried to add swap twice: {evt}"
+                    processed_swaps.add(swap_id)
+
+                    trade = self.construct_trade_from_uniswap_v2_events(sync, evt)
+                    if trade:
+                        trades.append(trade)
+                else:
+                    sync = evt
+            return trades
+
+        return _construct
+
     def construct_trade_from_uniswap_v2_events(self, prev_sync: Optional[dict], swap: dict) -> Optional[Trade]:
         """Figure out Uniswap v2 swap and volume.
 
@@ -433,6 +556,26 @@ def decode_sync(log: LogResult) -> dict:
     return data
 
 
+def decode_events(logs: List[LogResult]) -> List[dict]:
+    """Decode a batch of Swap and Sync logs.
+
+    Pipeline stage for :py:meth:`UniswapV2TradeFeed.fetch_trades_pipelined`.
+
+    :return:
+        Decoded events in the log order
+    """
+    events = []
+    for log in logs:
+        event_name = log["event"].event_name
+        if event_name == "Swap":
+            events.append(decode_swap(log))
+        elif event_name == "Sync":
+            events.append(decode_sync(log))
+        else:
+            raise RuntimeError(f"Cannot handle: {log}")
+    return events
+
+
 def calculate_reserve_price_in_quote_token_decimal(
         reversed: bool,
         reserve0: Decimal,
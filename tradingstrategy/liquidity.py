@@ -5,11 +5,20 @@ and :term:`XY liquidity model`.
 """
 import datetime
 import enum
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 from dataclasses import dataclass
+from pathlib import Path
 from typing import List, Optional, Tuple, Dict, cast
 
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
 from dataclasses_json import dataclass_json
 
 from tradingstrategy.timebucket import TimeBucket
@@ -205,6 +214,44 @@ class XYLiquidity:
 
         return df
 
+    @classmethod
+    def convert_web_candle_map_to_dataframe(cls, pair_candle_map: dict[str, list[dict]]) -> pd.DataFrame:
+        """Return one Pandas dataframe presenting TVL data of many pairs fetched from JSON endpoint.
+
+        - Decodes a `/candles` reply of pair id -> candles in one go,
+          instead of a DataFrame per pair
+
+        - Pairs without data do not appear in the result
+
+        :return:
+            DataFrame with columns "timestamp", "open", "high", "low", "close", "pair_id",
+            not indexed
+        """
+        candles = [c for array in pair_candle_map.values() for c in array]
+        if len(candles) == 0:
+            return pd.DataFrame({
+                "timestamp": pd.Series([], dtype="datetime64[s]"),
+                "open": pd.Series([], dtype="float"),
+                "high": pd.Series([], dtype="float"),
+                "low": pd.Series([], dtype="float"),
+                "close": pd.Series([], dtype="float"),
+                "pair_id": pd.Series([], dtype="int64"),
+            })
+
+        df = pd.DataFrame({
+            "timestamp": pd.to_datetime(pd.Series([c["ts"] for c in candles]).astype("datetime64[s]")),
+            "open": np.array([c["o"] for c in candles], dtype="float"),
+            "high": np.array([c["h"] for c in candles], dtype="float"),
+            "low": np.array([c["l"] for c in candles], dtype="float"),
+            "close": np.array([c["c"] for c in candles], dtype="float"),
+            # /candles endpoint does not reflect pair id back in the candle data
+            "pair_id": np.repeat(
+                np.array([int(pair_id) for pair_id in pair_candle_map.keys()], dtype="int64"),
+                [len(array) for array in pair_candle_map.values()],
+            ),
+        })
+        return df
+
 
 @dataclass_json
 @dataclass
@@ -475,8 +522,19 @@ class ResampledLiquidityUniverse:
     .. note ::
 
         The resampling itself will take some time, so optimally
-        the resampled data should be stored on-disk cache between different backtest runs
+        the resampled data should be stored on-disk cache between different backtest runs.
+        Give `cache_path` to do this.
 
+    Internally the resampled values are stored as flat arrays, one continuous
+    run of periods per pair:
+
+    - `pair_ids`, `starts`, `first_periods` and `counts` per pair
+
+    - `values` per resampled period
+
+    The arrays are saved as `.npy` files in the cache and memory-mapped on load.
+    Calendar resample periods like `W` or `ME` do not have a fixed length,
+    and they use the resampled DataFrame directly.
     """
 
     def __init__(self,
@@ -484,6 +542,8 @@ class ResampledLiquidityUniverse:
                 column="close",
                 resample_period="1D",
                 resample_method="min",
+                cache_path: Path | str | None = None,
+                source_fingerprint: str | None = None,
         ):
         """Calculate optimised liquidity universe.
 
@@ -498,6 +558,16 @@ class ResampledLiquidityUniverse:
             For a large number of pairs, resampling will take a long time.
             You should remove any unnecessary pairs in `df` before creating a resampled version.
 
+        Example using an on-disk cache:
+
+        .. code-block:: python
+
+            resampled_liquidity = ResampledLiquidityUniverse(
+                liquidity_df,
+                cache_path=client.transport.cache_path,
+                source_fingerprint=get_file_fingerprint(liquidity_parquet_path),
+            )
+
         :param df:
 
             Liquidity dataframe.
@@ -515,14 +585,53 @@ class ResampledLiquidityUniverse:
 
             E.g. `1D` for daily.
 
-            Must be a fixed frequency e.g. `30D` instead of `M`.
+            Fixed frequencies like `30D` use the fast array lookups and the on-disk cache.
+            Calendar frequencies like `W` or `ME` are looked up from the resampled DataFrame.
 
             See https://stackoverflow.com/a/35339226/315168
 
         :param resample_method:
             How to we resample the liquidity
 
+        :param cache_path:
+            Store the resampled data in this folder and reuse it in the later runs.
+
+            The cache entry is keyed by the source fingerprint, `column`,
+            `resample_period` and `resample_method`.
+
+            Only fixed resample periods are cached.
+
+        :param source_fingerprint:
+            Fingerprint of the source data for the cache key,
+            see :py:func:`get_file_fingerprint`.
+
+            If not given, hash the data in `df`.
         """
+
+        self.resample_period = resample_period
+
+        self.resample_offset = to_offset(resample_period)
+
+        #: Length of a period in nanoseconds, or `None` for calendar periods like `W`
+        self.period_ns: int | None = pd.Timedelta(self.resample_offset).value if isinstance(self.resample_offset, Tick) else None
+
+        #: Which end of a period is closed, as resampled by pandas
+        self.resample_closed = pd.Grouper(freq=self.resample_offset).closed
+
+        self.pair_cache: Dict[PrimaryKey, pd.DataFrame] = {}
+
+        self._df: pd.DataFrame | None = None
+
+        cache_file = None
+        if cache_path is not None and self.period_ns is not None:
+            if source_fingerprint is None:
+                source_fingerprint = get_dataframe_fingerprint(df, ["timestamp", "pair_id", column])
+            cache_key = hashlib.sha256(f"{source_fingerprint}-{column}-{resample_period}-{resample_method}".encode()).hexdigest()[0:32]
+            cache_file = Path(cache_path) / "resampled-liquidity" / cache_key
+            if cache_file.exists():
+                self._load_arrays(cache_file)
+                return
+
         new_df = df[["timestamp", "pair_id"]].copy()
         new_df["value"] = df[[column]]
         new_df.set_index(new_df["timestamp"], inplace=True, drop=True)
@@ -534,20 +643,113 @@ class ResampledLiquidityUniverse:
         # pd.Timestamp().floor() does not match our range values in get_liquidity_fast()
         #
         resampled_df = grouped_df.resample(resample_period, origin="epoch").agg({"value": resample_method}).ffill()
-        self.resample_period = resample_period
-        self.df: pd.DataFrame = resampled_df
+        self._df = resampled_df
 
-        self.pair_cache: Dict[PrimaryKey, pd.DataFrame] = {}
+        if self.period_ns is None:
+            return
+
+        self._build_arrays(resampled_df)
+
+        if cache_file is not None:
+            self._save_arrays(cache_file)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Resampled data as (pair_id, timestamp) indexed DataFrame with `value` column.
+
+        Reconstructed from the arrays when loaded from the cache.
+        """
+        if self._df is None:
+            timestamps = self._get_period_timestamps(0, len(self.values))
+            index = pd.MultiIndex.from_arrays(
+                [np.repeat(self.pair_ids, self.counts), timestamps],
+                names=["pair_id", "timestamp"],
+            )
+            self._df = pd.DataFrame({"value": np.asarray(self.values)}, index=index)
+        return self._df
+
+    def _build_arrays(self, resampled_df: pd.DataFrame):
+        """Flatten the resampled data to per-pair period runs."""
+        pair_id_values = resampled_df.index.get_level_values(0)
+        timestamps = resampled_df.index.get_level_values(1)
+
+        pair_ids = pair_id_values.to_numpy()
+        row_count = len(pair_ids)
+        if row_count > 0:
+            boundaries = np.flatnonzero(pair_ids[1:] != pair_ids[:-1]) + 1
+            starts = np.concatenate(([0], boundaries)).astype(np.int64)
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        counts = np.diff(np.append(starts, row_count)).astype(np.int64)
+
+        periods = timestamps.as_unit("ns").asi8 // self.period_ns
+
+        self.pair_ids: np.ndarray = pair_ids[starts]
+        self.starts: np.ndarray = starts
+        self.counts: np.ndarray = counts
+        self.first_periods: np.ndarray = periods[starts]
+        self.values: np.ndarray = resampled_df["value"].to_numpy()
+        self.timestamp_dtype = timestamps.dtype
+        self.positions: Dict[PrimaryKey, int] = {pair_id: idx for idx, pair_id in enumerate(self.pair_ids.tolist())}
+
+        # Resampling gives one row per period from the first to the last period of each pair
+        assert (periods[starts + counts - 1] - self.first_periods + 1 == counts).all(), "Resampled periods are not continuous"
+
+    def _save_arrays(self, path: Path):
+        """Write the arrays to the cache folder.
+
+        - Write to a temporary folder first, so a crashed process does not leave a partial cache entry
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(tempfile.mkdtemp(dir=path.parent, prefix=f"{path.name}.tmp-"))
+        for name in ("pair_ids", "starts", "counts", "first_periods", "values"):
+            np.save(temp_path / f"{name}.npy", getattr(self, name))
+        (temp_path / "metadata.json").write_text(json.dumps({
+            "timestamp_dtype": str(self.timestamp_dtype),
+            "resample_period": self.resample_period,
+        }))
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            # Another process wrote the same cache entry first
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def _load_arrays(self, path: Path):
+        """Memory-map the arrays from the cache folder."""
+        for name in ("pair_ids", "starts", "counts", "first_periods", "values"):
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+        metadata = json.loads((path / "metadata.json").read_text())
+        self.timestamp_dtype = np.dtype(metadata["timestamp_dtype"])
+        self.positions = {pair_id: idx for idx, pair_id in enumerate(self.pair_ids.tolist())}
+
+    def _get_period_timestamps(self, start: int, end: int) -> pd.DatetimeIndex:
+        """Get timestamps of the flattened rows `start:end`."""
+        row_positions = np.repeat(np.arange(len(self.pair_ids)), self.counts)[start:end]
+        periods = self.first_periods[row_positions] + (np.arange(start, end) - self.starts[row_positions])
+        timestamps = (periods * self.period_ns).astype("datetime64[ns]").astype(self.timestamp_dtype)
+        return pd.DatetimeIndex(timestamps, name="timestamp")
 
     def get_samples_by_pair(self, pair_id: int) -> pd.DataFrame:
         """Access and cache the resampled liquidity data per pair."""
-        # https://stackoverflow.com/a/45563615/315168
 
         if pair_id not in self.pair_cache:
-            try:
-                self.pair_cache[pair_id] = self.df.xs(pair_id)
-            except KeyError as e:
-                raise KeyError(f"Could not find pair for pair_id {pair_id}") from e
+            if self.period_ns is None:
+                # https://stackoverflow.com/a/45563615/315168
+                try:
+                    self.pair_cache[pair_id] = self.df.xs(pair_id)
+                except KeyError as e:
+                    raise KeyError(f"Could not find pair for pair_id {pair_id}") from e
+                return self.pair_cache[pair_id]
+
+            position = self.positions.get(pair_id)
+            if position is None:
+                raise KeyError(f"Could not find pair for pair_id {pair_id}")
+            start = int(self.starts[position])
+            end = start + int(self.counts[position])
+            self.pair_cache[pair_id] = pd.DataFrame(
+                {"value": np.asarray(self.values[start:end])},
+                index=self._get_period_timestamps(start, end),
+            )
         return self.pair_cache[pair_id]
 
     def get_liquidity_fast(self,
@@ -571,17 +773,65 @@ class ResampledLiquidityUniverse:
         """
         assert isinstance(when, pd.Timestamp)
 
+        if self.period_ns is None:
+            return self._get_calendar_liquidity(pair_id, when)
+
+        position = self.positions.get(pair_id)
+        if position is None:
+            raise LiquidityDataUnavailable(f"No liquidity data for {pair_id}")
+
+        # Periods are counted from the epoch, same as when.floor(self.resample_period)
+        offset = when.value // self.period_ns - self.first_periods[position]
+        if 0 <= offset < self.counts[position]:
+            return self.values[self.starts[position] + offset]
+        return 0.0
+
+    def _get_calendar_liquidity(self, pair_id: PrimaryKey, when: pd.Timestamp) -> USDollarAmount:
+        """Look up the liquidity for calendar resample periods.
+
+        - Right closed periods like `W` and `ME` are labelled by their last day
+
+        - Left closed periods like `MS` are labelled by their first day
+        """
         try:
             samples = self.get_samples_by_pair(pair_id)
         except KeyError as e:
             raise LiquidityDataUnavailable(f"No liquidity data for {pair_id}") from e
 
-        try:
-            rounded_ts = when.floor(self.resample_period)
-            return samples.loc[rounded_ts]["value"]
-        except KeyError:
+        labels = samples.index
+        if len(labels) == 0:
             return 0.0
 
+        if self.resample_closed == "right":
+            day = when.normalize()
+            position = labels.searchsorted(day, side="left")
+            found = position < len(labels) and (position > 0 or day > labels[0] - self.resample_offset)
+        else:
+            position = labels.searchsorted(when, side="right") - 1
+            found = position >= 0 and (position < len(labels) - 1 or when < labels[-1] + self.resample_offset)
+
+        if found:
+            return samples["value"].iloc[position]
+        return 0.0
+
+
+def get_file_fingerprint(path: Path | str) -> str:
+    """Get a cheap fingerprint of a data file for cache keys.
+
+    - Based on the file path, size and modification time, the file is not read
+    """
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def get_dataframe_fingerprint(df: pd.DataFrame, columns: List[str]) -> str:
+    """Get a fingerprint of DataFrame data for cache keys.
+
+    - Hashes the content of the given columns
+    """
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
 
 
 
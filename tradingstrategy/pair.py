@@ -63,7 +63,7 @@ import warnings
 from collections import Counter
 from dataclasses import dataclass, field
 from types import NoneType
-from typing import Optional, Iterable, Dict, TypeAlias
+from typing import Optional, Iterable, Dict, TypeAlias, Mapping
 
 import numpy as np
 import pyarrow as pa
@@ -77,6 +77,7 @@ from tradingstrategy.token_metadata import TokenMetadata
 from tradingstrategy.types import NonChecksummedAddress, BlockNumber, UNIXTimestamp, BasisPoint, \
     USDollarAmount, URL
 from tradingstrategy.utils.columnar import iterate_columnar_dicts
+from tradingstrategy.utils.pair_index import PairRowIndex, PairRowMapping, TokenIndex
 from tradingstrategy.utils.schema import create_pyarrow_schema_for_dataclass, create_columnar_work_buffer, \
     append_to_columnar_work_buffer
 from tradingstrategy.exceptions import DataNotFoundError
@@ -874,22 +875,24 @@ class PandasPairUniverse:
 
         #: pair_id -> raw dict data mappings
         #:
-        #: Constructed in one pass from Pandas DataFrame.
+        #: Dict-like view over the DataFrame columns, see :py:class:`tradingstrategy.utils.pair_index.PairRowIndex`.
         #:
         #: Don't access directly, use :py:meth:`iterate_pairs`.
-        self.pair_map: Dict[int, dict] = {}
+        self.pair_map: Mapping[int, dict] = {}
+
+        #: Column array backed pair id and address index
+        self.row_index: PairRowIndex | None = None
 
         #: pair_id -> constructed DEXPair cache
         #:
         #: Don't access directly, use :py:meth:`iterate_pairs`.
         self.dex_pair_obj_cache: Dict[int, DEXPair] = {}
 
-        # pair smart contract address -> DEXPair
-        self.smart_contract_map = {}
+        # pair smart contract address -> raw dict data
+        self.smart_contract_map: Mapping[str, dict] = {}
 
-        # Internal cache for get_token() lookup
-        # address -> info tuple mapping
-        self.token_cache: Dict[str, Token] = {}
+        #: Token and symbol lookups, see :py:meth:`get_token_index`
+        self.token_index: TokenIndex | None = None
 
         if build_index:
             self.build_index()
@@ -905,19 +908,13 @@ class PandasPairUniverse:
             yield self.get_pair_by_id(pair_id)
 
     def iterate_tokens(self) -> Iterable[Token]:
-        """Iterate over all tokens in this universe."""
-
-        already_iterated = set()
-
-        for pair in self.iterate_pairs():
-            token_a = pair.get_base_token()
-            if token_a not in already_iterated:
-                yield token_a
-            already_iterated.add(token_a)
-            token_b = pair.get_quote_token()
-            if token_b not in already_iterated:
-                yield token_b
-                already_iterated.add(token_b)
+        """Iterate over all tokens in this universe.
+
+        - Tokens are given in the order they first appear as a base or a quote token
+        """
+        token_index = self.get_token_index()
+        for entry in token_index.first_entries.values():
+            yield token_index.get_token_by_entry(entry)
                 
     def limit_to_pairs(self, pair_ids: Collection[PrimaryKey]) -> "PandasPairUniverse":
         """Create a reduced pair universe with 
@@ -936,6 +933,10 @@ class PandasPairUniverse:
 
         Allows fast lookup of individual pairs.
 
+        - Only `pair_id -> row position` hash map is built up front,
+          pair data dicts and :py:class:`DEXPair` objects are created
+          when a pair is accessed
+
         .. warning::
 
             This function assumes the universe contains
@@ -945,13 +946,44 @@ class PandasPairUniverse:
             does not index chain id and thus is invalid.
 
         """
+        self.row_index = PairRowIndex(self.df)
+        self.pair_map = PairRowMapping(self.row_index)
+        self.smart_contract_map = PairRowMapping(self.row_index, by_address=True)
+
+    def get_token_index(self) -> TokenIndex:
+        """Get token and symbol lookup indexes.
+
+        - Built on the first call in one pass over the pair DataFrame columns
+
+        - Used by :py:meth:`get_token`, :py:meth:`get_token_by_symbol`,
+          :py:meth:`get_all_tokens` and :py:meth:`iterate_tokens`
+        """
+        assert len(self.pair_map) > 0, "This method can be only used with in-memory pair index"
+        if self.token_index is None:
+            positions = np.fromiter(self.row_index.positions.values(), dtype=np.int64, count=len(self.row_index))
+            self.token_index = TokenIndex(self.df, positions)
+        return self.token_index
+
+    def get_pair_ids_by_base_token(self, address: str, chain_id: ChainId | None = None) -> np.ndarray:
+        """Get all pairs where the token is the base token.
+
+        :param address:
+            ERC-20 address of the token
+
+        :param chain_id:
+            Match pairs on a specific chain only.
+
+        :return:
+            Array of pair ids
+        """
+        return self.get_token_index().get_pair_ids_by_token(address.lower(), chain_id)
 
-        # TODO: No idea why index (pair_id) is not unique here, so we just work around it for now\
-        # UserWarning: DataFrame columns are not unique, some columns will be omitted.
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=UserWarning)
-            self.pair_map = self.df.T.to_dict()
-            self.smart_contract_map = {d["address"].lower(): d for d in self.pair_map.values()}
+    def get_pair_ids_by_quote_token(self, address: str, chain_id: ChainId | None = None) -> np.ndarray:
+        """Get all pairs where the token is the quote token.
+
+        See :py:meth:`get_pair_ids_by_base_token`.
+        """
+        return self.get_token_index().get_pair_ids_by_token(address.lower(), chain_id, quote=True)
 
     def get_all_pair_ids(self) -> Collection[PrimaryKey]:
         """Get all pair ids in the data frame."""
@@ -1045,9 +1077,8 @@ class PandasPairUniverse:
 
         Get a token details for a token that is base or quotetoken of any trading pair.
 
-        .. warning::
-
-            Extremely slow method on full pair universes - do not use.
+        - Uses :py:meth:`get_token_index`, so lookups are dictionary lookups after
+          the index has been built
 
         ..note ::
 
@@ -1068,26 +1099,7 @@ class PandasPairUniverse:
 
         assert type(address) == str, f"Expected address to be a string, got {type(address)}"
         address = address.lower()
-
-        token: Optional[Token] = None
-
-        assert len(self.pair_map) > 0, "This method can be only used with in-memory pair index"
-
-        if address not in self.token_cache:
-            for pair_id in self.pair_map.keys():
-                p = self.get_pair_by_id(pair_id)
-
-                if chain_id:
-                    if p.chain_id != chain_id:
-                        continue
-
-                if p.token0_address == address:
-                    token = Token(p.chain_id, p.token0_symbol, p.token0_address, p.token0_decimals)
-                elif p.token1_address == address:
-                    token = Token(p.chain_id, p.token1_symbol, p.token1_address, p.token1_decimals)
-            self.token_cache[address] = token
-
-        return self.token_cache[address]
+        return self.get_token_index().get_token(address, chain_id)
 
     def get_token_by_symbol(
         self,
@@ -1101,8 +1113,7 @@ class PandasPairUniverse:
         By default we use ``pick_by_highest_volume`` to choose one.
         If this method does not use, use :py:meth:`get_token` with address lookup instead.
 
-        This method is not designed for heavy access,
-        as it is using uncached data. Use sparsingly.
+        - Uses the symbol index from :py:meth:`get_token_index`
 
         :param symbol:
             E.g. ``USDC``.
@@ -1127,28 +1138,10 @@ class PandasPairUniverse:
 
         """
 
-        assert len(self.pair_map) > 0, "This method can be only used with in-memory pair index"
-
         symbol = symbol.lower()
 
         # Token -> total vol mappings
-        matches: Counter[Token, USDollarAmount] = Counter()
-
-        for pair_id in self.pair_map.keys():
-            p = self.get_pair_by_id(pair_id)
-
-            if chain_id:
-                if p.chain_id != chain_id:
-                    continue
-
-            matched_token = None
-            if p.token0_symbol.lower() == symbol:
-                matched_token = self.get_token(p.token0_address, chain_id)
-            elif p.token1_symbol.lower() == symbol:
-                matched_token = self.get_token(p.token1_address, chain_id)
-
-            if matched_token:
-                matches[matched_token] += p.volume_30d
+        matches: Counter[Token, USDollarAmount] = Counter(dict(self.get_token_index().get_tokens_by_symbol(symbol, chain_id)))
 
         if len(matches) > 1:
             if pick_by_highest_volume:
@@ -1163,20 +1156,9 @@ class PandasPairUniverse:
         return token
 
     def get_all_tokens(self) -> Set[Token]:
-        """Get all base and quote tokens in trading pairs.
-
-        .. warning ::
-
-            This method is useful for only test/limited pair count universes.
-            It is very slow and mainly purported for debugging and diagnostics.
-
-        """
-        tokens = set()
-        for pair_id in self.pair_map.keys():
-            p = self.get_pair_by_id(pair_id)
-            tokens.add(self.get_token(p.base_token_address))
-            tokens.add(self.get_token(p.quote_token_address))
-        return tokens
+        """Get all base and quote tokens in trading pairs."""
+        token_index = self.get_token_index()
+        return {token_index.get_token(address) for address in token_index.first_entries.keys()}
 
     def get_single(self) -> DEXPair:
         """For strategies that trade only a single trading pair, get the only pair in the universe.
@@ -1544,6 +1526,72 @@ class PandasPairUniverse:
 
         return pair
 
+    def get_pairs_by_human_descriptions(
+        self,
+        descs: Collection[HumanReadableTradingPairDescription],
+        exchange_universe: ExchangeUniverse | None = None,
+    ) -> List[DEXPair]:
+        """Get multiple pairs by their human readable descriptions.
+
+        - Bulk version of :py:meth:`get_pair_by_human_description`,
+          resolves all descriptions in one pass with :py:func:`resolve_pair_descriptions`
+
+        - Token symbols are matched case-insensitively
+
+        Example:
+
+        .. code-block:: python
+
+            pairs = pair_universe.get_pairs_by_human_descriptions([
+                (ChainId.ethereum, "uniswap-v3", "WETH", "USDC", 0.0005),
+                (ChainId.ethereum, "uniswap-v2", "WETH", "USDC"),
+            ])
+            assert len(pairs) == 2
+
+        :param descs:
+            Trading pair descriptions as tuples (blockchain, dex, base, quote, fee)
+
+        :param exchange_universe:
+            Used to check that exchanges in the descriptions exist.
+
+            If not given use the `exchange_universe` given in the constructor, if any.
+
+        :return:
+            Trading pairs in the order of descriptions.
+
+            Highest volume trading pair if multiple matches.
+
+        :raise PairNotFoundError:
+            In the case any of the descriptions cannot be resolved.
+        """
+
+        descs = list(descs)
+
+        if exchange_universe is None:
+            exchange_universe = self.exchange_universe
+
+        if exchange_universe is not None:
+            for chain_id, exchange_slug in {(d[0], d[1]) for d in descs}:
+                if exchange_slug and exchange_universe.get_by_chain_and_slug(chain_id, exchange_slug) is None:
+                    raise ExchangeNotFoundError(chain_id_name=chain_id.name, exchange_slug=exchange_slug)
+
+        resolved = resolve_pair_descriptions(self.df, descs)
+
+        missing = resolved.loc[resolved["pair_id"].isna()]
+        if len(missing) > 0:
+            for error in missing["error"]:
+                logger.error("%s", error)
+            desc = missing["description"].iloc[0]
+            raise PairNotFoundError(
+                base_token=desc[2],
+                quote_token=desc[3],
+                fee_tier=desc[4] if len(desc) >= 5 else None,
+                exchange_slug=desc[1],
+                description=desc,
+            )
+
+        return [self.get_pair_by_id(pair_id) for pair_id in resolved["pair_id"].tolist()]
+
     def get_exchange_for_pair(self, pair: DEXPair) -> Exchange:
         """Get the exchange data on which a pair is trading.
 
@@ -1767,7 +1815,10 @@ class PandasPairUniverse:
         :return:
             A trading pair universe that contains only the listed trading pairs.
         """
-        resolved_pairs_df = resolve_pairs_based_on_ticker(df, pairs=pairs)
+        resolved = resolve_pair_descriptions(df, pairs)
+        errors = resolved["error"].dropna().tolist()
+        assert len(errors) == 0, "Not all pairs were resolved:\n" + "\n".join(errors)
+        resolved_pairs_df = df.loc[df["pair_id"].isin(resolved["pair_id"].tolist())]
         assert len(resolved_pairs_df) == len(pairs), f"Not all pairs were resolved.\nAsked pairs: {pairs}\nResolved pairs:\n{resolved_pairs_df}"
         return PandasPairUniverse(resolved_pairs_df)
 
@@ -2022,19 +2073,96 @@ def resolve_pairs_based_on_ticker(
 
     assert pairs, "No pair_tickers given"
 
-    match_fee = False
+    resolved = resolve_pair_descriptions(
+        df,
+        pairs,
+        chain_id=chain_id,
+        exchange_slug=exchange_slug,
+        sorting_criteria_by=sorting_criteria_by,
+        sorting_criteria_ascending=sorting_criteria_ascending,
+    )
+
+    result_pair_ids = set(resolved["pair_id"].dropna().tolist())
+    result_df = df.loc[df["pair_id"].isin(result_pair_ids)]
+
+    return result_df
+
+
+def resolve_pair_descriptions(
+    df: pd.DataFrame,
+    pairs: Collection[HumanReadableTradingPairDescription] | Collection[tuple],
+    chain_id: Optional[ChainId] = None,
+    exchange_slug: Optional[str] = None,
+    sorting_criteria_by: Tuple = ("fee", "buy_volume_all_time"),
+    sorting_criteria_ascending: Tuple = (True, False),
+) -> pd.DataFrame:
+    """Resolve a list of human-readable trading pair descriptions in one pass.
+
+    - Builds `(chain_id, exchange_slug, base, quote, fee)` keys
+      for all pairs once, ranked by `sorting_criteria_by`
+
+    - Resolves all descriptions with joins against the keys,
+      instead of a DataFrame mask per description
+
+    - Token symbols and exchange slugs are matched case-insensitively
+
+    - If multiple pairs match a description, the first one in the
+      sorting order wins, e.g. the lowest fee and then the highest all-time buy volume
+
+    Example:
+
+    .. code-block:: python
+
+        pairs_df = client.fetch_pair_universe().to_pandas()
+
+        resolved = resolve_pair_descriptions(
+            pairs_df,
+            [
+                (ChainId.ethereum, "uniswap-v3", "WETH", "USDC", 0.0005),
+                (ChainId.ethereum, "uniswap-v3", "NOTEXIST", "USDC"),
+            ]
+        )
+        assert resolved["pair_id"].notna().tolist() == [True, False]
+        print(resolved.loc[1, "error"])
+
+    :param df:
+        DataFrame containing DEXPairs
+
+    :param pairs:
+        Human-readable descriptions.
+
+        See :py:func:`resolve_pairs_based_on_ticker` for the accepted formats.
+
+    :param chain_id:
+        Blockchain for the legacy `(base, quote)` tuples.
+
+    :param exchange_slug:
+        Exchange for the legacy `(base, quote)` tuples.
 
-    # Create list of conditions to filter out dataframe,
-    # one condition per pair
-    conditions = []
-    for pair_description in pairs:
+        In :py:data:`HumanReadableTradingPairDescription` exchange can be `None`
+        to match pairs on any exchange.
+
+    :param sorting_criteria_by:
+        Tie-breaker columns when multiple pairs match a description
+
+    :param sorting_criteria_ascending:
+        Tie-breaker sort orders
 
+    :return:
+        DataFrame with one row per description, in the order of `pairs`.
+
+        Columns are `description`, `pair_id` (nullable) and `error` (`None` if the pair was found).
+    """
+
+    descriptions = list(pairs)
+
+    rows = []
+    for pair_description in descriptions:
         if len(pair_description) in (4, 5):
-            # New API
             pair_chain, pair_exchange, base, quote, *fee = pair_description
 
             assert isinstance(pair_chain, ChainId), f"Expected ChainId, got {pair_chain}. Description is {pair_description}."
-            assert type(pair_exchange) == str
+            assert type(pair_exchange) in (str, NoneType)
             assert type(base) == str
             assert type(quote) == str
 
@@ -2045,7 +2173,6 @@ def resolve_pairs_based_on_ticker(
                 assert type(fee_value) == float, f"Expected fee 0...1: {type(fee_value)}: {fee_value}"
                 assert fee_value >= 0 and fee_value <= 1
                 fee = [int(fee_value * 10000)]
-
         else:
             pair_chain = chain_id
             pair_exchange = exchange_slug
@@ -2053,65 +2180,64 @@ def resolve_pairs_based_on_ticker(
             assert exchange_slug, "exchange_slug missing"
             base, quote, *fee = pair_description
 
-        condition = (
-            (df["base_token_symbol"].str.lower() == base.lower())
-            & (df["quote_token_symbol"].str.lower() == quote.lower())
-            & (df["exchange_slug"].str.lower() == pair_exchange.lower())
-            & (df["chain_id"] == pair_chain.value)
-        )
-
-        # also filter by pair fee if pair ticker specifies it
-        if len(fee) > 0:
-            condition &= (df["fee"] == fee[0])
+        rows.append((
+            pair_chain.value,
+            pair_exchange.lower() if pair_exchange else None,
+            base.lower(),
+            quote.lower(),
+            fee[0] if len(fee) > 0 else None,
+        ))
+
+    wanted = pd.DataFrame(rows, columns=["chain_id", "exchange_slug", "base", "quote", "fee"])
+    wanted["description_index"] = np.arange(len(descriptions))
+
+    # Composite keys for all pairs, ranked by the tie-breakers
+    ranked = df.sort_values(by=list(sorting_criteria_by), ascending=list(sorting_criteria_ascending))
+    keys = pd.DataFrame({
+        "chain_id": ranked["chain_id"].to_numpy(),
+        "exchange_slug": ranked["exchange_slug"].str.lower().to_numpy(),
+        "base": ranked["base_token_symbol"].str.lower().to_numpy(),
+        "quote": ranked["quote_token_symbol"].str.lower().to_numpy(),
+        "fee": ranked["fee"].to_numpy(),
+        "pair_id": ranked["pair_id"].to_numpy(),
+        "rank": np.arange(len(ranked)),
+    })
+
+    # Exchange and fee are optional in the descriptions,
+    # so join each description group on the key columns it has
+    matches = []
+    has_exchange = wanted["exchange_slug"].notna()
+    has_fee = wanted["fee"].notna()
+    for exchange_mask, fee_mask in ((True, True), (True, False), (False, True), (False, False)):
+        group = wanted.loc[(has_exchange == exchange_mask) & (has_fee == fee_mask)]
+        if len(group) == 0:
+            continue
+        on = ["chain_id", "base", "quote"]
+        if exchange_mask:
+            on.append("exchange_slug")
+        if fee_mask:
+            on.append("fee")
+        group = group[on + ["description_index"]].astype({"fee": keys["fee"].dtype} if fee_mask else {})
+        matches.append(group.merge(keys[on + ["pair_id", "rank"]], on=on, how="inner"))
+
+    if matches:
+        matched = pd.concat(matches).sort_values("rank").drop_duplicates("description_index", keep="first")
+        pair_ids = matched.set_index("description_index")["pair_id"]
+    else:
+        pair_ids = pd.Series([], dtype="int64")
+
+    result = pd.DataFrame({
+        "description": pd.Series(descriptions, dtype=object),
+        "pair_id": pair_ids.reindex(wanted["description_index"]).astype("Int64").to_numpy(),
+    })
+
+    errors = [None] * len(descriptions)
+    for idx in np.flatnonzero(result["pair_id"].isna().to_numpy()).tolist():
+        pair_chain, pair_exchange, base, quote, fee = rows[idx]
+        errors[idx] = f"No pair {base.upper()}-{quote.upper()} on chain {pair_chain}, exchange {pair_exchange or 'any'}, fee {fee if fee is not None else 'any'} BPS: {descriptions[idx]}"
+    result["error"] = pd.Series(errors, dtype=object)
 
-        conditions.append(condition)
-
-    # OR call conditions together
-    # https://stackoverflow.com/a/57468610/315168
-    df_matches = df.loc[np.logical_or.reduce(conditions)]
-
-    # Sort by the buy volume as a preparation
-    # for the scam filter
-    df_matches = df_matches.sort_values(by=list(sorting_criteria_by), ascending=list(sorting_criteria_ascending))
-
-    result_pair_ids = set()
-
-    # Scam filter.
-    # Pick the tokens by the highest buy volume to the result map.
-    for pair_description in pairs:
-
-        match_fee = None
-        if len(pair_description) > 3:
-            pair_chain, pair_exchange, base, quote, *fee = pair_description
-            if len(fee) >= 1:
-                match_fee = fee[0]
-        else:
-            # Legacy
-            base, quote, *_ = pair_description
-
-        if match_fee:
-            for _, row in df_matches.iterrows():
-                if (
-                    row["base_token_symbol"].lower() == base.lower()
-                    and row["quote_token_symbol"].lower() == quote.lower()
-                    and row["fee"] == match_fee * 10000
-                ):
-                    result_pair_ids.add(row["pair_id"])
-                    break
-
-        else:
-
-            for _, row in df_matches.iterrows():
-                if (
-                    row["base_token_symbol"].lower() == base.lower()
-                    and row["quote_token_symbol"].lower() == quote.lower()
-                ):
-                    result_pair_ids.add(row["pair_id"])
-                    break
-
-    result_df = df.loc[df["pair_id"].isin(result_pair_ids)]
-
-    return result_df
+    return result
 
 
 def generate_address_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -2127,20 +2253,14 @@ def generate_address_columns(df: pd.DataFrame) -> pd.DataFrame:
 
     """
 
-    def expander(row: pd.Series) -> dict:
-        quote_token_symbol = row["quote_token_symbol"]
-        if row["token0_symbol"] == quote_token_symbol:
-            return {
-                "quote_token_address": row["token0_address"],
-                "base_token_address": row["token1_address"],
-            }
-        else:
-            return {
-                "quote_token_address": row["token1_address"],
-                "base_token_address": row["token0_address"],
-            }
+    token0_is_quote_mask = (df["token0_symbol"] == df["quote_token_symbol"]).to_numpy()
+    token0_addresses = df["token0_address"].to_numpy()
+    token1_addresses = df["token1_address"].to_numpy()
 
-    applied_df = df.apply(expander, axis='columns', result_type='expand')
+    applied_df = pd.DataFrame({
+        "quote_token_address": np.where(token0_is_quote_mask, token0_addresses, token1_addresses),
+        "base_token_address": np.where(token0_is_quote_mask, token1_addresses, token0_addresses),
+    }, index=df.index)
     df = pd.concat([df, applied_df], axis='columns')
     return df
 
@@ -1,13 +1,17 @@
 """Reading and consuming datasets."""
 
+import datetime
 import logging
 import os
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Collection
 
+import pandas as pd
 import pyarrow as pa
 from pyarrow import parquet as pq, ArrowInvalid
 
+from tradingstrategy.types import PrimaryKey
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,3 +70,76 @@ def read_parquet(path: Path, filters: Optional[List[Tuple]]=None, columns: Optio
                          path=path) \
                         from e
     return table
+
+
+def read_parquet_filtered(
+    path: Path,
+    pair_ids: Optional[Collection[PrimaryKey]] = None,
+    start_time: Optional[datetime.datetime | pd.Timestamp] = None,
+    end_time: Optional[datetime.datetime | pd.Timestamp] = None,
+    columns: Optional[List[str]] = None,
+    pair_id_column: str = "pair_id",
+    timestamp_column: str = "timestamp",
+    filters: Optional[List[Tuple]] = None,
+) -> pd.DataFrame:
+    """Read a subset of a large multipair Parquet dataset directly to a DataFrame.
+
+    - Pair and time range filters are pushed down to the Parquet reader,
+      so row groups whose statistics fall outside the filters are not decompressed at all
+
+    - Only the given columns are read
+
+    - The Arrow table is converted to pandas with `split_blocks` and `self_destruct`,
+      so the column buffers are handed over to the DataFrame without consolidating them
+      to a second copy, and Arrow memory is released column by column during the conversion
+
+    The peak memory usage scales with the selected pairs and time range,
+    not with the full dataset size.
+
+    Example:
+
+    .. code-block:: python
+
+        path = client.fetch_candle_dataset(TimeBucket.h1)
+        df = read_parquet_filtered(
+            path,
+            pair_ids={pair_1.pair_id, pair_2.pair_id},
+            start_time=pd.Timestamp("2024-01-01"),
+            columns=["pair_id", "timestamp", "close"],
+        )
+
+    :param path:
+        Parquet file
+
+    :param pair_ids:
+        Pairs to read, or all pairs
+
+    :param start_time:
+        Start time, inclusive
+
+    :param end_time:
+        End time, inclusive
+
+    :param columns:
+        Columns to read, or all columns
+
+    :param filters:
+        Additional Parquet read_table filters, e.g. `[("high", ">", 1_000_000)]`.
+
+        Combined with the pair and time range filters using AND.
+
+    :return:
+        DataFrame with the same columns as :py:func:`read_parquet` would give after `to_pandas()`
+    """
+
+    filters = list(filters or [])
+    if pair_ids is not None:
+        filters.append((pair_id_column, "in", [int(pair_id) for pair_id in pair_ids]))
+    if start_time is not None:
+        filters.append((timestamp_column, ">=", pd.Timestamp(start_time)))
+    if end_time is not None:
+        filters.append((timestamp_column, "<=", pd.Timestamp(end_time)))
+
+    table = read_parquet(path, filters=filters or None, columns=columns)
+    # The table is not used after this, so let the conversion free Arrow buffers as it goes
+    return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -11,7 +11,8 @@ import platform
 import re
 import shutil
 import time
-from email.utils import parsedate_to_datetime
+from contextlib import nullcontext
+from email.utils import format_datetime, parsedate_to_datetime
 from http.client import IncompleteRead
 from importlib.metadata import PackageNotFoundError, version
 from json import JSONDecodeError
@@ -33,8 +34,10 @@ from tradingstrategy.lending import LendingCandle, LendingCandleType
 from tradingstrategy.liquidity import XYLiquidity
 from tradingstrategy.timebucket import TimeBucket
 from tradingstrategy.token_metadata import TokenMetadata
-from tradingstrategy.transport.cache_utils import wait_other_writers
+from tradingstrategy.transport.cache_manifest import CacheManifest
+from tradingstrategy.transport.cache_utils import atomic_replace, wait_other_writers
 from tradingstrategy.transport.jsonl import (load_candles_jsonl,
+                                             load_candles_jsonl_parallel,
                                              load_token_metadata_jsonl)
 from tradingstrategy.transport.pair_candle_cache import PairCandleCache
 from tradingstrategy.transport.progress_enabled_download import \
@@ -115,7 +118,8 @@ class CachedHTTPTransport:
          api_key: Optional[str] = None,
          timeout: float | tuple = (89.0, 89.0),
          add_exception_hook=True,
-         retry_policy: Optional[Retry] = None
+         retry_policy: Optional[Retry] = None,
+         max_cache_size: Optional[int] = None,
     ):
         """
         :param download_func: Interactive download progress bar displayed during the download
@@ -133,6 +137,13 @@ class CachedHTTPTransport:
 
             How to handle failed HTTP requests.
             If not given use the default somewhat graceful retry policy.
+
+        :param max_cache_size:
+            Disk quota for the cache directory in bytes.
+
+            When a download takes the cache over the quota, stale and least recently used
+            entries are deleted, see :py:meth:`enforce_cache_size`.
+            If not given, the cache grows without bound.
         """
 
         self.download_func = download_func
@@ -157,10 +168,94 @@ class CachedHTTPTransport:
 
         self.api_key = api_key
         self.timeout = timeout
+        self.max_cache_size = max_cache_size
+        self.manifest: CacheManifest | None = None
 
     def close(self):
         """Release any underlying sockets."""
         self.requests.close()
+        if self.manifest is not None:
+            self.manifest.flush()
+
+    def get_cache_manifest(self) -> CacheManifest:
+        """Get the manifest index of the cache directory.
+
+        Records size, last access, origin and freshness of every cached entry.
+        """
+        cache_path = self.get_abs_cache_path()
+        if self.manifest is None or self.manifest.cache_path != cache_path:
+            self.manifest = CacheManifest(cache_path)
+        return self.manifest
+
+    def enforce_cache_size(self, max_size: Optional[int] = None, protected: Collection[str] = ()) -> int:
+        """Delete cached entries until the cache directory fits in the disk quota.
+
+        - Stale entries are deleted first, then the least recently used ones
+
+        - Candle files with ``-to_`` end time never go stale, but are evicted
+          by the least recently used order like any other entry
+
+        - Entries being written by another process are skipped
+
+        - Entries read or written recently, by any process, are skipped,
+          as readers of cached files do not take the writer lock,
+          see :py:attr:`CacheManifest.grace_period`
+
+        Called automatically after downloads when ``max_cache_size`` is set.
+
+        :param max_size:
+            Quota in bytes. If not given, use ``max_cache_size``.
+
+        :param protected:
+            Entry names not to delete
+
+        :return:
+            Number of bytes freed
+        """
+        if max_size is None:
+            max_size = self.max_cache_size
+        assert max_size is not None, "No cache quota given"
+
+        manifest = self.get_cache_manifest()
+        manifest.sync()
+
+        freed = 0
+        for entry in manifest.select_evictions(max_size, self.cache_period.total_seconds(), protected):
+            if manifest.evict(entry):
+                freed += entry.size
+        return freed
+
+    def _touch_cache_entry(self, path: str | Path, size: int | None = None):
+        """Record a cache hit in the manifest."""
+        manifest = self.get_cache_manifest()
+        name = manifest.get_relative_name(path)
+        if name is not None:
+            manifest.touch(name, size)
+
+    def _record_pair_candle_cache(self, cache: PairCandleCache, origin: str):
+        """Record a partitioned pair candle cache as one manifest entry.
+
+        The partitions and the metadata file are evicted together, under the cache lock.
+        """
+        base_name = self.get_cache_manifest().get_relative_name(cache.base_path)
+        self._record_cache_entry(
+            cache.partition_path,
+            origin=origin,
+            extra_paths=[f"{base_name}.json"],
+            lock_name=base_name,
+            never_expires=True,
+        )
+
+    def _record_cache_entry(self, path: str | Path, origin: str | None = None, **kwargs):
+        """Record written data in the manifest and keep the cache within the quota."""
+        manifest = self.get_cache_manifest()
+        name = manifest.get_relative_name(path)
+        if name is None:
+            # Vault downloads and such outside the cache directory
+            return
+        manifest.record(name, origin=origin, **kwargs)
+        if self.max_cache_size is not None:
+            self.enforce_cache_size(protected={name})
 
     def create_requests_client(
         self,
@@ -232,6 +327,9 @@ class CachedHTTPTransport:
 
         - The cache timeout is coded in the file modified
           timestamp (mtime)
+
+        - Expired files are revalidated against the server in :py:meth:`save_response`
+          before they are downloaded again
         """
 
         path = self.get_cached_file_path(fname)
@@ -244,13 +342,16 @@ class CachedHTTPTransport:
         end_time_pattern = r"-to_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}"
         if re.search(end_time_pattern, str(fname)):
             # Candle files with an end time never expire, as the history does not change
+            self._touch_cache_entry(f)
             return f
 
-        mtime = datetime.datetime.fromtimestamp(f.stat().st_mtime)
+        stat = f.stat()
+        mtime = datetime.datetime.fromtimestamp(stat.st_mtime)
         if datetime.datetime.now() - mtime > self.cache_period:
             # File cache expired
             return None
 
+        self._touch_cache_entry(f, stat.st_size)
         return f
 
     def get_cached_item_with_status(
@@ -276,13 +377,16 @@ class CachedHTTPTransport:
         end_time_pattern = r"-to_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}"
         if re.search(end_time_pattern, str(fname)):
             # Candle files with an end time never expire, as the history does not change
+            self._touch_cache_entry(f)
             return f, CacheStatus.cached_with_timestamped_name
 
-        mtime = datetime.datetime.fromtimestamp(f.stat().st_mtime)
+        stat = f.stat()
+        mtime = datetime.datetime.fromtimestamp(stat.st_mtime)
         if datetime.datetime.now() - mtime > self.cache_period:
             # File cache expired
             return None, CacheStatus.expired
 
+        self._touch_cache_entry(f, stat.st_size)
         return f, CacheStatus.cached
 
     def _generate_cache_name(
@@ -339,19 +443,44 @@ class CachedHTTPTransport:
         target_path = self.cache_path if filename is None else filename
 
         logger.info("Purging caches at %s", target_path)
+        manifest = self.get_cache_manifest()
         try:
             if os.path.isdir(target_path):
                 shutil.rmtree(target_path)
             else:
                 os.remove(target_path)
+                metadata_path = self._get_sidecar_cache_metadata_path(target_path)
+                if metadata_path.exists():
+                    metadata_path.unlink()
+
+            if filename is None:
+                manifest.clear()
+            else:
+                name = manifest.get_relative_name(target_path)
+                if name is not None:
+                    manifest.remove(name)
         except FileNotFoundError as exc:
             logger.warning(
                 f"Attempted to purge caches, but no such file or directory: {exc.filename}"
             )
 
-    def save_response(self, fpath, api_path, params=None, human_readable_hint: Optional[str]=None):
+    def save_response(
+        self,
+        fpath,
+        api_path,
+        params=None,
+        human_readable_hint: Optional[str]=None,
+        revalidate=True,
+    ):
         """Download a file to the cache and display a pretty progress bar while doing it.
 
+        - If an expired copy of the file exists, it is first revalidated with a conditional
+          HEAD request and only downloaded again if the remote file has changed,
+          see :py:meth:`_revalidate_cached_file`
+
+        - The remote ETag, Last-Modified and Content-Length are stored in a sidecar file
+          for the next revalidation
+
         :param fpath:
             File system path where the download will be saved
 
@@ -363,12 +492,21 @@ class CachedHTTPTransport:
 
         :param human_readable_hint:
             The status text displayed on the progress bar what's being downloaded
+
+        :param revalidate:
+            Set ``False`` to always download the file.
         """
         os.makedirs(self.get_abs_cache_path(), exist_ok=True)
         url = f"{self.endpoint}/{api_path}"
+
+        remote_metadata = None
+        if revalidate and os.path.exists(fpath):
+            unchanged, remote_metadata = self._revalidate_cached_file(fpath, url, params)
+            if unchanged:
+                return
+
         logger.debug("Saving %s to %s", url, fpath)
-        # https://stackoverflow.com/a/14114741/315168
-        self.download_func(self.requests, fpath, url, params, self.timeout, human_readable_hint)
+        self._download_with_cache_metadata(fpath, url, params, human_readable_hint, remote_metadata)
 
     def get_json_response(self, api_path, params=None, attempts=5, sleep=30.0) -> dict:
         url = f"{self.endpoint}/{api_path}"
@@ -397,7 +535,9 @@ class CachedHTTPTransport:
                         response.status_code,
                         response.text[0:300],
                     )
-                    time.sleep(sleep)
+                    # No point to wait after the last attempt
+                    if attempt + 1 < attempts:
+                        time.sleep(sleep)
                     continue
 
                 break
@@ -467,13 +607,20 @@ class CachedHTTPTransport:
 
     def fetch_pair_universe(self) -> pathlib.Path:
         fname = "pair-universe.parquet"
+        path = self.get_cached_file_path(fname)
+
+        # Cached files are published by atomic rename,
+        # readers do not need to wait for the writer lock
         cached = self.get_cached_item(fname)
+        if cached:
+            logger.info("Using cached pair universe %s", path)
+            return cached
 
         # Download save the file
-        path = self.get_cached_file_path(fname)
-
         with wait_other_writers(path):
 
+            # Another writer may have finished while we waited
+            cached = self.get_cached_item(fname)
             if cached:
                 logger.info("Using cached pair universe %s", path)
                 return cached
@@ -489,6 +636,10 @@ class CachedHTTPTransport:
     def fetch_exchange_universe(self) -> pathlib.Path:
         fname = "exchange-universe.json"
 
+        cached = self.get_cached_item(fname)
+        if cached:
+            return cached
+
         # Download save the file
         path = self.get_cached_file_path(fname)
 
@@ -506,13 +657,17 @@ class CachedHTTPTransport:
 
     def fetch_lending_reserve_universe(self) -> pathlib.Path:
         fname = "lending-reserve-universe.json"
+
         cached = self.get_cached_item(fname)
+        if cached:
+            return cached
 
         # Download save the file
         path = self.get_cached_file_path(fname)
 
         with wait_other_writers(path):
 
+            cached = self.get_cached_item(fname)
             if cached:
                 return cached
 
@@ -561,26 +716,34 @@ class CachedHTTPTransport:
         fname = "vault-universe.json"
         path = self.get_cached_file_path(fname, cache_path=download_root)
 
+        # Fresh file, no need to wait for the writer lock
+        if _get_file_age(path) < datetime.timedelta(hours=24):
+            return pathlib.Path(path)
+
         with wait_other_writers(path):
 
             # Check cache with 24-hour expiry
+            remote_metadata = None
             if os.path.exists(path):
                 mtime = datetime.datetime.fromtimestamp(pathlib.Path(path).stat().st_mtime)
                 cache_age = datetime.datetime.now() - mtime
                 if cache_age < datetime.timedelta(hours=24):
                     return pathlib.Path(path)
 
+                unchanged, remote_metadata = self._revalidate_cached_file(path, url)
+                if unchanged:
+                    return pathlib.Path(path)
+
             # Download from the external vault metrics endpoint
             os.makedirs(self.get_abs_cache_path(download_root), exist_ok=True)
 
             logger.debug("Downloading vault universe from %s to %s", url, path)
-            self.download_func(
-                self.requests,
+            self._download_with_cache_metadata(
                 path,
                 url,
                 None,  # No params
-                self.timeout,
-                "Downloading vault universe dataset"
+                "Downloading vault universe dataset",
+                remote_metadata,
             )
 
             _check_good_json(path, "fetch_vault_universe() failed")
@@ -633,15 +796,23 @@ class CachedHTTPTransport:
             parsed = parsed.replace(tzinfo=None)
         return parsed
 
-    def _fetch_http_cache_metadata(self, url: str) -> tuple[datetime.datetime | None, str | None, int | None]:
+    def _fetch_http_cache_metadata(
+        self,
+        url: str,
+        params: dict | None = None,
+    ) -> tuple[datetime.datetime | None, str | None, int | None]:
         """Fetch remote cache headers with a lightweight HEAD request."""
         response = self.requests.head(
             url,
+            params=params,
             allow_redirects=True,
             timeout=self.timeout,
         )
         response.raise_for_status()
+        return self._parse_http_cache_metadata(response, url)
 
+    def _parse_http_cache_metadata(self, response: Response, url: str) -> tuple[datetime.datetime | None, str | None, int | None]:
+        """Read Last-Modified, ETag and Content-Length headers of a response."""
         last_modified = self._parse_http_last_modified(response.headers.get("Last-Modified"))
         etag = response.headers.get("ETag")
 
@@ -696,6 +867,104 @@ class CachedHTTPTransport:
 
         return False
 
+    def _revalidate_cached_file(
+        self,
+        path: str | Path,
+        url: str,
+        params: dict | None = None,
+    ) -> tuple[bool, tuple[datetime.datetime | None, str | None, int | None] | None]:
+        """Check if an expired cached file still matches the remote file.
+
+        - Send a HEAD request with ``If-None-Match`` and ``If-Modified-Since`` headers
+          from the sidecar metadata, or the file modification time
+
+        - ``304 Not Modified``, or a reply with matching headers, means the file is unchanged:
+          its modification time is refreshed, so it is fresh for another cache period
+
+        - Any error means the file must be downloaded again
+
+        :return:
+            Tuple (unchanged, remote metadata).
+            The metadata is ``None`` if the server could not tell.
+        """
+        local_metadata = self._load_sidecar_cache_metadata(path) or {}
+
+        headers = {}
+        if local_metadata.get("etag"):
+            headers["If-None-Match"] = local_metadata["etag"]
+
+        if local_metadata.get("last_modified"):
+            last_modified = datetime.datetime.fromisoformat(local_metadata["last_modified"])
+        else:
+            last_modified = naive_utcfromtimestamp(Path(path).stat().st_mtime)
+        headers["If-Modified-Since"] = format_datetime(last_modified.replace(tzinfo=datetime.timezone.utc), usegmt=True)
+
+        try:
+            response = self.requests.head(
+                url,
+                params=params,
+                headers=headers,
+                allow_redirects=True,
+                timeout=self.timeout,
+            )
+            if response.status_code == 304:
+                remote_last_modified, remote_etag, _ = self._parse_http_cache_metadata(response, url)
+                remote_metadata = (
+                    remote_last_modified or last_modified,
+                    remote_etag or local_metadata.get("etag"),
+                    local_metadata.get("content_length"),
+                )
+                unchanged = True
+            else:
+                response.raise_for_status()
+                remote_metadata = self._parse_http_cache_metadata(response, url)
+                unchanged = self._is_matching_http_cache_metadata(path, *remote_metadata)
+        except Exception as exc:
+            logger.info("Could not revalidate cached %s with a HEAD request to %s: %s", path, url, exc)
+            return False, None
+
+        if unchanged:
+            logger.info("Remote %s unchanged, reusing expired cached file %s", url, path)
+            self._store_sidecar_cache_metadata(path, *remote_metadata)
+            os.utime(path, None)
+            self._record_cache_entry(path, origin=url)
+        else:
+            logger.info("Remote %s changed, cached file %s must be downloaded again", url, path)
+
+        return unchanged, remote_metadata
+
+    def _download_with_cache_metadata(
+        self,
+        path: str | Path,
+        url: str,
+        params: dict | None,
+        human_readable_hint: str | None,
+        remote_metadata: tuple[datetime.datetime | None, str | None, int | None] | None = None,
+    ):
+        """Download a file and store its remote cache metadata in a sidecar file.
+
+        :param remote_metadata:
+            Headers from an earlier HEAD request.
+            If not given, they are fetched before the download,
+            so a file changing during the download is detected as changed next time.
+        """
+        if remote_metadata is None:
+            try:
+                remote_metadata = self._fetch_http_cache_metadata(url, params)
+            except Exception as exc:
+                logger.info("Could not fetch cache metadata with a HEAD request to %s: %s", url, exc)
+
+        # Publish by atomic rename, so lock-free readers never see a partial file.
+        # The temporary name is stable, so an interrupted download can resume.
+        # https://stackoverflow.com/a/14114741/315168
+        with atomic_replace(path, suffix=".download") as temp_path:
+            self.download_func(self.requests, temp_path, url, params, self.timeout, human_readable_hint)
+
+        if remote_metadata is not None and any(value is not None for value in remote_metadata):
+            self._store_sidecar_cache_metadata(path, *remote_metadata)
+
+        self._record_cache_entry(path, origin=url)
+
     def fetch_vault_price_history(
         self,
         url: str | None = None,
@@ -730,8 +999,14 @@ class CachedHTTPTransport:
         fname = "vault-price-history.parquet"
         path = self.get_cached_file_path(fname, cache_path=download_root)
 
+        # Fresh file, no need to wait for the writer lock
+        if _get_file_age(path) < datetime.timedelta(hours=24):
+            logger.info("Vault price history cache hit: path=%s. Skipping download (< 24h threshold).", path)
+            return pathlib.Path(path)
+
         with wait_other_writers(path):
 
+            remote_metadata = None
             if os.path.exists(path):
                 mtime = naive_utcfromtimestamp(pathlib.Path(path).stat().st_mtime)
                 cache_age = naive_utcnow() - mtime
@@ -748,76 +1023,30 @@ class CachedHTTPTransport:
                     path, cache_age, local_size, url,
                 )
 
-                try:
-                    remote_last_modified, remote_etag, remote_content_length = self._fetch_http_cache_metadata(url)
-                    if self._is_matching_http_cache_metadata(
-                        path=path,
-                        remote_last_modified=remote_last_modified,
-                        remote_etag=remote_etag,
-                        remote_content_length=remote_content_length,
-                    ):
-                        self._store_sidecar_cache_metadata(
-                            path=path,
-                            last_modified=remote_last_modified,
-                            etag=remote_etag,
-                            content_length=remote_content_length,
-                        )
-                        os.utime(path, None)
-                        logger.info("Reusing cached vault price history at %s because remote HEAD metadata is unchanged", path)
-                        return pathlib.Path(path)
-                    else:
-                        local_metadata = self._load_sidecar_cache_metadata(path) or {}
-                        logger.info(
-                            "Vault price history HEAD mismatch, re-downloading: "
-                            "local_etag=%s, remote_etag=%s, "
-                            "local_last_modified=%s, remote_last_modified=%s, "
-                            "local_size=%s, remote_content_length=%s",
-                            local_metadata.get("etag"), remote_etag,
-                            local_metadata.get("last_modified"), remote_last_modified,
-                            local_size, remote_content_length,
-                        )
-                except Exception as exc:
-                    logger.warning(
-                        "Could not validate cached vault price history at %s with a HEAD request to %s: %s. Falling back to a full download.",
-                        path,
-                        url,
-                        exc,
-                    )
-                    remote_last_modified = None
-                    remote_etag = None
-                    remote_content_length = None
+                unchanged, remote_metadata = self._revalidate_cached_file(path, url)
+                if unchanged:
+                    return pathlib.Path(path)
             else:
                 logger.info("Vault price history cache miss: no cached file at %s. Downloading from %s.", path, url)
-                remote_last_modified = None
-                remote_etag = None
-                remote_content_length = None
 
             os.makedirs(self.get_abs_cache_path(download_root), exist_ok=True)
 
             logger.debug("Downloading vault price history from %s to %s", url, path)
-            self.download_func(
-                self.requests,
+            self._download_with_cache_metadata(
                 path,
                 url,
                 None,
-                self.timeout,
                 "Downloading cleaned vault price history dataset",
+                remote_metadata,
             )
 
-            if any(value is not None for value in (remote_last_modified, remote_etag, remote_content_length)):
-                self._store_sidecar_cache_metadata(
-                    path=path,
-                    last_modified=remote_last_modified,
-                    etag=remote_etag,
-                    content_length=remote_content_length,
-                )
-
             return pathlib.Path(path)
 
     def fetch_candles_all_time(self, bucket: TimeBucket) -> pathlib.Path:
         """Load candles and return a cached file where they are stored.
 
-        - If cached file exists return it directly
+        - If cached file exists return it directly,
+          without waiting for the writer lock
 
         - Wait if someone else is writing the file
           (in multiple parallel testers)
@@ -826,6 +1055,10 @@ class CachedHTTPTransport:
         fname = f"candles-{bucket.value}.parquet"
         cached_path = self.get_cached_file_path(fname)
 
+        cached = self.get_cached_item(fname)
+        if cached:
+            return cached
+
         with wait_other_writers(cached_path):
 
             cached = self.get_cached_item(fname)
@@ -850,6 +1083,10 @@ class CachedHTTPTransport:
         fname = f"liquidity-samples-{bucket.value}.parquet"
         path = self.get_cached_file_path(fname)
 
+        cached = self.get_cached_item(fname)
+        if cached:
+            return cached
+
         with wait_other_writers(path):
 
             cached = self.get_cached_item(fname)
@@ -862,6 +1099,10 @@ class CachedHTTPTransport:
     def fetch_lending_reserves_all_time(self) -> pathlib.Path:
         fname = "lending-reserves-all.parquet"
 
+        cached = self.get_cached_item(fname)
+        if cached:
+            return cached
+
         # Download save the file
         path = self.get_cached_file_path(fname)
 
@@ -928,6 +1169,11 @@ class CachedHTTPTransport:
 
         full_fname = self.get_cached_file_path(cache_fname)
 
+        cached = self.get_cached_item(cache_fname)
+        if cached:
+            logger.debug("Using cached data file %s", full_fname)
+            return pd.read_parquet(cached)
+
         with wait_other_writers(full_fname):
 
             cached = self.get_cached_item(cache_fname)
@@ -965,7 +1211,9 @@ class CachedHTTPTransport:
 
             # Update cache
             path = self.get_cached_file_path(cache_fname)
-            df.to_parquet(path)
+            with atomic_replace(path) as temp_path:
+                df.to_parquet(temp_path)
+            self._record_cache_entry(path, origin=api_url)
 
             size = pathlib.Path(path).stat().st_size
             logger.debug(f"Wrote {cache_fname}, disk size is {size:,}b")
@@ -997,7 +1245,10 @@ class CachedHTTPTransport:
         end_time: datetime.datetime | None = None,
         max_bytes: int | None = None,
         progress_bar_description: str | None = None,
-        attempts: int = 5
+        attempts: int = 5,
+        max_workers: int | None = None,
+        pairs_per_chunk: int = 250,
+        time_chunk: datetime.timedelta | None = None,
     ) -> pd.DataFrame:
         """Load particular set of the candles and cache the result.
 
@@ -1031,26 +1282,39 @@ class CachedHTTPTransport:
         :param progress_bar_description:
             Display on downlood progress bar
 
+        :param max_workers:
+            Download in parallel, chunked mode using this many concurrent requests.
+
+            The default is to load all pairs in a single request,
+            limited to 1,500 pairs.
+            See :py:func:`tradingstrategy.transport.jsonl.load_candles_jsonl_parallel`.
+
+        :param pairs_per_chunk:
+            Max pair ids per a request in the parallel mode.
+
+        :param time_chunk:
+            Split the time range to windows of this length in the parallel mode.
+
         :return:
             Candles dataframe
         """
-        max_pairs = 1_500
 
         # If no start_time is provided, there's no easy way determine what "deltas" to fetch
         # relative to the current cache, so we bypass the cache and fetch all candles.
         # This is an edge case and not recommended.
         if not start_time:
-            return load_candles_jsonl(
-                self.requests,
-                self.endpoint,
+            return self._load_candles_jsonl(
                 pair_ids,
                 time_bucket,
                 start_time,
                 end_time,
                 max_bytes=max_bytes,
                 progress_bar_description=progress_bar_description,
-                sanity_check_count=max_pairs,
-                attempts=attempts
+                attempts=attempts,
+                max_workers=max_workers,
+                pairs_per_chunk=pairs_per_chunk,
+                # Cannot split an open ended time range
+                time_chunk=None,
             )
 
         if not end_time:
@@ -1058,157 +1322,217 @@ class CachedHTTPTransport:
 
         cache_path = self.get_cached_file_path(f"candles-{time_bucket.value}")
 
-        with PairCandleCache(cache_path) as cache:
+        with PairCandleCache(cache_path, partitioned=True) as cache:
             partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
 
-            candle_updates: list[pd.DataFrame] = []
+            # Fully cached pairs are read without waiting for the writer lock
+            fetched = partition.needs_fetch()
+            if fetched:
+                # Another writer may have fetched the same data while we waited
+                cache.lock_for_update()
+                partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
+
+                candle_updates: list[pd.DataFrame] = []
+
+                # Load full_fetch_pair_ids from API
+                if partition.full_fetch_ids:
+                    df = self._load_candles_jsonl(
+                        partition.full_fetch_ids,
+                        time_bucket,
+                        start_time,
+                        end_time,
+                        max_bytes=max_bytes,
+                        progress_bar_description=progress_bar_description,
+                        attempts=attempts,
+                        max_workers=max_workers,
+                        pairs_per_chunk=pairs_per_chunk,
+                        time_chunk=time_chunk,
+                    )
+                    candle_updates.append(df)
+
+                delta_start_time = cache.metadata.delta_fetch_start_time()
+
+                # Load delta_fetch_pair_ids from API
+                if partition.delta_fetch_ids and delta_start_time and end_time > delta_start_time:
+                    df = self._load_candles_jsonl(
+                        partition.delta_fetch_ids,
+                        time_bucket,
+                        delta_start_time,
+                        end_time,
+                        max_bytes=max_bytes,
+                        progress_bar_description=progress_bar_description,
+                        attempts=attempts,
+                        max_workers=max_workers,
+                        pairs_per_chunk=pairs_per_chunk,
+                        time_chunk=time_chunk,
+                    )
+                    candle_updates.append(df)
 
-            # Load full_fetch_pair_ids from API
-            if partition.full_fetch_ids:
-                df = load_candles_jsonl(
-                    self.requests,
-                    self.endpoint,
-                    partition.full_fetch_ids,
-                    time_bucket,
-                    start_time,
-                    end_time,
-                    max_bytes=max_bytes,
-                    progress_bar_description=progress_bar_description,
-                    sanity_check_count=max_pairs,
-                    attempts=attempts
-                )
-                candle_updates.append(df)
+                # Update cache with new data
+                cache.update(candle_updates, pair_ids, start_time, end_time)
 
-            delta_start_time = cache.metadata.delta_fetch_start_time()
+            # Return filtered result (since cache may include pairs/dates outside requested range)
+            df = cache.read(pair_ids, start_time, end_time)
 
-            # Load delta_fetch_pair_ids from API
-            if partition.delta_fetch_ids and delta_start_time and end_time > delta_start_time:
-                df = load_candles_jsonl(
-                    self.requests,
-                    self.endpoint,
-                    partition.delta_fetch_ids,
-                    time_bucket,
-                    delta_start_time,
-                    end_time,
-                    max_bytes=max_bytes,
-                    progress_bar_description=progress_bar_description,
-                    sanity_check_count=max_pairs,
-                    attempts=attempts
-                )
-                candle_updates.append(df)
+        if fetched:
+            self._record_pair_candle_cache(cache, origin=f"{self.endpoint}/candles")
+        else:
+            self._touch_cache_entry(cache.partition_path)
+        return df
 
-            # Update cache with new data
-            cache.update(candle_updates, pair_ids, start_time, end_time)
+    def _load_candles_jsonl(
+        self,
+        pair_ids: Collection[PrimaryKey],
+        time_bucket: TimeBucket,
+        start_time: datetime.datetime | None,
+        end_time: datetime.datetime | None,
+        max_bytes: int | None,
+        progress_bar_description: str | None,
+        attempts: int,
+        max_workers: int | None,
+        pairs_per_chunk: int,
+        time_chunk: datetime.timedelta | None,
+    ) -> pd.DataFrame:
+        """Load candles from JSONL endpoint, either as a single request or in parallel chunks.
 
-            # Return filtered result (since cache may include pairs/dates outside requested range)
-            return cache.data[
-                (cache.data["pair_id"].isin(pair_ids)) &  # type: ignore
-                (cache.data["timestamp"] >= start_time) &
-                (cache.data["timestamp"] <= end_time)
-            ]
+        - See :py:meth:`fetch_candles_by_pair_ids` for public API.
+        """
+        max_pairs = 1_500
 
-    def _fetch_tvl_by_pair_id(
+        if max_workers:
+            return load_candles_jsonl_parallel(
+                self.requests,
+                self.endpoint,
+                pair_ids,
+                time_bucket,
+                start_time,
+                end_time,
+                max_bytes=max_bytes,
+                progress_bar_description=progress_bar_description,
+                pairs_per_chunk=pairs_per_chunk,
+                time_chunk=time_chunk,
+                max_workers=max_workers,
+                attempts=attempts,
+            )
+
+        return load_candles_jsonl(
+            self.requests,
+            self.endpoint,
+            pair_ids,
+            time_bucket,
+            start_time,
+            end_time,
+            max_bytes=max_bytes,
+            progress_bar_description=progress_bar_description,
+            sanity_check_count=max_pairs,
+            attempts=attempts
+        )
+
+    def _fetch_tvl_batch(
         self,
-        pair_id: PrimaryKey,
+        pair_ids: Collection[PrimaryKey],
         time_bucket: TimeBucket,
         start_time: Optional[datetime.datetime] = None,
         end_time: Optional[datetime.datetime] = None,
         query_type: OHLCVCandleType = OHLCVCandleType.tvl_v1,
+        attempts: int = 5,
     ) -> pd.DataFrame:
-        """Internal hack to load TVL data for a single pair.
+        """Load TVL data for many pairs with a single `/candles` request.
 
         - See :py:meth:`fetch_tvl_by_pair_ids` for public API.
 
-        - TODO: Currently there is no JSONL endpoint to get liquidity data streaming.
-          Thus, we do this hack here. Also because of different data format for Uni v2 and Uni v3,
-          the server cannot handle fetching mixed pool types once.
-
-        - This function causes double caching and such.
+        :param attempts:
+            See :py:meth:`get_json_response`
 
-        - Will be replaced by a proper JSONL streaming in somepoint.
+        - TODO: Currently there is no JSONL endpoint to get liquidity data streaming.
 
+        :return:
+            DataFrame with columns "timestamp", "open", "high", "low", "close", "pair_id".
         """
 
         assert query_type in (OHLCVCandleType.tvl_v1, OHLCVCandleType.tvl_v2,), f"Got: {query_type}"
 
-        pair_ids = [pair_id]
-
-        candle_type = query_type.value
-
-        cache_fname = self._generate_cache_name(
-            pair_ids,
-            time_bucket,
-            start_time,
-            end_time,
-            candle_type=candle_type,
-        )
+        params = {
+            "time_bucket": time_bucket.value,
+            "pair_ids": ",".join([str(i) for i in pair_ids]),  # OpenAPI comma delimited array
+            "candle_type": query_type.value,
+        }
 
-        full_fname = self.get_cached_file_path(cache_fname)
+        if start_time:
+            params["start"] = start_time.isoformat()
 
-        with wait_other_writers(full_fname):
+        if end_time:
+            params["end"] = end_time.isoformat()
 
-            cached = self.get_cached_item(cache_fname)
-            path = self.get_cached_file_path(cache_fname)
+        # Use /candles endpoint to load TVL data
+        pair_candle_map = self.get_json_response(
+            "candles",
+            params=params,
+            attempts=attempts,
+        )
 
-            if cached:
-                # We have a locally cached version
-                logger.debug("Using cached Parquet data file %s", full_fname)
-                df = pd.read_parquet(cached)
-            else:
-                # Read from the server, store in the disk
-                params = {
-                    "time_bucket": time_bucket.value,
-                    # "pair_ids": ",".join([str(i) for i in pair_ids]),  # OpenAPI comma delimited array
-                    "pair_id": pair_ids[0],
-                }
+        missing = set(int(pair_id) for pair_id in pair_ids) - set(int(pair_id) for pair_id in pair_candle_map.keys())
+        if missing:
+            logger.warning("Pair ids %s - could not load TVL/liquidity data", sorted(missing))
 
-                params["candle_type"] = query_type.value
+        return XYLiquidity.convert_web_candle_map_to_dataframe(pair_candle_map)
 
-                if start_time:
-                    params["start"] = start_time.isoformat()
+    def _load_tvl_batched(
+        self,
+        pair_ids: Collection[PrimaryKey],
+        time_bucket: TimeBucket,
+        start_time: Optional[datetime.datetime],
+        end_time: Optional[datetime.datetime],
+        query_type: OHLCVCandleType,
+        pairs_per_request: int,
+        progress_bar_description: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Load TVL data for pairs, many pairs per request.
 
-                if end_time:
-                    params["end"] = end_time.isoformat()
+        - Because of different data format for Uni v2 and Uni v3,
+          the server may refuse to serve some pairs mixed in one request.
+          In this case, the pairs of the failed request are loaded one by one.
 
-                # Use /candles endpoint to load TVL data
-                pair_candle_map = self.get_json_response(
-                    "candles",
-                    params=params,
-                )
+        - A multi-pair request is tried only once, as a refused batch is
+          the normal case for mixed pool types and it is not worth waiting for retries.
+          Transient errors are retried by the pair by pair requests.
+        """
 
-                if len(pair_candle_map) > 0:
-                    # This pair has valid data
-                    for pair_id, array in pair_candle_map.items():
-                        df = XYLiquidity.convert_web_candles_to_dataframe(array)
-                        # Fill in pair id,
-                        # because /candles endpoint does not reflect it back
-                        df["pair_id"] = int(pair_id)
+        pair_ids = sorted(pair_ids)
+        batches = [pair_ids[i:i + pairs_per_request] for i in range(0, len(pair_ids), pairs_per_request)]
 
-                        # Update cache - we store a single file per pair
-                        # at the moment
-                        df.to_parquet(path)
+        if progress_bar_description:
+            # The server does not know the reply size,
+            # so we cannot render a progress bar estimation
+            progress_bar = tqdm(desc=progress_bar_description, total=len(pair_ids))
+        else:
+            progress_bar = None
 
-                else:
-                    # This pair has TVL data missing on the server,
-                    # because we asked for a single pair and did not get any data
-                    logger.warning("Pair id %d - could not load TVL/liquidity data", pair_id)
-                    df = XYLiquidity.convert_web_candles_to_dataframe([])
-                    # Update cache - we store a single file per pair
-                    # at the moment
-                    df.to_parquet(path)
+        chunks = []
+        for batch in batches:
+            try:
+                chunks.append(self._fetch_tvl_batch(
+                    batch,
+                    time_bucket,
+                    start_time,
+                    end_time,
+                    query_type=query_type,
+                    attempts=1 if len(batch) > 1 else 5,
+                ))
+            except APIError as e:
+                if len(batch) == 1:
+                    raise
+                logger.warning("Could not load TVL data for %d pairs in one request, loading pair by pair: %s", len(batch), e)
+                for pair_id in batch:
+                    chunks.append(self._fetch_tvl_batch([pair_id], time_bucket, start_time, end_time, query_type=query_type))
 
-            size = pathlib.Path(path).stat().st_size
-            if not cached:
-                logger.debug(f"Wrote {cache_fname}, disk size is {size:,}b")
-            else:
-                logger.debug(f"Read {cache_fname}, disk size is {size:,}b")
+            if progress_bar:
+                progress_bar.update(len(batch))
 
-            # Expose if this reply was cached or not,
-            # for unit testing
-            df.attrs["cached"] = cached
-            df.attrs["disk_size"] = size
+        if progress_bar:
+            progress_bar.close()
 
-        return df
+        return pd.concat(chunks, ignore_index=True)
 
     def fetch_tvl_by_pair_ids(
         self,
@@ -1218,24 +1542,32 @@ class CachedHTTPTransport:
         end_time: Optional[datetime.datetime] = None,
         progress_bar_description: Optional[str] = None,
         query_type: OHLCVCandleType = OHLCVCandleType.tvl_v1,
+        pairs_per_request: int = 100,
     ) -> pd.DataFrame:
         """Load particular set of the TVL candles and cache the result.
 
         For the candles format see :py:mod:`tradingstrategy.liquidity`.
 
+        - Pairs are requested in batches of ``pairs_per_request``
+          and decoded straight to one DataFrame
+
+        - The result is stored in a :py:class:`PairCandleCache`
+          for the time bucket and the query type. Like with
+          :py:meth:`fetch_candles_by_pair_ids`, only missing pairs and the
+          recent delta of already cached pairs are loaded from the server
+
         :param pair_ids:
             Trading pairs internal ids we query data for.
             Get internal ids from pair dataset.
 
-            We should be able to handle unlimited pair count,
-            as we do one request per pair.
-
         :param time_bucket:
             Candle time frame
 
         :param start_time:
             All candles after this.
-            If not given start from genesis.
+
+            If not given start from genesis. The result is then cached
+            for the pair set as a whole for the cache period, without delta updates.
 
         :param end_time:
             All candles before this
@@ -1243,69 +1575,91 @@ class CachedHTTPTransport:
         :param progress_bar_description:
             Display on downlood progress bar
 
+        :param pairs_per_request:
+            Max pair ids in a single `/candles` request.
+
         :return:
-            Liquidity dataframe.
+            Liquidity dataframe indexed by (pair_id, timestamp).
 
             See :py:mod:`tradingstrategy.liquidity`.
         """
 
-        #
-        # TODO: Currently there is no JSONL
-        # endpoint to get liquidity data streaming.
-        # Thus, we do this hack here.
-        # Also because of different data format for Uni v2 and Uni v3,
-        # the server cannot handle fetching mixed pool types
-        # once.
-        #
-
-        chunks = []
+        assert pairs_per_request > 0, f"Bad pairs_per_request {pairs_per_request}"
 
-        if progress_bar_description:
-            # The server does not know the reply size,
-            # so we cannot render a progress bar estimation
-            progress_bar = tqdm(desc=progress_bar_description, total=len(pair_ids))
-        else:
-            progress_bar = None
-
-        for pair_id in pair_ids:
+        def _load(load_pair_ids: Collection[PrimaryKey], load_start_time: Optional[datetime.datetime]) -> pd.DataFrame:
+            return self._load_tvl_batched(
+                load_pair_ids,
+                time_bucket,
+                load_start_time,
+                end_time,
+                query_type=query_type,
+                pairs_per_request=pairs_per_request,
+                progress_bar_description=progress_bar_description,
+            )
 
-            df = self._fetch_tvl_by_pair_id(
-                pair_id,
+        # Without start time we cannot figure out deltas,
+        # see fetch_candles_by_pair_ids(), so cache the whole reply
+        # for the pair set for the cache period
+        if not start_time:
+            cache_fname = self._generate_cache_name(
+                pair_ids,
                 time_bucket,
                 start_time,
                 end_time,
-                query_type=query_type,
+                candle_type=query_type.value,
             )
+            full_fname = self.get_cached_file_path(cache_fname)
+
+            cached = self.get_cached_item(cache_fname)
 
-            assert "timestamp" in df.columns, f"Columns lack timestamp: {df.columns}"
-            assert "pair_id" in df.columns, f"Columns lack pair_id: {df.columns}"
+            with nullcontext() if cached else wait_other_writers(full_fname):
+                cached = self.get_cached_item(cache_fname)
+                if cached:
+                    logger.debug("Using cached TVL data file %s", full_fname)
+                    df = pd.read_parquet(cached)
+                else:
+                    with atomic_replace(full_fname) as temp_path:
+                        _load(pair_ids, start_time).to_parquet(temp_path)
+                    self._record_cache_entry(full_fname, origin=f"{self.endpoint}/candles")
+                    # Same dtypes for fresh and cached results
+                    df = pd.read_parquet(full_fname)
+        else:
+            if not end_time:
+                end_time = naive_utcnow()
 
-            # Work around pd.concat() problem for some reason fails on Github,
-            # see details below
-            df = df.set_index(["pair_id", "timestamp"], drop=False)
+            cache_path = self.get_cached_file_path(f"tvl-{query_type.value}-{time_bucket.value}")
 
-            chunks.append(df)
+            with PairCandleCache(cache_path, partitioned=True) as cache:
+                partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
 
-            if progress_bar:
-                progress_bar.update()
+                # Fully cached pairs are read without waiting for the writer lock
+                fetched = partition.needs_fetch()
+                if fetched:
+                    cache.lock_for_update()
+                    partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
 
-        if progress_bar:
-            progress_bar.close()
+                    tvl_updates: list[pd.DataFrame] = []
 
-        try:
-            parts = [c for c in chunks if len(c) > 0]
-            if len(parts) > 0:
-                return pd.concat(parts)
+                    if partition.full_fetch_ids:
+                        tvl_updates.append(_load(partition.full_fetch_ids, start_time))
+
+                    delta_start_time = cache.metadata.delta_fetch_start_time()
+                    if partition.delta_fetch_ids and delta_start_time and end_time > delta_start_time:
+                        tvl_updates.append(_load(partition.delta_fetch_ids, delta_start_time))
+
+                    cache.update(tvl_updates, pair_ids, start_time, end_time)
+
+                df = cache.read(pair_ids, start_time, end_time).reset_index(drop=True)
+
+            if fetched:
+                self._record_pair_candle_cache(cache, origin=f"{self.endpoint}/candles")
             else:
-                return pd.DataFrame()
-        except ValueError as e:
-            # Happens only on Github CI
-            # https://stackoverflow.com/questions/27719407/pandas-concat-valueerror-shape-of-passed-values-is-blah-indices-imply-blah2
-            msg = ""
-            for c in chunks:
-                msg += f"Index: {c.index}\n"
-                msg += f"Data: {c}\n"
-            raise ValueError(f"pd.concat() failed:\n{msg}") from e
+                self._touch_cache_entry(cache.partition_path)
+
+        if len(df) == 0:
+            return pd.DataFrame()
+
+        return df.sort_values(["pair_id", "timestamp"]).set_index(["pair_id", "timestamp"], drop=False)
 
     def fetch_clmm_liquidity_provision_candles_by_pair_ids(
         self,
@@ -1354,7 +1708,11 @@ class CachedHTTPTransport:
 
         url = f"{self.endpoint}/clmm-candles"
 
-        with wait_other_writers(full_fname):
+        # Fresh cached files are published by atomic rename and can be read
+        # without waiting for the writer lock
+        cached = self.get_cached_item(cache_fname)
+
+        with nullcontext() if cached else wait_other_writers(full_fname):
 
             cached = self.get_cached_item(cache_fname)
             path = self.get_cached_file_path(cache_fname)
@@ -1381,6 +1739,7 @@ class CachedHTTPTransport:
                     timeout=self.timeout,
                     human_readable_hint=progress_bar_description,
                 )
+                self._record_cache_entry(path, origin=url)
 
                 size = pathlib.Path(path).stat().st_size
                 logger.debug(f"Wrote {cache_fname}, disk size is {size:,}b")
@@ -1453,7 +1812,12 @@ class CachedHTTPTransport:
 
         attempt = 0
         while attempt < max_attempts:
-            with wait_other_writers(full_fname):
+
+            # Fresh cached files are published by atomic rename and can be read
+            # without waiting for the writer lock
+            cached = self.get_cached_item(cache_fname)
+
+            with nullcontext() if cached else wait_other_writers(full_fname):
 
                 cached = self.get_cached_item(cache_fname)
                 path = self.get_cached_file_path(cache_fname)
@@ -1496,6 +1860,7 @@ class CachedHTTPTransport:
                         timeout=timeout,
                         human_readable_hint=progress_bar_description,
                     )
+                    self._record_cache_entry(path, origin=url)
 
                     size = pathlib.Path(path).stat().st_size
                     logger.debug(f"Wrote {cache_fname}, disk size is {size:,}b")
@@ -1633,8 +1998,14 @@ class CachedHTTPTransport:
         # Save cached
         for address, data in fresh_load.items():
             data["cached"] = False
-            with open(get_cache_path(address), "wb") as f:
-                f.write(orjson.dumps(data))
+            with atomic_replace(get_cache_path(address)) as temp_path:
+                with open(temp_path, "wb") as f:
+                    f.write(orjson.dumps(data))
+
+        if fresh_load:
+            self._record_cache_entry(base_cache, origin=f"{self.endpoint}/token-metadata", never_expires=True)
+        else:
+            self._touch_cache_entry(base_cache)
 
         # Load existing
         cached_load = {}
@@ -1651,6 +2022,15 @@ class CachedHTTPTransport:
         return {address: TokenMetadata(**item) for address, item in full_set.items()}
 
 
+def _get_file_age(path: str | Path) -> datetime.timedelta:
+    """How long ago a file was written, or infinite if it does not exist."""
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        return datetime.timedelta.max
+    return naive_utcnow() - naive_utcfromtimestamp(mtime)
+
+
 def _check_good_json(path: Path, exception_message: str):
     """Check that server gave us good JSON file.
 
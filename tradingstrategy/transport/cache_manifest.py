@@ -0,0 +1,440 @@
+"""Manifest index and size-bounded LRU eviction for the transport cache directory.
+
+- Each top-level item of the cache directory is one :py:class:`CacheEntry`:
+  a downloaded file, a directory like ``token-metadata``,
+  or a group of paths like a partitioned :py:class:`tradingstrategy.transport.pair_candle_cache.PairCandleCache`
+
+- The manifest is stored as ``cache-manifest.json`` in the cache directory and shared
+  by all processes using the same directory, updates are merged under a file lock
+
+- Access times are buffered in memory and written with the next update, or at most
+  every ``flush_interval`` seconds, so cache hits do not write to the disk
+
+- Readers do not lock cached files, so entries read or written within the last
+  ``grace_period`` seconds, by any process, are not evicted
+
+See :py:meth:`tradingstrategy.transport.cache.CachedHTTPTransport.enforce_cache_size`.
+"""
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Set
+
+import orjson
+from dataclasses_json import dataclass_json
+from filelock import FileLock, Timeout
+
+
+logger = logging.getLogger(__name__)
+
+
+#: Manifest file name in the cache directory
+MANIFEST_FILE_NAME = "cache-manifest.json"
+
+
+#: Cached files with an end time in their name never expire, as the history does not change
+NEVER_EXPIRES_PATTERN = re.compile(r"-to_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}")
+
+
+#: Files that belong to another entry and are not entries of their own
+AUXILIARY_SUFFIXES = (".lock", ".metadata.json", ".part", ".part.json", ".part.json.tmp", ".tmp", ".download")
+
+
+@dataclass_json
+@dataclass(slots=True)
+class CacheEntry:
+    """One item in the cache directory."""
+
+    #: Path relative to the cache directory
+    name: str
+
+    #: Disk size in bytes, including all paths of the entry
+    size: int = 0
+
+    #: UNIX time of the last read
+    last_access: float = 0.0
+
+    #: UNIX time when the data was downloaded or last revalidated
+    fetched_at: float = 0.0
+
+    #: URL the data was downloaded from, if known
+    origin: Optional[str] = None
+
+    #: Never goes stale, like candle files with ``-to_`` end time in the name
+    never_expires: bool = False
+
+    #: Other paths, relative to the cache directory, deleted together with this entry
+    extra_paths: List[str] = field(default_factory=list)
+
+    #: Path whose ``.lock`` file guards writing this entry.
+    #:
+    #: Same as :py:attr:`name` if not set.
+    lock_name: Optional[str] = None
+
+    def is_stale(self, cache_period: float, now: float) -> bool:
+        """Would the transport download this entry again.
+
+        :param cache_period:
+            Seconds
+        """
+        if self.never_expires:
+            return False
+        return now - self.fetched_at > cache_period
+
+    def get_paths(self) -> List[str]:
+        """All paths of this entry, relative to the cache directory."""
+        return [self.name] + self.extra_paths
+
+
+def get_disk_size(path: Path) -> int:
+    """Size of a file, or all files in a directory tree."""
+    if path.is_dir():
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for f in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, f))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class CacheManifest:
+    """Persistent index of the cache directory entries.
+
+    Thread safe. Multiple processes can share the same manifest file.
+    """
+
+    def __init__(self, cache_path: Path, flush_interval: float = 30.0, grace_period: Optional[float] = None):
+        """
+        :param cache_path:
+            Absolute path of the cache directory
+
+        :param flush_interval:
+            Max seconds buffered access times wait before they are written to the disk.
+
+        :param grace_period:
+            Do not evict entries accessed within this many seconds,
+            as another process may be reading them.
+
+            Must be longer than ``flush_interval``, as access times of other
+            processes reach the manifest file with this delay. Default ``2 * flush_interval``.
+        """
+        assert cache_path.is_absolute(), f"Not an absolute path: {cache_path}"
+        self.cache_path = cache_path
+        self.manifest_path = cache_path / MANIFEST_FILE_NAME
+        self.flush_interval = flush_interval
+        self.grace_period = 2 * flush_interval if grace_period is None else grace_period
+
+        self.entries: Dict[str, CacheEntry] = {}
+
+        #: Names updated in memory, not yet written
+        self.dirty: Set[str] = set()
+
+        #: Names removed in memory, not yet written
+        self.removed: Set[str] = set()
+
+        self.loaded = False
+        self.last_flush = 0.0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        with self.lock:
+            self._ensure_loaded()
+            return len(self.entries)
+
+    def get_relative_name(self, path: str | Path) -> Optional[str]:
+        """Map a path to an entry name, or ``None`` if it is outside the cache directory."""
+        path = Path(os.path.abspath(os.fspath(path)))
+        try:
+            name = path.relative_to(self.cache_path)
+        except ValueError:
+            return None
+        if name == Path("."):
+            return None
+        return name.as_posix()
+
+    def get_entry(self, name: str) -> Optional[CacheEntry]:
+        with self.lock:
+            self._ensure_loaded()
+            return self.entries.get(name)
+
+    def get_entries(self) -> List[CacheEntry]:
+        with self.lock:
+            self._ensure_loaded()
+            return list(self.entries.values())
+
+    def get_total_size(self) -> int:
+        """Disk usage of the cache, based on the manifest, without scanning the directory."""
+        with self.lock:
+            self._ensure_loaded()
+            return sum(e.size for e in self.entries.values())
+
+    def record(
+        self,
+        name: str,
+        origin: Optional[str] = None,
+        extra_paths: Collection[str] = (),
+        lock_name: Optional[str] = None,
+        never_expires: Optional[bool] = None,
+    ) -> CacheEntry:
+        """Record freshly written or revalidated data.
+
+        - The size is measured from the disk
+
+        - Written immediately
+        """
+        now = time.time()
+        with self.lock:
+            self._ensure_loaded()
+            entry = self.entries.get(name) or CacheEntry(name=name)
+            entry.origin = origin or entry.origin
+            entry.extra_paths = sorted(set(entry.extra_paths) | set(extra_paths))
+            entry.lock_name = lock_name or entry.lock_name
+            if never_expires is None:
+                never_expires = NEVER_EXPIRES_PATTERN.search(name) is not None
+            entry.never_expires = never_expires
+            entry.fetched_at = now
+            entry.last_access = now
+            entry.size = self._measure(entry)
+            self._put(entry)
+            self.flush()
+            return entry
+
+    def touch(self, name: str, size: Optional[int] = None):
+        """Record a read of a cached entry.
+
+        Unknown entries are added, so files written without :py:meth:`record` get indexed.
+
+        The first read after ``flush_interval`` is written immediately, so other processes
+        do not evict an entry that is being read.
+        """
+        now = time.time()
+        with self.lock:
+            self._ensure_loaded()
+            entry = self.entries.get(name)
+            previous_access = entry.last_access if entry else 0.0
+            if entry is None:
+                entry = CacheEntry(
+                    name=name,
+                    fetched_at=now,
+                    never_expires=NEVER_EXPIRES_PATTERN.search(name) is not None,
+                )
+                if size is None:
+                    size = self._measure(entry)
+                # Best guess for files downloaded by older versions
+                try:
+                    entry.fetched_at = (self.cache_path / name).stat().st_mtime
+                except FileNotFoundError:
+                    pass
+            if size is not None:
+                entry.size = size
+            entry.last_access = now
+            self._put(entry)
+            if now - self.last_flush > self.flush_interval or now - previous_access > self.flush_interval:
+                self.flush()
+
+    def remove(self, name: str):
+        """Forget an entry. Does not delete files."""
+        with self.lock:
+            self._ensure_loaded()
+            self.entries.pop(name, None)
+            self.dirty.discard(name)
+            self.removed.add(name)
+            self.flush()
+
+    def clear(self):
+        """Forget all entries, after the cache directory has been wiped."""
+        with self.lock:
+            self.entries = {}
+            self.dirty = set()
+            self.removed = set()
+            self.loaded = False
+
+    def sync(self):
+        """Reconcile the manifest with the cache directory.
+
+        - Index top-level files and directories that are not in the manifest yet
+
+        - Drop entries whose files have been deleted
+
+        This is the only operation that scans the directory.
+        """
+        with self.lock:
+            self._ensure_loaded()
+
+            if not self.cache_path.exists():
+                return
+
+            grouped = set()
+            for entry in self.entries.values():
+                grouped.update(entry.get_paths())
+                if entry.lock_name:
+                    grouped.add(entry.lock_name)
+
+            for entry in list(self.entries.values()):
+                if not any((self.cache_path / name).exists() for name in entry.get_paths()):
+                    self.entries.pop(entry.name)
+                    self.dirty.discard(entry.name)
+                    self.removed.add(entry.name)
+
+            for item in os.scandir(self.cache_path):
+                name = item.name
+                if name in grouped or name in self.entries or name.startswith(MANIFEST_FILE_NAME):
+                    continue
+                if name.endswith(AUXILIARY_SUFFIXES):
+                    continue
+                mtime = item.stat().st_mtime
+                entry = CacheEntry(
+                    name=name,
+                    last_access=mtime,
+                    fetched_at=mtime,
+                    never_expires=NEVER_EXPIRES_PATTERN.search(name) is not None,
+                )
+                entry.size = self._measure(entry)
+                self._put(entry)
+
+            self.flush()
+
+    def select_evictions(
+        self,
+        max_size: int,
+        cache_period: float,
+        protected: Collection[str] = (),
+    ) -> List[CacheEntry]:
+        """Pick entries to delete to fit in ``max_size`` bytes.
+
+        - Stale entries go first, as they would be downloaded again anyway
+
+        - Then the least recently used entries
+
+        - Entries with ``-to_`` end time never go stale, but can be evicted by LRU,
+          as they can always be downloaded again
+
+        - Entries accessed within ``grace_period`` are not evicted
+
+        :param cache_period:
+            Seconds after which a non-timestamped entry is stale
+
+        :param protected:
+            Names not to evict, like the file just downloaded
+        """
+        now = time.time()
+        with self.lock:
+            self._ensure_loaded()
+            total = sum(e.size for e in self.entries.values())
+            if total <= max_size:
+                return []
+
+            candidates = [e for e in self.entries.values() if e.name not in protected and not self._is_in_use(e, now)]
+            candidates.sort(key=lambda e: (not e.is_stale(cache_period, now), e.last_access))
+
+            selected = []
+            for entry in candidates:
+                if total <= max_size:
+                    break
+                selected.append(entry)
+                total -= entry.size
+            return selected
+
+    def evict(self, entry: CacheEntry) -> bool:
+        """Delete the files of an entry.
+
+        - Skipped if a writer holds the lock of the entry
+
+        - Skipped if any process has accessed the entry within ``grace_period``,
+          as readers do not take the lock
+
+        :return:
+            True if the entry was deleted
+        """
+        lock_name = entry.lock_name or entry.name
+        lock = FileLock(self.cache_path / f"{lock_name}.lock", timeout=0)
+        try:
+            with lock:
+                # Access times of other processes since we loaded the manifest
+                on_disk = self._read().get(entry.name)
+                if self._is_in_use(entry, time.time()) or (on_disk and self._is_in_use(on_disk, time.time())):
+                    logger.info("Not evicting %s, it was recently read", entry.name)
+                    return False
+                for name in entry.get_paths():
+                    path = self.cache_path / name
+                    if path.is_dir():
+                        shutil.rmtree(path, ignore_errors=True)
+                    elif path.exists():
+                        path.unlink()
+                    sidecar = self.cache_path / f"{name}.metadata.json"
+                    if sidecar.exists():
+                        sidecar.unlink()
+        except Timeout:
+            logger.info("Not evicting %s, it is being written", entry.name)
+            return False
+
+        logger.info("Evicted %s from the cache, %d bytes", entry.name, entry.size)
+        self.remove(entry.name)
+        return True
+
+    def flush(self):
+        """Merge in-memory changes to the manifest file."""
+        with self.lock:
+            if not (self.dirty or self.removed):
+                self.last_flush = time.time()
+                return
+
+            os.makedirs(self.cache_path, exist_ok=True)
+            with FileLock(f"{self.manifest_path}.lock"):
+                on_disk = self._read()
+                for name in self.removed:
+                    on_disk.pop(name, None)
+                for name in self.dirty:
+                    entry = self.entries[name]
+                    other = on_disk.get(name)
+                    if other is not None:
+                        # Another process read the entry later
+                        entry.last_access = max(entry.last_access, other.last_access)
+                    on_disk[name] = entry
+                tmp_path = f"{self.manifest_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(orjson.dumps({"entries": {name: e.to_dict() for name, e in on_disk.items()}}))
+                os.replace(tmp_path, self.manifest_path)
+
+            self.entries = on_disk
+            self.dirty = set()
+            self.removed = set()
+            self.last_flush = time.time()
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.entries = self._read()
+            self.loaded = True
+
+    def _read(self) -> Dict[str, CacheEntry]:
+        try:
+            data = orjson.loads(self.manifest_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("Could not read cache manifest %s: %s, rebuilding", self.manifest_path, e)
+            return {}
+        return {name: CacheEntry.from_dict(value) for name, value in data["entries"].items()}
+
+    def _is_in_use(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.last_access < self.grace_period
+
+    def _put(self, entry: CacheEntry):
+        self.entries[entry.name] = entry
+        self.dirty.add(entry.name)
+        self.removed.discard(entry.name)
+
+    def _measure(self, entry: CacheEntry) -> int:
+        return sum(get_disk_size(self.cache_path / name) for name in entry.get_paths())
@@ -2,6 +2,7 @@ import logging
 import os
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
 from filelock import FileLock
 
@@ -15,6 +16,12 @@ def wait_other_writers(path: Path | str, timeout: int = 120):
     - Work around issues when parallel unit tests and such
       try to write the same file
 
+    - Only writers need to take the lock. Files published with :py:func:`atomic_replace`
+      are always complete, so readers can check for a cached file first, and
+      wait for the lock only if the file is missing or expired.
+      Check again after acquiring the lock, as another writer may have
+      just published the file.
+
     Example:
 
     .. code-block:: python
@@ -31,12 +38,17 @@ def wait_other_writers(path: Path | str, timeout: int = 120):
             # Al tests use a cached dataset stored in the /tmp directory
             path = os.path.join(tempfile.gettempdir(), "my_shared_data.parquet")
 
+            # Published by another process, no need to wait
+            if os.path.exists(path):
+                return pd.read_parquet(path)
+
             with wait_other_writers(path):
 
                 # Read result from the previous writer
-                if not path.exists(path):
+                if not os.path.exists(path):
                     # Download and write to cache
-                    urllib.request.urlretrieve("https://example.com", path)
+                    with atomic_replace(path) as temp_path:
+                        urllib.request.urlretrieve("https://example.com", temp_path)
 
                 return pd.read_parquet(path)
 
@@ -77,3 +89,39 @@ def wait_other_writers(path: Path | str, timeout: int = 120):
 
     with lock:
         yield
+
+
+@contextmanager
+def atomic_replace(path: Path | str, suffix: str = ".tmp") -> Iterator[str]:
+    """Write a file under a temporary name and publish it with an atomic rename.
+
+    - Readers either see the previous complete file or the new complete file,
+      never a partially written one
+
+    - Readers that have the previous file open keep reading it
+
+    - On error the temporary file is removed and the previous file is left in place
+
+    Use together with :py:func:`wait_other_writers`, as the temporary name is the same for all writers.
+
+    Example:
+
+    .. code-block:: python
+
+        with wait_other_writers(path):
+            with atomic_replace(path) as temp_path:
+                df.to_parquet(temp_path)
+
+    :param path:
+        Final file path
+
+    :param suffix:
+        Suffix of the temporary file, in the same directory
+    """
+    temp_path = f"{os.fspath(path)}{suffix}"
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
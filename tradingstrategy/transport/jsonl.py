@@ -6,13 +6,15 @@
 """
 import logging
 import time
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 
 import datetime
-from typing import Optional, Dict, Collection
+from typing import Optional, Dict, Collection, Iterable, List, Tuple
 
+import numpy as np
+import orjson
 import requests
 import jsonlines
 from math import nan
@@ -49,6 +51,17 @@ CANDLE_MAPPINGS = {
 }
 
 
+#: Candle columns we decode directly to typed arrays.
+#:
+#: Timestamps are kept as UNIX seconds and converted after decoding.
+CANDLE_COLUMN_TYPES = {
+    column: ("int64" if column == "timestamp" else dtype)
+    for column, dtype in Candle.DATAFRAME_FIELDS.items()
+    if column in CANDLE_MAPPINGS.values()
+}
+
+
+
 class JSONLMaxResponseSizeExceeded(Exception):
     """Raised if we ask too much JSONL data from the server."""
 
@@ -61,6 +74,139 @@ class JSONLEndpointError(Exception):
     """Server did not return any data for some reason."""
 
 
+def iterate_jsonl_batches(
+    stream,
+    block_size: int = 4 * 1024 * 1024,
+) -> Iterable[List[dict]]:
+    """Decode a JSONL byte stream in batches.
+
+    - Read the stream in blocks of `block_size` bytes and decode all complete lines
+      of a block with a single :py:func:`orjson.loads` call,
+      instead of decoding line by line
+
+    :param stream:
+        File-like object with `read()`, e.g. :py:attr:`requests.Response.raw`
+
+    :raise JSONLMaxResponseSizeExceeded:
+        If the server terminated the stream
+
+    :raise JSONLEndpointError:
+        If the server returned an error
+
+    :return:
+        Iterable of lists of decoded rows
+    """
+
+    remainder = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        data = remainder + block
+        cut = data.rfind(b"\n")
+        if cut == -1:
+            remainder = data
+            continue
+        remainder = data[cut + 1:]
+        rows = _decode_jsonl_lines(data[:cut])
+        if rows:
+            yield rows
+
+    rows = _decode_jsonl_lines(remainder)
+    if rows:
+        yield rows
+
+
+def _decode_jsonl_lines(data: bytes) -> List[dict]:
+    """Decode newline separated JSON objects as one JSON array."""
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    if not lines:
+        return []
+
+    rows = orjson.loads(b"[" + b",".join(lines) + b"]")
+
+    # Only scan rows when the batch may contain an error message
+    if b'"error' in data:
+        for item in rows:
+            # Stream terminated forcefully
+            if "error" in item:
+                raise JSONLMaxResponseSizeExceeded(str(item))
+
+            if "error_id" in item:
+                #  {'error_id': 'CandleLookupError', 'message': 'Start and the same: 2024-10-17 18:00:0
+                raise JSONLEndpointError(str(item))
+
+    return rows
+
+
+class JSONLColumnDecoder:
+    """Collect decoded JSONL rows to DataFrame columns.
+
+    - Rows are translated to columns one batch at a time,
+      not key by key for every row
+
+    - Columns with a known type are stored as typed NumPy arrays,
+      not lists of Python objects, keeping the peak memory close to the final DataFrame
+
+    - Other columns are stored as lists, so pandas infers their type the same way as
+      :py:meth:`pd.DataFrame.from_dict` does
+    """
+
+    def __init__(
+        self,
+        mappings: Dict[str, str],
+        column_types: Optional[Dict[str, str]] = None,
+    ):
+        """
+        :param mappings:
+            Mapping between JSONL object keys and DataFrame columns
+
+        :param column_types:
+            DataFrame column -> NumPy dtype for columns we can store as typed arrays
+        """
+        self.mappings = mappings
+        self.column_types = column_types or {}
+        self.columns: Dict[str, list] = {}
+
+    def add_rows(self, rows: List[dict]):
+        """Translate a batch of decoded rows to columns."""
+
+        # Keys in the order of the first row
+        keys = list(rows[0])
+        seen = set(keys)
+        for key in set().union(*rows):
+            if key not in seen:
+                keys.append(key)
+
+        for key in keys:
+            translated_key = self.mappings[key]
+            if translated_key is None:
+                # Deprecated/discarded keys
+                continue
+
+            try:
+                values = [item[key] for item in rows]
+            except KeyError as e:
+                raise RuntimeError(f"Bad JSONL data. Some rows are missing {key}, first row is {rows[0]}") from e
+
+            column = self.columns.setdefault(translated_key, [])
+            dtype = self.column_types.get(translated_key)
+            if dtype is not None:
+                column.append(np.asarray(values, dtype=dtype))
+            else:
+                column.extend(values)
+
+    def get_columns(self) -> Dict[str, np.ndarray | list]:
+        """Get the decoded columns, in the order they appeared in the data."""
+        columns = {}
+        for key, column in self.columns.items():
+            if key in self.column_types:
+                columns[key] = np.concatenate(column)
+            else:
+                columns[key] = column
+        return columns
+
+
 def load_trading_strategy_like_jsonl_data(
     session: requests.Session,
     api_url: str,
@@ -73,6 +219,7 @@ def load_trading_strategy_like_jsonl_data(
     progress_bar_description: Optional[str] = None,
     attempts=5,
     sleep=30,
+    column_types: Optional[Dict[str, str]] = None,
 ) -> pd.DataFrame:
     """Read data from JSONL endpoint.
 
@@ -104,6 +251,11 @@ def load_trading_strategy_like_jsonl_data(
     :param mappings:
         Mapping between JSONL object keys and DataFrame columns
 
+    :param column_types:
+        Decode these DataFrame columns directly to typed NumPy arrays.
+
+        See :py:class:`JSONLColumnDecoder`.
+
     :return:
         In-place modified DataFrame passed to this function
     """
@@ -136,7 +288,7 @@ def load_trading_strategy_like_jsonl_data(
         logger.debug("Full params are %s", params)
 
     for attempt in range(attempts):
-        candle_data = defaultdict(list)
+        decoder = JSONLColumnDecoder(mappings, column_types)
 
         # Figure out how to plot candle download progress using TQDM
         # Draw progress bar using timestamps first candle - last candle
@@ -145,51 +297,35 @@ def load_trading_strategy_like_jsonl_data(
         progress_bar_end = to_int_unix_timestamp(progress_bar_end)
         current_ts = last_ts = None
         progress_bar = None
-        refresh_rate = 200  # Update the progress bar for every N candles
 
         logger.info("Download attempt %d", attempt+1)
 
         try:
 
             resp = session.get(api_url, params=params, stream=True)
-            reader = jsonlines.Reader(resp.raw)
 
-            # Massage the format good for pandas
-            for idx, item in enumerate(reader):
+            # Decode the response in byte batches, update the progress bar once per batch
+            for rows in iterate_jsonl_batches(resp.raw):
 
-                # Stream terminated forcefully
-                if "error" in item:
-                    raise JSONLMaxResponseSizeExceeded(str(item))
+                decoder.add_rows(rows)
 
-                if "error_id" in item:
-                    #  {'error_id': 'CandleLookupError', 'message': 'Start and the same: 2024-10-17 18:00:0
-                    raise JSONLEndpointError(str(item))
-
-                current_ts = item["ts"]
+                current_ts = rows[-1]["ts"]
 
                 # Set progress bar start to the first timestamp
                 if not progress_bar_start and progress_bar_description:
-                    progress_bar_start = current_ts
-                    logger.debug("First candle timestamp at %s", current_ts)
+                    progress_bar_start = rows[0]["ts"]
+                    logger.debug("First candle timestamp at %s", progress_bar_start)
                     total = progress_bar_end - progress_bar_start
                     assert progress_bar_start <= progress_bar_end, f"Mad progress bar {progress_bar_start} - {progress_bar_end}"
                     progress_bar = tqdm(desc=progress_bar_description, total=total)
+                    last_ts = progress_bar_start
+
+                if last_ts and progress_bar:
+                    progress_bar.update(current_ts - last_ts)
+                    progress_bar.set_postfix({"Currently at": naive_utcfromtimestamp(current_ts)})
+                last_ts = current_ts
 
-                # Translate the raw compressed keys to our internal
-                # Pandas keys
-                for key, value in item.items():
-                    translated_key = mappings[key]
-                    if translated_key is None:
-                        # Deprecated/discarded keys
-                        continue
-
-                    candle_data[translated_key].append(value)
-
-                if idx % refresh_rate == 0:
-                    if last_ts and progress_bar:
-                        progress_bar.update(current_ts - last_ts)
-                        progress_bar.set_postfix({"Currently at": naive_utcfromtimestamp(current_ts)})
-                    last_ts = current_ts
+            candle_data = decoder.get_columns()
             break
         except Exception as e:
             # Deal with all sort of errors, some not related to HTTP status code
@@ -241,7 +377,8 @@ def load_candles_jsonl(
     max_bytes: Optional[int] = None,
     progress_bar_description: Optional[str] = None,
     sanity_check_count: int = 75,
-    attempts: int = 5
+    attempts: int = 5,
+    sleep: float = 30,
 ) -> pd.DataFrame:
     """Load candles using JSON API and produce a DataFrame.
 
@@ -283,6 +420,8 @@ def load_candles_jsonl(
         max_bytes,
         progress_bar_description,
         attempts=attempts,
+        sleep=sleep,
+        column_types=CANDLE_COLUMN_TYPES,
     )
 
     # Not supported at the momemnt
@@ -303,6 +442,168 @@ def load_candles_jsonl(
     return df
 
 
+def split_candle_fetch_chunks(
+    pair_ids: Collection[PrimaryKey],
+    start_time: Optional[datetime.datetime],
+    end_time: Optional[datetime.datetime],
+    pairs_per_chunk: int,
+    time_chunk: Optional[datetime.timedelta] = None,
+) -> List[Tuple[List[PrimaryKey], Optional[datetime.datetime], Optional[datetime.datetime]]]:
+    """Shard a candle download to pair id and time range chunks.
+
+    :param pairs_per_chunk:
+        Max pair ids per a JSONL request
+
+    :param time_chunk:
+        Split the time range to windows of this length.
+
+        Needs both `start_time` and `end_time`.
+
+    :return:
+        List of (pair ids, start time, end time) tuples
+    """
+    assert pairs_per_chunk > 0, f"Got pairs_per_chunk {pairs_per_chunk}"
+
+    sorted_pair_ids = sorted(pair_ids)
+    pair_chunks = [sorted_pair_ids[i:i + pairs_per_chunk] for i in range(0, len(sorted_pair_ids), pairs_per_chunk)]
+
+    if time_chunk is not None:
+        assert start_time and end_time, "time_chunk needs both start_time and end_time"
+        assert time_chunk > datetime.timedelta(0), f"Got time_chunk {time_chunk}"
+        time_ranges = []
+        cursor = start_time
+        while cursor < end_time:
+            window_end = min(cursor + time_chunk, end_time)
+            time_ranges.append((cursor, window_end))
+            cursor = window_end
+    else:
+        time_ranges = [(start_time, end_time)]
+
+    return [(chunk, start, end) for chunk in pair_chunks for start, end in time_ranges]
+
+
+def load_candles_jsonl_parallel(
+    session: requests.Session,
+    server_url: str,
+    pair_ids: Collection[PrimaryKey],
+    time_bucket: TimeBucket,
+    start_time: Optional[datetime.datetime] = None,
+    end_time: Optional[datetime.datetime] = None,
+    max_bytes: Optional[int] = None,
+    progress_bar_description: Optional[str] = None,
+    pairs_per_chunk: int = 250,
+    time_chunk: Optional[datetime.timedelta] = None,
+    max_workers: int = 4,
+    attempts: int = 5,
+    sleep: float = 30,
+) -> pd.DataFrame:
+    """Load candles for a large number of pairs using concurrent JSONL requests.
+
+    - Pair ids, and optionally the time range, are split to chunks
+      using :py:func:`split_candle_fetch_chunks`
+
+    - Each chunk is one :py:func:`load_candles_jsonl` request,
+      run on a thread pool with `max_workers` concurrent connections
+
+    - Each chunk retries on its own, so one broken stream
+      does not restart the whole download
+
+    - Chunks without any data are skipped
+
+    The session connection pool should be at least `max_workers` connections.
+    The default :py:class:`requests.adapters.HTTPAdapter` pool is 10 connections.
+
+    :param pairs_per_chunk:
+        Max pair ids per a JSONL request
+
+    :param time_chunk:
+        Split the time range to windows of this length
+
+    :param max_workers:
+        Max concurrent requests
+
+    :param progress_bar_description:
+        Display chunk progress bar
+
+    :raise NoJSONLData:
+        If none of the chunks returned data
+
+    :return:
+        Dataframe with candle data for giving pairs,
+        in the same format as :py:func:`load_candles_jsonl`.
+    """
+
+    assert max_workers > 0, f"Got max_workers {max_workers}"
+
+    chunks = split_candle_fetch_chunks(
+        pair_ids,
+        start_time,
+        end_time,
+        pairs_per_chunk=pairs_per_chunk,
+        time_chunk=time_chunk,
+    )
+
+    logger.info(
+        "Loading candles for %d pairs in %d chunks, %d workers",
+        len(pair_ids),
+        len(chunks),
+        max_workers,
+    )
+
+    def _load_chunk(chunk_pair_ids, chunk_start, chunk_end) -> Optional[pd.DataFrame]:
+        try:
+            return load_candles_jsonl(
+                session,
+                server_url,
+                chunk_pair_ids,
+                time_bucket,
+                chunk_start,
+                chunk_end,
+                max_bytes=max_bytes,
+                sanity_check_count=len(chunk_pair_ids) + 1,
+                attempts=attempts,
+                sleep=sleep,
+            )
+        except NoJSONLData:
+            # Pairs did not trade within this time window
+            return None
+
+    progress_bar = None
+    if progress_bar_description:
+        progress_bar = tqdm(desc=progress_bar_description, total=len(chunks))
+
+    dfs = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_load_chunk, *chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                df = future.result()
+                if df is not None:
+                    dfs.append(df)
+                if progress_bar:
+                    progress_bar.update()
+        except Exception:
+            # Do not start chunks that have not started yet
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if progress_bar:
+                progress_bar.close()
+
+    if len(dfs) == 0:
+        raise NoJSONLData(f"Did not get any data, pair ids:{len(pair_ids)}, start:{start_time}, end:{end_time}")
+
+    df = pd.concat(dfs)
+
+    # Time windows share their boundary candles
+    df = df[~df.duplicated(subset=["pair_id", "timestamp"], keep="first")]
+    # Timestamp is both the index and a column, so sort in two stable passes
+    df = df.sort_values("pair_id", kind="stable").sort_index(kind="stable")
+
+    logger.debug("Loaded %d rows in %d chunks", len(df), len(chunks))
+    return df
+
 
 def load_token_metadata_jsonl(
     session: requests.Session,
@@ -9,9 +9,10 @@ import os
 import pathlib
 from typing import Collection, NamedTuple
 
+import numpy as np
 import pandas as pd
 
-from tradingstrategy.transport.cache_utils import wait_other_writers
+from tradingstrategy.transport.cache_utils import atomic_replace, wait_other_writers
 from tradingstrategy.types import PrimaryKey
 from tradingstrategy.utils.time import naive_utcfromtimestamp, from_iso, to_iso
 
@@ -20,6 +21,9 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CANDLE_LOOKBACK_HOURS = 48
 
+#: How many pair id buckets we use in the partitioned cache storage
+DEFAULT_PAIR_BUCKETS = 64
+
 
 @dataclass_json
 @dataclass(slots=True)
@@ -69,6 +73,10 @@ class PairFetchPartition(NamedTuple):
     full_fetch_ids: set[PrimaryKey]
     delta_fetch_ids: set[PrimaryKey]
 
+    def needs_fetch(self) -> bool:
+        """Are some of the pairs missing from the cache, or not cached up to the end time."""
+        return bool(self.full_fetch_ids or self.delta_fetch_ids)
+
 
 @dataclass_json
 @dataclass(slots=True)
@@ -128,8 +136,9 @@ class PairCandleMetadata:
         if not self._file_path:
             raise ValueError("Cannot save: no file path set")
 
-        with open(self._file_path, "w") as f:
-            f.write(self.to_json(indent=2))
+        with atomic_replace(self._file_path) as temp_path:
+            with open(temp_path, "w") as f:
+                f.write(self.to_json(indent=2))
 
         # Update last_modified_at after save
         self._last_modified_at = datetime.fromtimestamp(os.path.getmtime(self._file_path))
@@ -248,39 +257,115 @@ class PairCandleCache:
             # ... perform fetches ...
             cache.update([df1, df2])  # Update cache with new data
             return cache.data[] # filter as needed
+
+    The cache has two storage modes:
+
+    - Single file: all candles are stored in one `.parquet` file that is
+      loaded, merged and rewritten as a whole on every update
+
+    - Partitioned: candles are stored in `<base_path>.partitioned/pair_bucket=<n>/month=<YYYY-MM>/data.parquet`
+      files. An update only rewrites the partitions its new candles fall into,
+      and :py:meth:`read` only opens the partitions of the requested pairs and months,
+      using Parquet row group filters within them.
+      Any existing single file cache is migrated on the first use.
+
+    Example usage with the partitioned storage:
+
+    .. code-block:: python
+
+        with PairCandleCache(cache_path, partitioned=True) as cache:
+            partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
+            if partition.needs_fetch():
+                # Another writer may have fetched the data while we waited
+                cache.lock_for_update()
+                partition = cache.metadata.partition_for_fetch(pair_ids, start_time, end_time)
+                # ... perform fetches ...
+                cache.update([df1, df2], pair_ids, start_time, end_time)
+            return cache.read(pair_ids, start_time, end_time)
     """
 
-    def __init__(self, base_path: str):
+    def __init__(
+        self,
+        base_path: str,
+        partitioned: bool = False,
+        pair_buckets: int = DEFAULT_PAIR_BUCKETS,
+    ):
         """Initialize cache with base file path.
 
         :param base_path:
             Absolute path without extension (e.g., "/path/to/candles-1h").
             Extensions .parquet, .json, .lock will be appended as needed.
+
+        :param partitioned:
+            Use the partitioned storage.
+
+        :param pair_buckets:
+            Number of pair id buckets in the partitioned storage.
+
+            Pair id goes to the bucket `pair_id % pair_buckets`.
+            Must not change for an existing cache.
         """
         self.base_path = base_path
         self.parquet_path = f"{base_path}.parquet"
         self.metadata_path = f"{base_path}.json"
+        self.partition_path = f"{base_path}.partitioned"
+        self.partitioned = partitioned
+        self.pair_buckets = pair_buckets
 
         self._lock_context = None
         self._data = None
         self._metadata = None
 
     def __enter__(self) -> "PairCandleCache":
-        """Enter context manager, acquiring file lock."""
-        self._lock_context = wait_other_writers(self.base_path)
-        self._lock_context.__enter__()
+        """Enter context manager.
 
-        # Load existing data and metadata
-        self._load_data()
+        - The single file storage is locked for the whole context
+
+        - The partitioned storage is not locked. Partitions and metadata are published
+          with atomic renames, so fully cached pairs can be read while another process
+          is writing. Call :py:meth:`lock_for_update` before fetching missing data.
+        """
+
+        # Load existing data and metadata.
+        # Partitioned data is not loaded up front, see read().
+        if self.partitioned:
+            if os.path.exists(self.parquet_path) and not os.path.exists(self.partition_path):
+                self.lock_for_update()
+                self._migrate_single_file()
+        else:
+            self.lock_for_update()
+            self._load_data()
         self._load_metadata()
 
         return self
 
-
     def __exit__(self, *args: object):
         """Exit context manager, releasing file lock."""
         if self._lock_context:
             self._lock_context.__exit__(*args)  # type: ignore
+            self._lock_context = None
+
+    def lock_for_update(self) -> bool:
+        """Wait other writers before fetching and writing new data.
+
+        - Metadata is loaded again, as another writer may have updated the cache while we waited,
+          so figure out what to fetch after calling this
+
+        - The lock is released when the context manager exits
+
+        :return:
+            True if the lock was acquired, False if we already held it
+        """
+        if self._lock_context is not None:
+            return False
+
+        self._lock_context = wait_other_writers(self.base_path)
+        self._lock_context.__enter__()
+
+        if self._metadata is not None:
+            self._load_metadata()
+
+        return True
 
     def _load_data(self) -> None:
         """Load existing parquet data if available.
@@ -312,9 +397,179 @@ class PairCandleCache:
         """Load metadata from JSON file."""
         self._metadata = PairCandleMetadata.load(self.metadata_path)
 
+    def _get_partition_file(self, bucket: int, month: str) -> str:
+        """Get the file path of one partition."""
+        return os.path.join(self.partition_path, f"pair_bucket={bucket}", f"month={month}", "data.parquet")
+
+    def _get_partition_files(
+        self,
+        pair_ids: Collection[PrimaryKey] | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> list[str]:
+        """Get existing partition files that may contain candles for the given pairs and time range.
+
+        Partitions are pruned by their directory names, without opening any files.
+        """
+        if not os.path.exists(self.partition_path):
+            return []
+
+        if pair_ids is not None:
+            buckets = sorted({int(pair_id) % self.pair_buckets for pair_id in pair_ids})
+        else:
+            buckets = sorted(
+                int(name.split("=")[1]) for name in os.listdir(self.partition_path) if name.startswith("pair_bucket=")
+            )
+
+        # Months sort correctly as YYYY-MM strings
+        start_month = pd.Timestamp(start_time).strftime("%Y-%m") if start_time else None
+        end_month = pd.Timestamp(end_time).strftime("%Y-%m") if end_time else None
+
+        files = []
+        for bucket in buckets:
+            bucket_path = os.path.join(self.partition_path, f"pair_bucket={bucket}")
+            if not os.path.exists(bucket_path):
+                continue
+            for name in sorted(os.listdir(bucket_path)):
+                if not name.startswith("month="):
+                    continue
+                month = name.split("=")[1]
+                if start_month and month < start_month:
+                    continue
+                if end_month and month > end_month:
+                    continue
+                fname = self._get_partition_file(bucket, month)
+                if os.path.exists(fname):
+                    files.append(fname)
+        return files
+
+    def _write_partition(self, fname: str, df: pd.DataFrame) -> None:
+        """Write one partition file.
+
+        Written to a temporary file first, so a crash does not leave a half-written partition behind.
+        """
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        temp_fname = f"{fname}.tmp"
+        df.to_parquet(temp_fname, index=False)
+        os.replace(temp_fname, fname)
+
+    def _migrate_single_file(self) -> None:
+        """Move the existing single file cache to the partitioned storage."""
+        if not os.path.exists(self.parquet_path) or os.path.exists(self.partition_path):
+            return
+
+        logger.info(f"Migrating {self.parquet_path} to partitioned storage {self.partition_path}")
+        self._load_data()
+        if not self.data.empty:
+            self._update_partitions([self.data])
+        os.remove(self.parquet_path)
+        self._data = None
+
+    def _update_partitions(self, new_dataframes: list[pd.DataFrame]) -> None:
+        """Merge new candles to the partitions they fall into."""
+        new_data = pd.concat(new_dataframes, ignore_index=True)
+        if new_data.empty:
+            return
+
+        buckets = new_data["pair_id"].to_numpy() % self.pair_buckets
+        months = new_data["timestamp"].to_numpy().astype("datetime64[M]")
+
+        touched = 0
+        for (bucket, month), partition_new_data in new_data.groupby([buckets, months], sort=False):
+            fname = self._get_partition_file(int(bucket), pd.Timestamp(month).strftime("%Y-%m"))
+            if os.path.exists(fname):
+                partition_new_data = pd.concat([pd.read_parquet(fname), partition_new_data], ignore_index=True)
+
+            partition_data = (
+                partition_new_data
+                  .drop_duplicates(subset=["pair_id", "timestamp"], keep="last")
+                  .sort_values(["pair_id", "timestamp"])  # type: ignore
+            )
+            self._write_partition(fname, partition_data)
+            touched += 1
+
+        logger.debug(f"Wrote {len(new_data):,} candles to {touched} partitions in {self.partition_path}")
+
+    def _get_partitioned_max_timestamp(self) -> pd.Timestamp | None:
+        """Get the latest candle timestamp stored in the partitions.
+
+        Only the partitions of the latest month are read.
+        """
+        files = self._get_partition_files()
+        if not files:
+            return None
+        latest_month = max(os.path.basename(os.path.dirname(f)) for f in files)
+        latest_files = [f for f in files if os.path.basename(os.path.dirname(f)) == latest_month]
+        return max(pd.read_parquet(f, columns=["timestamp"])["timestamp"].max() for f in latest_files)
+
+    def read(
+        self,
+        pair_ids: Collection[PrimaryKey] | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> pd.DataFrame:
+        """Read cached candles for pairs and a time range.
+
+        - In the partitioned storage, only partitions of the requested pairs and months are opened,
+          and the filters are pushed down to Parquet row group reads
+
+        :param pair_ids:
+            Pairs to read, or all pairs
+
+        :param start_time:
+            Start time, inclusive
+
+        :param end_time:
+            End time, inclusive
+
+        :return:
+            Candles sorted by pair id and timestamp, with "timestamp" index.
+        """
+        if not self.partitioned:
+            data = self.data
+            if data.empty:
+                return data
+            mask = np.ones(len(data), dtype=bool)
+            if pair_ids is not None:
+                mask &= data["pair_id"].isin(pair_ids).to_numpy()
+            if start_time is not None:
+                mask &= (data["timestamp"] >= start_time).to_numpy()
+            if end_time is not None:
+                mask &= (data["timestamp"] <= end_time).to_numpy()
+            return data[mask]
+
+        filters = []
+        if pair_ids is not None:
+            filters.append(("pair_id", "in", [int(pair_id) for pair_id in pair_ids]))
+        if start_time is not None:
+            filters.append(("timestamp", ">=", pd.Timestamp(start_time)))
+        if end_time is not None:
+            filters.append(("timestamp", "<=", pd.Timestamp(end_time)))
+
+        dfs = []
+        for fname in self._get_partition_files(pair_ids, start_time, end_time):
+            df = pd.read_parquet(fname, filters=filters or None)
+            if not df.empty:
+                dfs.append(df)
+
+        if not dfs:
+            return pd.DataFrame()
+
+        return (
+            pd.concat(dfs, ignore_index=True)
+              .sort_values(["pair_id", "timestamp"])  # type: ignore
+              .set_index("timestamp", drop=False)
+        )
+
     @property
     def data(self) -> pd.DataFrame:
-        """Access to the cached candle DataFrame."""
+        """Access to the cached candle DataFrame.
+
+        With the partitioned storage, this loads all partitions.
+        Use :py:meth:`read` instead.
+        """
+        if self.partitioned and self._metadata is not None and self._data is None:
+            self._data = self.read()
         assert self._data is not None, "Cache not properly initialized - use as context manager"
         return self._data
 
@@ -348,6 +603,12 @@ class PairCandleCache:
         :param end_time:
             End time used for the fetch operation.
         """
+        if self.partitioned:
+            # Callers should lock before fetching, so they do not fetch data another writer already stored
+            self.lock_for_update()
+            self._update_partitioned(new_dataframes, pair_ids, start_time, end_time)
+            return
+
         assert self._data is not None, "Data should be initialized"
 
         # Only update parquet data if there are new dataframes to add
@@ -376,3 +637,32 @@ class PairCandleCache:
 
         self.metadata.update(pair_ids, start_time, metadata_end_time)
         self.metadata.save()
+
+    def _update_partitioned(
+        self,
+        new_dataframes: list[pd.DataFrame],
+        pair_ids: Collection[PrimaryKey],
+        start_time: datetime,
+        end_time: datetime
+    ) -> None:
+        """Update the partitioned storage with new candle data.
+
+        See :py:meth:`update`.
+        """
+        assert self._metadata is not None, "Cache not properly initialized - use as context manager"
+
+        if new_dataframes:
+            self._update_partitions(new_dataframes)
+            # Loaded lazily again if accessed
+            self._data = None
+
+        # See update() why we use the actual data end time
+        max_ts = self._get_partitioned_max_timestamp()
+        if max_ts is not None:
+            actual_end_time = max_ts.to_pydatetime() if hasattr(max_ts, 'to_pydatetime') else max_ts
+            metadata_end_time = min(end_time, actual_end_time)
+        else:
+            metadata_end_time = start_time
+
+        self.metadata.update(pair_ids, start_time, metadata_end_time)
+        self.metadata.save()
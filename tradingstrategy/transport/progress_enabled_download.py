@@ -1,16 +1,40 @@
-"""Python requests library downloads with a TQDM progress bar."""
+"""Python requests library downloads with a TQDM progress bar.
+
+- Large files are downloaded as several HTTP Range segments in parallel
+
+- Data is written to a ``.part`` file next to the target, with the segment progress
+  stored in a ``.part.json`` state file, so an interrupted download resumes where it stopped
+
+- The file is checked and atomically renamed to the target path only after it is complete
+"""
+import base64
 import functools
+import hashlib
+import json
 import logging
+import os
 import shutil
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-from requests import Session
+from requests import Response, Session
+from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
 from tqdm_loggable.auto import tqdm
 from urllib3.exceptions import ProtocolError
 
 
 logger = logging.getLogger(__name__)
 
+
+#: Network errors after which the download is retried
+RETRYABLE_ERRORS = (ProtocolError, ChunkedEncodingError, ConnectionError, Timeout)
+
+
+#: How many bytes a segment downloads between saving the partial download state
+STATE_SAVE_INTERVAL = 8 * 1024 * 1024
+
+
 def download_with_tqdm_progress_bar(
     session: Session,
     path: str,
@@ -19,6 +43,9 @@ def download_with_tqdm_progress_bar(
     timeout: float | tuple,
     human_readable_hint: Optional[str],
     attempts:int = 3,
+    segments: int = 4,
+    min_segment_size: int = 32 * 1024 * 1024,
+    chunk_size: int = 1024 * 1024,
 ):
     """Use tqdm library to raw a graphical progress bar in notebooks for long downloads.
 
@@ -28,6 +55,21 @@ def download_with_tqdm_progress_bar(
 
     - Displays ANSI progress bar in a console
 
+    If the server supports HTTP Range requests, the download is resumable:
+
+    - The file is split to up to ``segments`` byte ranges of at least ``min_segment_size`` bytes,
+      downloaded over parallel connections
+
+    - A broken connection retries only the rest of its segment
+
+    - If the process dies, the next call continues from the ``.part`` file,
+      unless the remote file has changed (ETag, Last-Modified or size differ)
+
+    Otherwise the file is streamed over a single connection as a whole.
+
+    The size of the finished file is checked against ``Content-Length``, and its MD5 against
+    ``Content-MD5`` if the server sends one, before the file is renamed to ``path``.
+
     See :py:meth:`tradingstrategy.transport.cache.CachedHTTPTransport.save_response` for more information.
 
     :param timeout:
@@ -36,12 +78,105 @@ def download_with_tqdm_progress_bar(
     :param attempts:
         Number of attempts before giving up.
 
+        For segmented downloads, per segment.
+
+    :param segments:
+        Max parallel connections for a file.
+
+    :param min_segment_size:
+        Do not split the file to segments smaller than this.
+
+    :param chunk_size:
+        Read and write buffer size.
+
+    :return:
+        ``path``
     """
     # https://stackoverflow.com/questions/37573483/progress-bar-while-download-file-over-http-with-requests
     # https://stackoverflow.com/questions/42212810/tqdm-in-jupyter-notebook-prints-new-progress-bars-repeatedly
 
-    r = session.get(url, stream=True, allow_redirects=True, params=params, timeout=timeout)
-    if r.status_code != 200:
+    assert attempts > 0, f"Bad attempts {attempts}"
+    assert segments > 0, f"Bad segments {segments}"
+
+    r = _get(session, url, params, timeout)
+
+    file_size = int(r.headers.get('Content-Length', 0))
+
+    desc = human_readable_hint or ""
+
+    # Add warning about missing Content-Length header
+    desc += " (Unknown total file size)" if file_size == 0 else ""
+
+    part_path = f"{path}.part"
+    state_path = f"{path}.part.json"
+
+    encoding = r.headers.get("Content-Encoding", "identity").lower()
+    resumable = (
+        file_size > 0
+        and r.headers.get("Accept-Ranges", "").lower() == "bytes"
+        and encoding == "identity"
+    )
+
+    if resumable:
+        validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+        _download_segments(
+            session,
+            r,
+            part_path,
+            state_path,
+            url,
+            params,
+            timeout,
+            file_size=file_size,
+            validator=validator,
+            desc=desc,
+            attempts=attempts,
+            segments=segments,
+            min_segment_size=min_segment_size,
+            chunk_size=chunk_size,
+        )
+    else:
+        _download_stream(
+            session,
+            r,
+            part_path,
+            url,
+            params,
+            timeout,
+            file_size=file_size,
+            desc=desc,
+            attempts=attempts,
+        )
+
+    try:
+        # With compression, Content-Length is the size on the wire
+        if file_size > 0 and encoding == "identity":
+            written = os.path.getsize(part_path)
+            if written != file_size:
+                raise RuntimeError(f"Downloaded {url} to {part_path}, got {written:,} bytes, expected {file_size:,} bytes")
+
+        content_md5 = r.headers.get("Content-MD5")
+        if content_md5:
+            _check_md5(part_path, content_md5, url)
+    except RuntimeError:
+        # Do not resume from a corrupted file
+        os.remove(part_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        raise
+
+    os.replace(part_path, path)
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    return path
+
+
+def _get(session: Session, url: str, params: dict, timeout: float | tuple, headers: Optional[dict] = None) -> Response:
+    """Start a streaming GET request and check the reply status."""
+    r = session.get(url, stream=True, allow_redirects=True, params=params, timeout=timeout, headers=headers)
+    if r.status_code not in (200, 206):
         try:
             r.raise_for_status()  # Will only raise for 4xx codes, so...
             raise RuntimeError(f"Request to {url} returned status code {r.status_code}")
@@ -49,35 +184,217 @@ def download_with_tqdm_progress_bar(
             # Add more context information
             auth_key = session.headers.get("Authorization", "")[0:12]
             raise RuntimeError(f"Failed to do an API call, using API key {auth_key}...") from e
+    return r
 
-    file_size = int(r.headers.get('Content-Length', 0))
-
-    desc = human_readable_hint or ""
 
-    # Add warning about missing Content-Length header
-    desc += " (Unknown total file size)" if file_size == 0 else ""
+def _download_stream(
+    session: Session,
+    r: Response,
+    part_path: str,
+    url: str,
+    params: dict,
+    timeout: float | tuple,
+    file_size: int,
+    desc: str,
+    attempts: int,
+):
+    """Download the whole file over a single connection.
 
+    The server does not support ranges, so each retry starts from the beginning.
+    """
     attempt = 0
     while attempt < attempts:
         try:
             r.raw.read = functools.partial(r.raw.read, decode_content=True)  # Decompress if needed
             with tqdm.wrapattr(r.raw, "read", total=file_size, desc=desc) as r_raw:
-                with open(path, "wb") as f:
+                with open(part_path, "wb") as f:
                     shutil.copyfileobj(r_raw, f)
-
-            return path
-        except ProtocolError as e:
+            return
+        except RETRYABLE_ERRORS as e:
             # ProtocolError: ('Connection broken: IncompleteRead(20834 bytes read)', IncompleteRead(20834 bytes read))
             attempt += 1
             logger.warning(
                 "download_with_tqdm_progress_bar(): Downloading %s. Retry %d / %d. Got error: %s",
-                path,
+                part_path,
                 attempt + 1,
                 attempts,
                 str(e),
                 exc_info=True,
             )
+            r.close()
             if attempt >= attempts:
                 raise
+            r = _get(session, url, params, timeout)
+
+
+def _split_segments(file_size: int, segments: int, min_segment_size: int) -> List[List[int]]:
+    """Split a file to [start, end) byte ranges.
+
+    :return:
+        List of ``[start, end, downloaded_until]`` segments
+    """
+    count = max(1, min(segments, file_size // max(min_segment_size, 1)))
+    step = -(-file_size // count)
+    return [[start, min(start + step, file_size), start] for start in range(0, file_size, step)]
+
+
+def _load_state(state_path: str, part_path: str, url: str, file_size: int, validator: Optional[str]) -> Optional[List[List[int]]]:
+    """Load the segments of a previous interrupted download of the same remote file."""
+    if not (os.path.exists(state_path) and os.path.exists(part_path)):
+        return None
+
+    try:
+        with open(state_path, "rt") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read partial download state %s: %s", state_path, e)
+        return None
+
+    if (state.get("url"), state.get("size"), state.get("validator")) != (url, file_size, validator):
+        logger.info("Remote file %s changed, discarding partial download %s", url, part_path)
+        return None
+
+    if os.path.getsize(part_path) != file_size:
+        return None
+
+    return state["segments"]
+
+
+def _save_state(state_path: str, url: str, file_size: int, validator: Optional[str], segments: List[List[int]]):
+    """Atomically write the partial download state."""
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "wt") as f:
+        json.dump({"url": url, "size": file_size, "validator": validator, "segments": segments}, f)
+    os.replace(tmp_path, state_path)
+
+
+def _download_segments(
+    session: Session,
+    r: Response,
+    part_path: str,
+    state_path: str,
+    url: str,
+    params: dict,
+    timeout: float | tuple,
+    file_size: int,
+    validator: Optional[str],
+    desc: str,
+    attempts: int,
+    segments: int,
+    min_segment_size: int,
+    chunk_size: int,
+):
+    """Download byte ranges of the file in parallel to a preallocated ``.part`` file.
+
+    :param r:
+        The initial response, used for the first segment of a fresh download
+    """
+
+    ranges = _load_state(state_path, part_path, url, file_size, validator)
+    if ranges is None:
+        ranges = _split_segments(file_size, segments, min_segment_size)
+        with open(part_path, "wb") as f:
+            f.truncate(file_size)
+        _save_state(state_path, url, file_size, validator, ranges)
+    else:
+        logger.info(
+            "Resuming download of %s, %d / %d bytes already downloaded",
+            url,
+            sum(done - start for start, end, done in ranges),
+            file_size,
+        )
+
+    lock = threading.Lock()
+    initial = sum(done - start for start, end, done in ranges)
+    progress_bar = tqdm(total=file_size, initial=initial, desc=desc, unit="B", unit_scale=True, unit_divisor=1024)
+
+    def _save():
+        with lock:
+            _save_state(state_path, url, file_size, validator, ranges)
+
+    def _download_segment(segment: List[int], response: Optional[Response]):
+        start, end, done = segment
+        attempt = 0
+        while done < end:
+            try:
+                if response is None:
+                    response = _get(session, url, params, timeout, headers={"Range": f"bytes={done}-{end - 1}", "Accept-Encoding": "identity"})
+                    if response.status_code != 206:
+                        raise RuntimeError(f"Server did not honour Range request for {url}, got status {response.status_code}")
+
+                unsaved = 0
+                with open(part_path, "r+b") as f:
+                    f.seek(done)
+                    for chunk in response.iter_content(chunk_size=min(chunk_size, end - done)):
+                        if len(chunk) > end - done:
+                            chunk = chunk[0:end - done]
+                        f.write(chunk)
+                        done += len(chunk)
+                        unsaved += len(chunk)
+                        with lock:
+                            progress_bar.update(len(chunk))
+                        if unsaved >= STATE_SAVE_INTERVAL:
+                            f.flush()
+                            segment[2] = done
+                            _save()
+                            unsaved = 0
+                        if done >= end:
+                            break
+
+                response.close()
+                response = None
+                segment[2] = done
+
+                if done < end:
+                    # Server closed the stream cleanly, but short
+                    raise ProtocolError(f"Segment {start}-{end} ended at {done}")
+
+            except RETRYABLE_ERRORS as e:
+                segment[2] = done
+                attempt += 1
+                logger.warning(
+                    "download_with_tqdm_progress_bar(): Downloading %s bytes %d-%d. Retry %d / %d. Got error: %s",
+                    part_path,
+                    done,
+                    end,
+                    attempt + 1,
+                    attempts,
+                    str(e),
+                )
+                if response is not None:
+                    response.close()
+                    response = None
+                if attempt >= attempts:
+                    raise
+
+    # The initial response streams from the byte 0
+    first = ranges[0]
+    if first[2] == 0:
+        responses = [r] + [None] * (len(ranges) - 1)
+    else:
+        r.close()
+        responses = [None] * len(ranges)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download-segment") as executor:
+            futures = [executor.submit(_download_segment, segment, response) for segment, response in zip(ranges, responses)]
+            for future in futures:
+                future.result()
+    finally:
+        progress_bar.close()
+        # Keep the progress for the next attempt
+        _save()
+
+    logger.debug("Downloaded %s in %d segments", url, len(ranges))
+
 
+def _check_md5(path: str, content_md5: str, url: str):
+    """Check the file against a base64 encoded Content-MD5 header."""
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(functools.partial(f.read, 1024 * 1024), b""):
+            md5.update(block)
 
+    digest = base64.b64encode(md5.digest()).decode("ascii")
+    if digest != content_md5:
+        raise RuntimeError(f"Downloaded {url}, MD5 mismatch, got {digest}, expected {content_md5}")
@@ -131,6 +131,7 @@ def aggregate_ohlcv_across_pairs(
     pair_universe: PandasPairUniverse,
     price_df: pd.DataFrame,
     liquidity_df: DataFrameGroupBy | None = None,
+    vectorised: bool = True,
 ) -> pd.DataFrame:
     """Builds an aggregates dataframe for trading data.
 
@@ -199,6 +200,11 @@ def aggregate_ohlcv_across_pairs(
 
         Only "close" column is used.
 
+    :param vectorised:
+        Aggregate all assets in one pass with :py:func:`aggregate_ohlcv_across_pairs_vectorised`.
+
+        Otherwise aggregate asset by asset.
+
     :return:
         DataFrame with following colmuns
 
@@ -219,6 +225,9 @@ def aggregate_ohlcv_across_pairs(
     assert isinstance(pair_universe, PandasPairUniverse)
     # assert isinstance(price_df, pd.DataFrame)
 
+    if vectorised:
+        return aggregate_ohlcv_across_pairs_vectorised(pair_universe, price_df, liquidity_df)
+
     aggregates, reverse_aggregates =  build_aggregate_map(
         pair_universe,
     )
@@ -263,3 +272,92 @@ def aggregate_ohlcv_across_pairs(
         chunks.append(aggregated_rows)
 
     return pd.concat(chunks)
+
+
+def aggregate_ohlcv_across_pairs_vectorised(
+    pair_universe: PandasPairUniverse,
+    price_df: DataFrameGroupBy,
+    liquidity_df: DataFrameGroupBy | None = None,
+) -> pd.DataFrame:
+    """Builds an aggregates dataframe for trading data in a single pass.
+
+    - Each candle row is mapped to its aggregate through a `pair_id -> aggregate number` lookup array
+
+    - Volume weights, weighted OHLC and volume and liquidity sums are calculated
+      with one groupby over `(aggregate, timestamp)`, instead of selecting
+      and concatenating the rows of each aggregate separately
+
+    - The output is identical to :py:func:`aggregate_ohlcv_across_pairs` with `vectorised=False`
+
+    For the arguments and the output see :py:func:`aggregate_ohlcv_across_pairs`.
+    """
+
+    assert isinstance(pair_universe, PandasPairUniverse)
+
+    aggregates, reverse_aggregates = build_aggregate_map(
+        pair_universe,
+    )
+
+    price_df_raw = price_df.obj
+    assert "timestamp" in price_df_raw.columns  # TODO: Generate from index if not present as a column
+
+    # pair_id -> aggregate number, in the aggregate map order
+    aggregate_ids = list(aggregates.keys())
+    pair_id_table = np.full(max(reverse_aggregates.keys(), default=0) + 1, -1, dtype=np.int64)
+    for aggregate_number, agg_id in enumerate(aggregate_ids):
+        pair_id_table[list(aggregates[agg_id])] = aggregate_number
+
+    row_pair_ids = price_df_raw.index.get_level_values(0).to_numpy().astype(np.int64)
+    known = (row_pair_ids >= 0) & (row_pair_ids < len(pair_id_table))
+    aggregate_numbers = np.full(len(row_pair_ids), -1, dtype=np.int64)
+    aggregate_numbers[known] = pair_id_table[row_pair_ids[known]]
+    selected = aggregate_numbers >= 0
+
+    df = pd.DataFrame({
+        "aggregate": aggregate_numbers[selected],
+        "timestamp": price_df_raw["timestamp"].to_numpy()[selected],
+    })
+    for column in ("open", "high", "low", "close", "volume"):
+        df[column] = price_df_raw[column].to_numpy()[selected]
+
+    if liquidity_df is not None:
+        # pair_id  timestamp
+        # 2697585  2023-07-02    2.654539e+07
+        #          2023-07-09    1.086443e+07
+        liquidity = liquidity_df.obj.reindex(price_df_raw.index)
+        df["liquidity"] = liquidity.to_numpy()[selected]
+
+    keys = [df["aggregate"], df["timestamp"]]
+
+    # Calculate 0..1 weight for each (pair_id, timestamp) combo,
+    # with equal weight on zero volume, see calculate_volume_weighted_ohlcv()
+    total_volume_in_timestamp = df.groupby(keys)["volume"].transform("sum")
+    placeholder_volume = 1.0
+    weight = df["volume"].replace(0, placeholder_volume) / total_volume_in_timestamp.replace(0, placeholder_volume)
+
+    weighted = pd.DataFrame({
+        "open": df["open"] * weight,
+        "high": df["high"] * weight,
+        "low": df["low"] * weight,
+        "close": df["close"] * weight,
+        "volume": df["volume"],
+    })
+    if liquidity_df is not None:
+        weighted["liquidity"] = df["liquidity"]
+
+    result_df = weighted.groupby(keys).sum()
+    aggregate_numbers = result_df.index.get_level_values("aggregate").to_numpy()
+    result_df.index = result_df.index.get_level_values("timestamp")
+
+    aggregate_names = np.array([str(agg_id) for agg_id in aggregate_ids], dtype=object)
+    base_symbols = np.array([agg_id.base_token_symbol for agg_id in aggregate_ids], dtype=object)
+
+    # One list per aggregate, shared by its rows
+    pair_id_lists = np.empty(len(aggregate_ids), dtype=object)
+    for aggregate_number, agg_id in enumerate(aggregate_ids):
+        pair_id_lists[aggregate_number] = list(aggregates[agg_id])
+
+    result_df["aggregate_id"] = aggregate_names[aggregate_numbers]
+    result_df["base"] = base_symbols[aggregate_numbers]
+    result_df["pair_ids"] = pair_id_lists[aggregate_numbers]
+    return result_df
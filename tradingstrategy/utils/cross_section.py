@@ -0,0 +1,286 @@
+"""Point-in-time cross-sections over multipair data.
+
+- Answer "all pairs at time t" and "last N bars for all pairs before t"
+  without scanning the full dataset on every strategy cycle
+
+- A sorted timestamp -> row positions index is built once, so exact timestamp
+  and time range lookups are binary searches followed by a slice.
+  If the data is already in the timestamp order, its index is used as is.
+
+- As-of lookups use :py:class:`tradingstrategy.utils.offset_index.PairOffsetIndex`
+  and run one vectorised binary search for all pairs at once.
+  The pair-sorted data is only created on the first as-of lookup.
+
+Example:
+
+.. code-block:: python
+
+    candle_universe = GroupedCandleUniverse(raw_candles)
+    cross_section = candle_universe.get_cross_section()
+
+    # Latest candle of each pair before the strategy cycle timestamp,
+    # ignoring pairs that have not traded for a week
+    candles = cross_section.get_samples_as_of(timestamp, tolerance=pd.Timedelta(days=7))
+
+    # Close prices of the last 20 candles before the timestamp,
+    # pairs x 20 matrix, padded with NaN for pairs with shorter history
+    pair_ids, closes = cross_section.get_last_values(timestamp, 20, column="close")
+
+See :py:meth:`tradingstrategy.utils.groupeduniverse.PairGroupedUniverse.get_cross_section`.
+"""
+
+import datetime
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingstrategy.utils.offset_index import PairOffsetIndex
+
+
+def _to_datetime64(ts: pd.Timestamp | datetime.datetime, dtype: np.dtype) -> np.datetime64:
+    """Convert a timestamp to a NumPy scalar with the resolution of our data."""
+    return np.datetime64(pd.Timestamp(ts).to_datetime64(), "ns").astype(dtype)
+
+
+class TimestampRowIndex:
+    """Sorted timestamp -> row positions index over a DataFrame.
+
+    - Row positions are kept in timestamp order, so all rows
+      of a timestamp or a time range are one continuous slice
+
+    - If the timestamps are already sorted, no copy is made
+      and the rows are found directly
+
+    - Results are returned in the original DataFrame row order
+    """
+
+    def __init__(self, timestamps: np.ndarray):
+        """Build the index.
+
+        :param timestamps:
+            `datetime64` array, one entry per DataFrame row.
+        """
+
+        if len(timestamps) < 2 or (timestamps[1:] >= timestamps[:-1]).all():
+            #: Row positions in the timestamp order, or `None` if the rows are already sorted
+            self.order: np.ndarray | None = None
+
+            #: Timestamps in sorted order
+            self.sorted_timestamps: np.ndarray = timestamps
+        else:
+            self.order = np.argsort(timestamps, kind="stable")
+            self.sorted_timestamps = timestamps[self.order]
+
+    def __len__(self) -> int:
+        return len(self.sorted_timestamps)
+
+    def get_rows_by_range(
+        self,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+    ) -> np.ndarray:
+        """Get rows within a time range.
+
+        :param start:
+            Start timestamp, inclusive
+
+        :param end:
+            End timestamp, inclusive
+
+        :return:
+            Row positions in the original row order
+        """
+        dtype = self.sorted_timestamps.dtype
+        lo = np.searchsorted(self.sorted_timestamps, _to_datetime64(start, dtype), side="left")
+        hi = np.searchsorted(self.sorted_timestamps, _to_datetime64(end, dtype), side="right")
+        if self.order is None:
+            return np.arange(lo, hi)
+        return np.sort(self.order[lo:hi])
+
+    def get_rows_by_timestamp(self, ts: pd.Timestamp) -> np.ndarray:
+        """Get rows at an exact timestamp.
+
+        :return:
+            Row positions in the original row order
+        """
+        return self.get_rows_by_range(ts, ts)
+
+
+class CrossSection:
+    """Point-in-time views over all pairs of a grouped universe.
+
+    - Created with :py:meth:`tradingstrategy.utils.groupeduniverse.PairGroupedUniverse.get_cross_section`
+
+    - Exact timestamp and range lookups operate on `universe.df`
+
+    - As-of lookups operate on the pair-sorted data from
+      :py:meth:`tradingstrategy.utils.groupeduniverse.PairGroupedUniverse.get_pair_sorted_data`,
+      created on the first as-of lookup
+
+    - Lookups return rows for pairs that have data, pairs without data are omitted
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        get_pair_sorted_data: Callable[[], Tuple[PairOffsetIndex, pd.DataFrame]],
+    ):
+        """Build the cross-section index.
+
+        :param df:
+            Timestamp indexed multipair data.
+
+        :param get_pair_sorted_data:
+            Returns the pair offset index and the same data sorted by `(pair_id, timestamp)`.
+
+            Only called for as-of lookups, as sorting may need a copy of the data.
+        """
+        assert isinstance(df.index, pd.DatetimeIndex), f"Expected DatetimeIndex, got {type(df.index)}"
+        self.df = df
+        self.get_pair_sorted_data = get_pair_sorted_data
+        self.timestamp_index = TimestampRowIndex(df.index.values)
+
+    @property
+    def offset_index(self) -> PairOffsetIndex:
+        """Pair offset index over :py:attr:`pair_sorted_df`."""
+        return self.get_pair_sorted_data()[0]
+
+    @property
+    def pair_sorted_df(self) -> pd.DataFrame:
+        """The data sorted by `(pair_id, timestamp)`."""
+        return self.get_pair_sorted_data()[1]
+
+    def get_samples_by_timestamp(self, ts: pd.Timestamp) -> pd.DataFrame:
+        """Get samples for all pairs at an exact timestamp.
+
+        Same as filtering `df` by the timestamp, but without a full scan.
+        """
+        return self.df.iloc[self.timestamp_index.get_rows_by_timestamp(ts)]
+
+    def get_samples_by_range(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """Get samples for all pairs within a time range.
+
+        Same as filtering `df` by the time range, but without a full scan.
+
+        :param start: start of the range (inclusive)
+        :param end: end of the range (inclusive)
+        """
+        return self.df.iloc[self.timestamp_index.get_rows_by_range(start, end)]
+
+    def get_rows_as_of(
+        self,
+        ts: pd.Timestamp,
+        allow_current: bool = True,
+        tolerance: pd.Timedelta | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the last sample row of every pair at or before a timestamp.
+
+        :param ts:
+            Point of time
+
+        :param allow_current:
+            Include samples exactly at `ts`.
+
+            Set to `False` in backtesting decision cycles to avoid lookahead bias.
+
+        :param tolerance:
+            Ignore pairs whose last sample is older than this.
+
+        :return:
+            Tuple (pair ids, row positions in the pair-sorted data).
+
+            Only pairs that have a sample are included.
+        """
+        index = self.offset_index
+        when = pd.Timestamp(ts).to_datetime64().astype("datetime64[ns]")
+        if not allow_current:
+            when = when - np.timedelta64(1, "ns")
+
+        pair_ids = index.pair_ids
+        rows = index.get_rows_at_or_before(pair_ids, np.full(len(pair_ids), when))
+        mask = rows >= 0
+
+        if tolerance is not None and mask.any():
+            sample_timestamps = index.timestamps[np.maximum(rows, 0)].astype("datetime64[ns]")
+            mask &= sample_timestamps >= np.datetime64(pd.Timestamp(ts).to_datetime64(), "ns") - tolerance.to_timedelta64()
+
+        return pair_ids[mask], rows[mask]
+
+    def get_samples_as_of(
+        self,
+        ts: pd.Timestamp,
+        allow_current: bool = True,
+        tolerance: pd.Timedelta | None = None,
+    ) -> pd.DataFrame:
+        """Get the latest sample of every pair at or before a timestamp.
+
+        See :py:meth:`get_rows_as_of` for the arguments.
+
+        :return:
+            One row per pair, in the pair id order.
+        """
+        pair_ids, rows = self.get_rows_as_of(ts, allow_current=allow_current, tolerance=tolerance)
+        return self.pair_sorted_df.iloc[rows]
+
+    def get_last_rows(
+        self,
+        ts: pd.Timestamp,
+        count: int,
+        allow_current: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get row positions of the last N samples of every pair before a timestamp.
+
+        :return:
+            Tuple (pair ids, rows).
+
+            `rows` is pairs x count matrix of row positions in the pair-sorted data,
+            oldest sample first. Missing samples for pairs with a shorter history are `-1`.
+        """
+        assert count > 0, f"Got count {count}"
+        pair_ids, last_rows = self.get_rows_as_of(ts, allow_current=allow_current)
+        starts = self.offset_index.starts[self.offset_index.get_pair_positions(pair_ids)]
+        rows = last_rows[:, np.newaxis] - np.arange(count - 1, -1, -1)[np.newaxis, :]
+        rows = np.where(rows >= starts[:, np.newaxis], rows, -1)
+        return pair_ids, rows
+
+    def get_last_samples(
+        self,
+        ts: pd.Timestamp,
+        count: int,
+        allow_current: bool = False,
+    ) -> pd.DataFrame:
+        """Get the last N samples of every pair before a timestamp.
+
+        - By default the sample at `ts` is not included to avoid lookahead bias
+
+        :return:
+            Samples of all pairs, grouped by pair and in the timestamp order within a pair.
+        """
+        pair_ids, rows = self.get_last_rows(ts, count, allow_current=allow_current)
+        flat_rows = rows.ravel()
+        return self.pair_sorted_df.iloc[flat_rows[flat_rows >= 0]]
+
+    def get_last_values(
+        self,
+        ts: pd.Timestamp,
+        count: int,
+        column: str = "close",
+        allow_current: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get a dense pairs x count matrix of the last N values of a column before a timestamp.
+
+        Useful for vectorised indicators like momentum across all pairs.
+
+        :return:
+            Tuple (pair ids, values).
+
+            `values` is float matrix, oldest sample first,
+            padded with `NaN` for pairs with a shorter history.
+        """
+        pair_ids, rows = self.get_last_rows(ts, count, allow_current=allow_current)
+        column_values = self.pair_sorted_df[column].to_numpy(dtype="float64")
+        if len(column_values) == 0:
+            return pair_ids, np.full(rows.shape, np.nan)
+        values = np.where(rows >= 0, column_values[np.maximum(rows, 0)], np.nan)
+        return pair_ids, values
@@ -22,8 +22,10 @@ import warnings
 
 from typing import Collection
 
+import numpy as np
 import pandas as pd
-from pandas._libs.tslibs import BaseOffset
+from pandas._libs.tslibs import BaseOffset, Tick
+from pandas.tseries.frequencies import to_offset
 from pandas.core.groupby import DataFrameGroupBy
 
 
@@ -550,6 +552,7 @@ def resample_candles_multiple_pairs(
     fix_and_sort_index=True,
     forward_fill_until: datetime.datetime | None = None,
     multipair: bool = True,
+    vectorised: bool = True,
 ) -> pd.DataFrame:
     """Upsample a OHLCV trading pair data to a lower time bucket.
 
@@ -570,6 +573,12 @@ def resample_candles_multiple_pairs(
     :parma fix_and_sort_index:
         Make sure we have a good timestamp index before proceeding.
 
+    :param vectorised:
+        Resample all pairs at once with :py:func:`resample_candles_multiple_pairs_vectorised`
+        when the data and the frequency are supported.
+
+        Otherwise resample pair by pair.
+
     :return:
         Concatenated DataFrame of individually resampled pair data
     """
@@ -583,6 +592,15 @@ def resample_candles_multiple_pairs(
 
     assert pair_id_column in df.columns, f"Trying to break multipair data to individual pairs, but {pair_id_column} is not in the DataFrame columns {df.columns.tolist()}."
 
+    if vectorised and _can_resample_vectorised(df, frequency, pair_id_column, copy_columns):
+        return resample_candles_multiple_pairs_vectorised(
+            df,
+            frequency,
+            pair_id_column=pair_id_column,
+            forward_fill_columns=forward_fill_columns,
+            forward_fill_until=forward_fill_until,
+        )
+
     by_pair = df.groupby(pair_id_column)
     segments = []
 
@@ -625,6 +643,253 @@ def resample_candles_multiple_pairs(
     return df
 
 
+def _forward_fill_within_pairs(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Forward fill NaN values, not crossing the pair boundaries.
+
+    :param values:
+        Float values of multiple pairs, rows of each pair continuous
+
+    :param first:
+        Boolean mask of the first row of each pair
+    """
+    rows = np.arange(len(values))
+    last_valid = np.maximum.accumulate(np.where(~np.isnan(values), rows, -1))
+    pair_starts = np.maximum.accumulate(np.where(first, rows, 0))
+    filled = values[np.maximum(last_valid, 0)]
+    return np.where(last_valid >= pair_starts, filled, np.nan)
+
+
+def _can_resample_vectorised(
+    df: pd.DataFrame,
+    frequency: pd.Timedelta | BaseOffset | str,
+    pair_id_column: str,
+    copy_columns: Collection[str],
+) -> bool:
+    """Check if :py:func:`resample_candles_multiple_pairs_vectorised` supports the data.
+
+    - Fixed length frequencies only, not e.g. calendar months
+
+    - Float OHLCV columns
+    """
+    if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is not None:
+        return False
+
+    try:
+        offset = to_offset(frequency)
+    except ValueError:
+        return False
+
+    if not isinstance(offset, Tick):
+        return False
+
+    if "close" not in df.columns or pair_id_column != "pair_id":
+        return False
+
+    if any(c != pair_id_column and c in df.columns for c in copy_columns):
+        return False
+
+    for column in ("open", "high", "low", "close", "volume"):
+        if column in df.columns and df[column].dtype != np.float64:
+            return False
+
+    if "forward_filled" in df.columns and df["forward_filled"].dtype != bool:
+        return False
+
+    return True
+
+
+def resample_candles_multiple_pairs_vectorised(
+    df: pd.DataFrame,
+    frequency: pd.Timedelta | BaseOffset | str,
+    pair_id_column="pair_id",
+    forward_fill_columns: Collection[str]=("open", "high", "low", "close", "volume",),
+    forward_fill_until: datetime.datetime | None = None,
+) -> pd.DataFrame:
+    """Resample and forward fill OHLCV data of all pairs at once.
+
+    - Produces the same output as resampling pair by pair in :py:func:`resample_candles_multiple_pairs`
+
+    - Rows are sorted once by `(pair_id, timestamp)`, then each row gets its
+      time bucket number relative to the pair start, same as :py:meth:`pd.DataFrame.resample`
+      with a fixed frequency does
+
+    - The full `(pair, timestamp)` grid from the first to the last bucket of each pair
+      is built in one go, OHLCV values are aggregated with `reduceat` over
+      the continuous rows of each bucket and then forward filled by propagating
+      the last valid row index
+
+    - Called by :py:func:`resample_candles_multiple_pairs`,
+      which checks the data is supported
+
+    :param df:
+        Multipair OHLCV data with a DatetimeIndex
+
+    :param frequency:
+        Fixed length frequency, e.g. `"1h"` or `pd.Timedelta(days=1)`
+
+    :return:
+        Concatenated resampled pair data, in the pair id order
+    """
+
+    if forward_fill_until is not None:
+        forward_fill_until = pd.Timestamp(forward_fill_until)
+
+    # Rows with no pair id are dropped by groupby()
+    df = df.loc[df[pair_id_column].notna()]
+
+    index_dtype = df.index.dtype
+    unit = np.datetime_data(index_dtype)[0]
+    freq = pd.Timedelta(to_offset(frequency)).to_timedelta64().astype(f"timedelta64[{unit}]").astype(np.int64)
+    day = np.timedelta64(1, "D").astype(f"timedelta64[{unit}]").astype(np.int64)
+
+    timestamps = df.index.values.astype(np.int64)
+    pair_ids = df[pair_id_column].to_numpy()
+
+    # Group rows by pair, stable so rows keep their order within a timestamp
+    order = np.lexsort((timestamps, pair_ids))
+    timestamps = timestamps[order]
+    pair_ids = pair_ids[order]
+    row_count = len(order)
+
+    if row_count == 0:
+        return resample_candles_multiple_pairs(df, frequency, pair_id_column=pair_id_column, forward_fill_columns=forward_fill_columns, forward_fill_until=forward_fill_until, vectorised=False)
+
+    pair_starts = np.flatnonzero(np.concatenate(([True], pair_ids[1:] != pair_ids[:-1])))
+    pair_ends = np.concatenate((pair_starts[1:], [row_count]))
+    pair_row_counts = pair_ends - pair_starts
+
+    # Bucket edges are counted from the midnight of the first timestamp of each pair,
+    # like pandas resample(origin="start_day")
+    origins = np.repeat((timestamps[pair_starts] // day) * day, pair_row_counts)
+    buckets = (timestamps - origins) // freq
+    first_buckets = buckets[pair_starts]
+    last_buckets = buckets[pair_ends - 1]
+    bucket_counts = last_buckets - first_buckets + 1
+
+    # Forward fill until: extend each pair with whole buckets up to the timestamp
+    if forward_fill_until is not None:
+        last_timestamps = (timestamps[pair_starts] // day) * day + last_buckets * freq
+        until = pd.Timestamp(forward_fill_until).to_datetime64().astype(f"datetime64[{unit}]").astype(np.int64)
+        padding_counts = np.maximum((until - last_timestamps) // freq, 0)
+    else:
+        padding_counts = np.zeros(len(pair_starts), dtype=np.int64)
+
+    grid_counts = bucket_counts + padding_counts
+    grid_starts = np.concatenate(([0], np.cumsum(grid_counts)[:-1]))
+    grid_size = int(grid_counts.sum())
+
+    grid_pair_position = np.repeat(np.arange(len(pair_starts)), grid_counts)
+    grid_step = np.arange(grid_size) - np.repeat(grid_starts, grid_counts)
+    grid_timestamps = (timestamps[pair_starts] // day * day)[grid_pair_position] + (first_buckets[grid_pair_position] + grid_step) * freq
+    grid_first = np.zeros(grid_size, dtype=bool)
+    grid_first[grid_starts] = True
+    grid_padding = grid_step >= bucket_counts[grid_pair_position]
+
+    # Grid row of each data row, and the continuous data rows of each non-empty bucket
+    data_grid_rows = np.repeat(grid_starts - first_buckets, pair_row_counts) + buckets
+    new_segment = np.concatenate(([True], data_grid_rows[1:] != data_grid_rows[:-1]))
+    segment_starts = np.flatnonzero(new_segment)
+    segment_ids = np.cumsum(new_segment) - 1
+    segment_grid_rows = data_grid_rows[segment_starts]
+
+    rows = np.arange(row_count)
+
+    def _aggregate(column: str, how: str) -> np.ndarray:
+        values = df[column].to_numpy()[order].astype(np.float64)
+        valid = ~np.isnan(values)
+        match how:
+            case "first":
+                first_rows = np.minimum.reduceat(np.where(valid, rows, row_count), segment_starts)
+                aggregated = np.where(first_rows < row_count, values[np.minimum(first_rows, row_count - 1)], np.nan)
+            case "last":
+                last_rows = np.maximum.reduceat(np.where(valid, rows, -1), segment_starts)
+                aggregated = np.where(last_rows >= 0, values[np.maximum(last_rows, 0)], np.nan)
+            case "max":
+                aggregated = np.fmax.reduceat(values, segment_starts)
+            case "min":
+                aggregated = np.fmin.reduceat(values, segment_starts)
+            case "sum":
+                # Use pandas compensated summation, so volumes match resample().sum() to the last bit
+                aggregated = pd.Series(values).groupby(segment_ids, sort=False).sum().to_numpy()
+            case _:
+                raise NotImplementedError(f"Unsupported aggregation {how}")
+
+        result = np.full(grid_size, np.nan)
+        result[segment_grid_rows] = aggregated
+        if how == "sum":
+            # Empty buckets sum to zero, padding is filled later
+            result[~grid_padding] = np.where(np.isnan(result[~grid_padding]), 0.0, result[~grid_padding])
+        return result
+
+    ohlc_dict = {}
+    for column, how in (("open", "first"), ("high", "max"), ("low", "min"), ("close", "last"), ("volume", "sum"), ("forward_filled", "max")):
+        if column in df.columns:
+            ohlc_dict[column] = how
+
+    columns = {column: _aggregate(column, how) for column, how in ohlc_dict.items()}
+
+    # Pair id dtype follows resample_candles_multiple_pairs(), where it is copied
+    # from the first row of a pair with iloc[]
+    copied_pair_id_dtype = pd.Series([df.iloc[0][pair_id_column]]).dtype
+    grid_pair_ids = pair_ids[pair_starts][grid_pair_position]
+
+    timestamp_values = grid_timestamps.astype(index_dtype)
+
+    if forward_fill_until is None:
+        # Mark rows that had no real observation (NaN close) before ffill
+        forward_filled = np.isnan(columns["close"])
+        for ff_column in forward_fill_columns:
+            if ff_column in columns and ff_column != "forward_filled":
+                columns[ff_column] = _forward_fill_within_pairs(columns[ff_column], grid_first)
+
+        out = {}
+        for column in ohlc_dict:
+            out[column] = forward_filled if column == "forward_filled" else columns[column]
+        out["timestamp"] = timestamp_values
+        out[pair_id_column] = grid_pair_ids.astype(copied_pair_id_dtype)
+        if "forward_filled" not in out:
+            out["forward_filled"] = forward_filled
+        index_name = df.index.name
+    else:
+        # Same as forward_fill_ohlcv_single_pair()
+        if "forward_filled" in columns:
+            forward_filled = np.where(np.isnan(columns["forward_filled"]), 1.0, columns["forward_filled"]).astype(bool)
+        else:
+            forward_filled = np.zeros(grid_size, dtype=bool)
+        forward_filled[grid_padding] = True
+
+        close = _forward_fill_within_pairs(columns["close"], grid_first)
+        for column in ("open", "high", "low"):
+            if column in columns:
+                columns[column] = np.where(np.isnan(columns[column]), close, columns[column])
+        columns["close"] = close
+        if "volume" in columns:
+            columns["volume"] = np.where(np.isnan(columns["volume"]), 0.0, columns["volume"])
+
+        out = {}
+        for column in ohlc_dict:
+            if column == "forward_filled":
+                out[column] = forward_filled
+            else:
+                out[column] = columns[column]
+        out[pair_id_column] = grid_pair_ids.astype(df[pair_id_column].dtype)
+        if "forward_filled" not in out:
+            out["forward_filled"] = forward_filled
+
+        if padding_counts.any():
+            # Padding rows are generated with nanosecond pd.date_range() and no index name
+            timestamp_values = timestamp_values.astype("datetime64[ns]")
+            index_name = None
+        else:
+            index_name = df.index.name
+        out["timestamp"] = timestamp_values
+
+    result = pd.DataFrame(out, index=pd.DatetimeIndex(timestamp_values, name=index_name))
+    result.attrs["forward_filled_until"] = forward_fill_until
+    return result
+
+
+
 def resample_candles(
     df: pd.DataFrame,
     resample_freq: pd.Timedelta | BaseOffset | str,
@@ -25,7 +25,10 @@ from pandas.core.groupby import DataFrameGroupBy
 from tradingstrategy.pair import DEXPair
 from tradingstrategy.timebucket import TimeBucket
 from tradingstrategy.types import PrimaryKey
+from tradingstrategy.utils.cross_section import CrossSection
+from tradingstrategy.utils.df_index import flatten_dataframe_datetime_index
 from tradingstrategy.utils.forward_fill import forward_fill
+from tradingstrategy.utils.offset_index import PairOffsetIndex, sort_by_pair_and_timestamp
 from tradingstrategy.utils.time import assert_compatible_timestamp, ZERO_TIMEDELTA
 from .wrangle import fix_dex_price_data, DEFAULT_MIN_MAX_RANGE
 
@@ -82,9 +85,10 @@ class PairGroupedUniverse:
         remove_candles_with_zero_volume: bool = True,
         forward_fill: bool = False,
         bad_open_close_threshold: float | None=3.0,
-        autoheal_pair_limit=1_500,
+        autoheal_pair_limit: int | None = None,
         forward_fill_until: datetime.datetime | pd.Timestamp | None = None,
         min_max_price=DEFAULT_MIN_MAX_RANGE,
+        offset_index: bool = False,
     ):
         """Set up new candle universe where data is grouped by trading pair.
 
@@ -127,14 +131,26 @@ class PairGroupedUniverse:
             See :term:`forward fill` and :ref:`forward filling data` for more information.
 
         :param autoheal_pair_limit:
-            Don't try to autoheal data if the candle universe is too large.
+            Don't try to autoheal data if the candle universe has this many pairs or more.
 
-            Autohealing is very taxing operation and should not be performed on large universes.
-            Instead you should preprocess the universe to a candles Parquet file and load
-            directly from there.
+            By default there is no limit, as autohealing is vectorised over all pairs,
+            see :py:func:`tradingstrategy.utils.wrangle.fix_dex_price_data`.
+            Set to `0` to disable autohealing.
 
         :param autoheal_limit:
             If we have more than
+
+        :param offset_index:
+            Store the data sorted by `(pair_id, timestamp)` with a pair id -> row range offset table.
+
+            Per-pair lookups become zero-copy slices of `self.df` instead of
+            :py:meth:`pandas.core.groupby.DataFrameGroupBy.get_group` calls,
+            and the per-pair cache does not hold a second copy of the data.
+            Recommended for universes with thousands of pairs.
+
+            `self.df` is no longer in the timestamp order when this is set.
+
+            See :py:mod:`tradingstrategy.utils.offset_index`.
         """
         self.index_automatically = index_automatically
         assert isinstance(df, pd.DataFrame)
@@ -171,7 +187,7 @@ class PairGroupedUniverse:
         #: For the original ungrouped data use self.df
         self.pairs = groups = self.df.groupby(by=self.primary_key_column)
 
-        if len(self.pairs) < autoheal_pair_limit:
+        if autoheal_pair_limit is None or len(self.pairs) < autoheal_pair_limit:
             if fix_wick_threshold or bad_open_close_threshold or fix_inbetween_threshold or remove_candles_with_zero_volume or forward_fill:
 
                 # We can only forward fill data if we know the freq
@@ -216,6 +232,85 @@ class PairGroupedUniverse:
         #: Grouped DataFrame cache for faster lookup
         self.candles_cache: dict[PrimaryKey, pd.DataFrame] = {}
 
+        #: Pair-sorted data for vectorised lookups, see :py:meth:`get_pair_sorted_data`
+        self.sorted_lookup_cache: Tuple[PairOffsetIndex, pd.DataFrame] | None = None
+
+        #: Point-in-time index, see :py:meth:`get_cross_section`
+        self.cross_section_cache: CrossSection | None = None
+
+        #: pair_id -> (start row, end row) over pair-sorted `self.df`.
+        #:
+        #: Only set if the universe was created with `offset_index=True`.
+        self.offset_index: PairOffsetIndex | None = None
+
+        if offset_index:
+            self.build_offset_index()
+
+    def build_offset_index(self):
+        """Sort the data by pair and build the pair id -> row range offset table.
+
+        - Replaces `self.df` with the pair-sorted timestamp indexed data
+
+        - Any (pair_id, timestamp) MultiIndex left over by forward fill is flattened
+
+        See `offset_index` argument in :py:meth:`__init__`.
+        """
+        self.df = self._create_pair_sorted_frame()
+        self.pairs = self.df.groupby(by=self.primary_key_column)
+        self.offset_index = PairOffsetIndex(self.df, self.primary_key_column)
+        self.clear_cache()
+
+    def _create_pair_sorted_frame(self) -> pd.DataFrame:
+        """Get the current grouped data as timestamp indexed, sorted by (pair_id, timestamp)."""
+        df = self.pairs.obj
+
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df = flatten_dataframe_datetime_index(df)
+
+        if self.primary_key_column not in df.columns:
+            # Forward fill may move pair id to the index only
+            df = df.copy()
+            df[self.primary_key_column] = self.pairs.obj.index.get_level_values(0)
+
+        return sort_by_pair_and_timestamp(df, self.primary_key_column)
+
+    def get_pair_sorted_data(self) -> Tuple[PairOffsetIndex, pd.DataFrame]:
+        """Get the data sorted by (pair_id, timestamp) and its offset index.
+
+        - Used by vectorised lookups over many pairs at once
+
+        - If the universe was created with `offset_index=True` this returns
+          `self.df` as is, otherwise a sorted lookup is built on the first call and cached
+
+        :return:
+            Tuple (offset index, pair-sorted DataFrame)
+        """
+        if self.offset_index is not None:
+            return self.offset_index, self.df
+
+        if self.sorted_lookup_cache is None:
+            df = self._create_pair_sorted_frame()
+            self.sorted_lookup_cache = (PairOffsetIndex(df, self.primary_key_column), df)
+
+        return self.sorted_lookup_cache
+
+    def get_cross_section(self) -> CrossSection:
+        """Get point-in-time lookups over all pairs.
+
+        - "All pairs at time t" and "last N samples for all pairs before t"
+          without scanning the full dataset
+
+        - The index is built on the first call and cached
+
+        - The pair-sorted data is created only if as-of lookups are used,
+          see :py:meth:`get_pair_sorted_data`
+
+        See :py:mod:`tradingstrategy.utils.cross_section`.
+        """
+        if self.cross_section_cache is None:
+            self.cross_section_cache = CrossSection(self.df, self.get_pair_sorted_data)
+        return self.cross_section_cache
+
     def is_forward_filled(self) -> bool:
         """Check if the data was forward filled after the data loading.
 
@@ -226,6 +321,8 @@ class PairGroupedUniverse:
     def clear_cache(self):
         """Clear candles cached by pair."""
         self.candles_cache = {}
+        self.sorted_lookup_cache = None
+        self.cross_section_cache = None
 
     def get_columns(self) -> pd.Index:
         """Get column names from the underlying pandas.GroupBy object"""
@@ -241,6 +338,8 @@ class PairGroupedUniverse:
         TODO: Rename. Also used by lending reserves, and this then
         refers to count of reserves, not pairs.
         """
+        if self.offset_index is not None:
+            return len(self.offset_index)
         return len(self.pairs.groups)
 
     def get_samples_by_pair(self, pair_id: PrimaryKey) -> pd.DataFrame:
@@ -259,17 +358,29 @@ class PairGroupedUniverse:
         :raise KeyError:
             If we do not have data for pair_id
         """
+
+        if self.offset_index is not None:
+            # Zero-copy slice of the pair-sorted data
+            try:
+                start, end = self.offset_index.get_range(pair_id)
+            except KeyError as e:
+                raise self._create_pair_missing_error(pair_id) from e
+            return self.df.iloc[start:end]
+
         try:
             pair = self.pairs.get_group(pair_id)
         except KeyError as e:
-            all_groups = list(self.pairs.groups.keys())
-            if len(all_groups) > 5:
-                all_groups_msg = f"We have data for: {len(all_groups)} pairs, first 5: {all_groups[:5]}"
-            else:
-                all_groups_msg = f"We have data for pair_ids: {all_groups}"
-            raise PairCandlesMissing(f"No OHLC samples for pair id {pair_id} in {self}.\n{all_groups_msg}") from e
+            raise self._create_pair_missing_error(pair_id) from e
         return pair
 
+    def _create_pair_missing_error(self, pair_id: PrimaryKey) -> PairCandlesMissing:
+        all_groups = list(self.get_pair_ids())
+        if len(all_groups) > 5:
+            all_groups_msg = f"We have data for: {len(all_groups)} pairs, first 5: {all_groups[:5]}"
+        else:
+            all_groups_msg = f"We have data for pair_ids: {all_groups}"
+        return PairCandlesMissing(f"No OHLC samples for pair id {pair_id} in {self}.\n{all_groups_msg}")
+
     def get_last_entries_by_pair_and_timestamp(self,
             pair: DEXPair | PrimaryKey,
             timestamp: pd.Timestamp | datetime.datetime,
@@ -321,7 +432,13 @@ class PairGroupedUniverse:
             Randomly sample N pairs
         """
         count = 0
-        for pair_id, data in self.pairs:
+
+        if self.offset_index is not None:
+            pairs = ((pair_id, self.get_samples_by_pair(pair_id)) for pair_id in self.offset_index.get_pair_ids())
+        else:
+            pairs = self.pairs
+
+        for pair_id, data in pairs:
             yield pair_id, data
 
             count += 1
@@ -330,6 +447,11 @@ class PairGroupedUniverse:
 
     def get_pair_ids(self) -> Iterable[PrimaryKey]:
         """Get all pairs present in the dataset"""
+
+        if self.offset_index is not None:
+            yield from self.offset_index.get_pair_ids()
+            return
+
         with warnings.catch_warnings():
             # FutureWarning: In a future version of pandas, a length 1 tuple will be returned when 
             # iterating over a groupby with a grouper equal to a list of length 1. 
@@ -347,6 +469,10 @@ class PairGroupedUniverse:
         :return: A DataFrame that contains candles/samples at the specific timeout
         """
         assert_compatible_timestamp(ts)
+
+        if isinstance(self.df.index, pd.DatetimeIndex):
+            return self.get_cross_section().get_samples_by_timestamp(ts)
+
         samples = self.df.loc[self.df[self.timestamp_column] == ts]
         return samples
 
@@ -386,6 +512,9 @@ class PairGroupedUniverse:
         assert_compatible_timestamp(end)
         assert start < end, f"Got reverse timestamp range {start} - {end}"
 
+        if isinstance(self.df.index, pd.DatetimeIndex):
+            return self.get_cross_section().get_samples_by_range(start, end)
+
         # https://stackoverflow.com/a/69605701/315168
         samples = self.df.loc[
             (self.df.index >= start) &
@@ -476,7 +605,8 @@ class PairGroupedUniverse:
             if "forward_filled" in df.columns:
                 df = df.loc[~(df["forward_filled"] == True)]
 
-        if(self.index_automatically == True) and not exclude_forward_fill:
+        # Offset index sorts the data by pair, not by time
+        if(self.index_automatically == True) and not exclude_forward_fill and self.offset_index is None:
             if use_timezone:
                 start = (df[self.timestamp_column].iat[0]).tz_localize(tz='UTC')
                 end = (df[self.timestamp_column].iat[-1]).tz_localize(tz='UTC')
@@ -520,6 +650,9 @@ class PairGroupedUniverse:
         :return: Any timestamp from the index that is before or at the same time of the given timestamp.
         """
         index = self.df.index
+        if self.offset_index is not None:
+            # Data is sorted by pair, not by time
+            return index[index <= ts].max()
         return index[index <= ts][-1]
 
     def get_single_pair_data(self,
@@ -824,6 +957,9 @@ class PairGroupedUniverse:
             Does not touch the original `self.df` DataFrame any way.
             Only `self.pairs` is modified with forward-filled data.
 
+            The exception is the `offset_index` mode, where the offset table
+            and `self.df` are rebuilt from the forward-filled data.
+
         :param columns:
             Columns to fill.
 
@@ -852,6 +988,9 @@ class PairGroupedUniverse:
         # Clear candle cache
         self.clear_cache()
 
+        if self.offset_index is not None:
+            self.build_offset_index()
+
     @classmethod
     def create_from_single_pair_dataframe(
             cls,
@@ -216,16 +216,59 @@ def build_liquidity_summary(
         # TODO: This is unlikely to work but let's try be helpful anyway
         liquidity_df = liquidity_df.set_index("timestamp").groupby("pair_id")
 
+    # Flatten the groups to (pair id, timestamp, close) columns,
+    # so all pairs can be aggregated in one pass
+    df = liquidity_df.obj
+    group_numbers = liquidity_df.ngroup().to_numpy()
+    group_keys = liquidity_df.size().index
+    grouped_mask = group_numbers >= 0
+
+    if "timestamp" in df.index.names:
+        timestamps = df.index.get_level_values("timestamp")
+    else:
+        timestamps = df.index
+
+    samples = pd.DataFrame({
+        "pair_id": group_keys[group_numbers[grouped_mask]],
+        "timestamp": timestamps[grouped_mask],
+        "close": df["close"].to_numpy()[grouped_mask],
+    })
+
+    pair_ids = list(pair_ids)
+
     # Get top liquidity for all of our pairs
-    pair_liquidity_max_historical = Counter()
-    pair_liquidity_today = Counter()
-    for pair_id in pair_ids:
-        pair_liquidity_max_historical[pair_id] = get_somewhat_realistic_max_liquidity(liquidity_df, pair_id)
-        pair_liquidity_today[pair_id] = get_liquidity_today(liquidity_df, pair_id, delay=delay)
+    max_liquidity = _get_somewhat_realistic_max_liquidity_all_pairs(samples)
+    max_liquidity = max_liquidity.reindex(pair_ids, fill_value=-1)
+    pair_liquidity_max_historical = Counter(dict(zip(pair_ids, max_liquidity.tolist())))
+
+    # Exact lookup at the floored week, the same as get_liquidity_today()
+    timestamp = floor_pandas_week(pd.Timestamp.now() - delay)
+    today_samples = samples.loc[samples["timestamp"] == timestamp].drop_duplicates(subset="pair_id")
+    liquidity_today = today_samples.set_index("pair_id")["close"].reindex(pair_ids, fill_value=-1)
+    pair_liquidity_today = Counter(dict(zip(pair_ids, liquidity_today.tolist())))
 
     return pair_liquidity_max_historical, pair_liquidity_today
 
 
+def _get_somewhat_realistic_max_liquidity_all_pairs(
+    samples: pd.DataFrame,
+    sample_count=10,
+    broken_liquidity=100_000_000,
+) -> pd.Series:
+    """Vectorised :py:func:`get_somewhat_realistic_max_liquidity` for all pairs.
+
+    :param samples:
+        DataFrame with `pair_id` and `close` columns
+
+    :return:
+        Pair id -> liquidity series, `-1` for broken data
+    """
+    closes = samples[["pair_id", "close"]].dropna(subset=["close"])
+    rank = closes.groupby("pair_id")["close"].rank(method="first", ascending=False)
+    max_liquidity = closes.loc[rank <= sample_count].groupby("pair_id")["close"].min()
+    return max_liquidity.where(max_liquidity <= broken_liquidity, -1)
+
+
 def get_top_liquidity_pairs_by_base_token(
     pair_universe: PandasPairUniverse,
     pair_liquidity_map: Counter,
@@ -335,26 +378,29 @@ def prefilter_pairs_with_tvl(
 
     our_chain_pair_ids = pairs_df["pair_id"].unique()
 
-    # Download all liquidity data, extract
-    # trading pairs that exceed our prefiltering threshold
+    # Check that the highest peak of the pair liquidity filled our threshold.
+    # The high filter is pushed down to the Parquet reader, so we only load
+    # the samples of the pairs that ever exceeded it.
     logger.info(f"Downloading/opening TVL/liquidity dataset {liquidity_time_bucket}")
-    liquidity_df = client.fetch_all_liquidity_samples(liquidity_time_bucket).to_pandas()
-    logger.info(f"Filtering out liquidity for chain {chain_id.name}")
-    liquidity_df = liquidity_df.loc[liquidity_df.pair_id.isin(our_chain_pair_ids)]
-    liquidity_per_pair = liquidity_df.groupby(liquidity_df.pair_id)
-    logger.info(f"Chain {chain_id.name} has liquidity data for {len(liquidity_per_pair.groups)}")
-
-    # Check that the highest peak of the pair liquidity filled our threshold
-    passed_pair_ids = set()
-    liquidity_output_chunks = []
-
-    for pair_id, pair_df in liquidity_per_pair:
-        if pair_df["high"].max() > min_tvl:
-            liquidity_output_chunks.append(pair_df)
-            passed_pair_ids.add(pair_id)
-
-    logger.info(f"After filtering for {min_tvl:,} USD min liquidity we have {len(passed_pair_ids)} pairs")
-    liquidity_df = pd.concat(liquidity_output_chunks)
+    peak_df = client.fetch_all_liquidity_samples_filtered(
+        liquidity_time_bucket,
+        pair_ids=our_chain_pair_ids,
+        columns=["pair_id"],
+        filters=[("high", ">", min_tvl)],
+    )
+    passed_pair_ids = peak_df["pair_id"].unique()
+
+    logger.info(f"After filtering for {min_tvl:,} USD min liquidity on chain {chain_id.name} we have {len(passed_pair_ids)} pairs")
+    if len(passed_pair_ids) == 0:
+        return pairs_df.iloc[0:0]
+
+    liquidity_df = client.fetch_all_liquidity_samples_filtered(
+        liquidity_time_bucket,
+        pair_ids=passed_pair_ids,
+        start_time=start,
+        end_time=end,
+        columns=["pair_id", "timestamp", "close"],
+    )
 
     # Resample liquidity to the higher timeframe
     liquidity_df = liquidity_df[["pair_id", "timestamp", "close"]]
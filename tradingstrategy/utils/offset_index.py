@@ -0,0 +1,242 @@
+"""Per-pair row offset index over pair-sorted columnar data.
+
+- An alternative to :py:meth:`pandas.core.groupby.DataFrameGroupBy.get_group`
+  lookups for universes with thousands of trading pairs
+
+- The data is sorted once by `(pair_id, timestamp)`, so that every pair occupies
+  one continuous row range
+
+- We keep `pair_id -> (start_row, end_row)` table over the shared column arrays,
+  so per-pair slices are zero-copy views and no second copy of the data is cached
+
+See :py:class:`tradingstrategy.utils.groupeduniverse.PairGroupedUniverse` `offset_index` argument.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingstrategy.types import PrimaryKey
+
+
+def sort_by_pair_and_timestamp(
+    df: pd.DataFrame,
+    primary_key_column: str = "pair_id",
+) -> pd.DataFrame:
+    """Sort a timestamp-indexed multipair DataFrame by `(pair_id, timestamp)`.
+
+    - If the data is already in the correct order, return it as is without copying
+
+    :param df:
+        DataFrame with :py:class:`pd.DatetimeIndex` and a pair id column.
+
+    :return:
+        DataFrame where rows of each pair are continuous and in the timestamp order.
+    """
+    assert isinstance(df.index, pd.DatetimeIndex), f"Expected DatetimeIndex, got {type(df.index)}"
+
+    if len(df) == 0:
+        return df
+
+    pair_ids = df[primary_key_column].to_numpy()
+    timestamps = df.index.asi8
+
+    same_pair = pair_ids[1:] == pair_ids[:-1]
+    in_order = (pair_ids[1:] > pair_ids[:-1]) | (same_pair & (timestamps[1:] >= timestamps[:-1]))
+    if in_order.all():
+        return df
+
+    # Sort by the last key first
+    order = np.lexsort((timestamps, pair_ids))
+    return df.take(order)
+
+
+class PairOffsetIndex:
+    """Map pair ids to continuous row ranges in a pair-sorted DataFrame.
+
+    Example:
+
+    .. code-block:: python
+
+        df = sort_by_pair_and_timestamp(df)
+        index = PairOffsetIndex(df)
+        start, end = index.get_range(pair_id)
+        pair_df = df.iloc[start:end]  # View, not a copy
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        primary_key_column: str = "pair_id",
+    ):
+        """Build the offset table.
+
+        :param df:
+            DataFrame sorted with :py:func:`sort_by_pair_and_timestamp`.
+
+        :param primary_key_column:
+            The pair/reserve id column name in the dataframe.
+        """
+        assert isinstance(df.index, pd.DatetimeIndex), f"Expected DatetimeIndex, got {type(df.index)}"
+
+        pair_ids = df[primary_key_column].to_numpy()
+        row_count = len(pair_ids)
+
+        if row_count > 0:
+            boundaries = np.flatnonzero(pair_ids[1:] != pair_ids[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [row_count]))
+        else:
+            starts = ends = np.zeros(0, dtype=np.int64)
+
+        #: Pair ids in the ascending order they appear in the data
+        self.pair_ids: np.ndarray = pair_ids[starts].astype(np.int64)
+
+        #: First row of each pair, inclusive
+        self.starts: np.ndarray = starts.astype(np.int64)
+
+        #: Last row of each pair, exclusive
+        self.ends: np.ndarray = ends.astype(np.int64)
+
+        #: Timestamp column as shared array, used for per-pair binary searches.
+        #:
+        #: This is a view to the DataFrame index data, not a copy.
+        self.timestamps: np.ndarray = df.index.values
+
+        #: pair id -> position in :py:attr:`pair_ids`
+        self.positions: dict[PrimaryKey, int] = {int(pair_id): idx for idx, pair_id in enumerate(self.pair_ids)}
+
+        assert (np.diff(self.pair_ids) > 0).all(), "Data is not sorted by pair id, use sort_by_pair_and_timestamp() first"
+
+        #: Cached results of :py:meth:`get_last_rows_where`
+        self.last_rows_cache: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.pair_ids)
+
+    def __contains__(self, pair_id: PrimaryKey) -> bool:
+        return pair_id in self.positions
+
+    def get_range(self, pair_id: PrimaryKey) -> Tuple[int, int]:
+        """Get the row range for a pair.
+
+        :return:
+            (start row inclusive, end row exclusive) tuple
+
+        :raise KeyError:
+            If we do not have data for pair_id
+        """
+        position = self.positions[pair_id]
+        return int(self.starts[position]), int(self.ends[position])
+
+    def get_timestamps(self, pair_id: PrimaryKey) -> np.ndarray:
+        """Get the sorted timestamps of a pair as a zero-copy array view.
+
+        :raise KeyError:
+            If we do not have data for pair_id
+        """
+        start, end = self.get_range(pair_id)
+        return self.timestamps[start:end]
+
+    def get_pair_ids(self) -> Iterable[PrimaryKey]:
+        """Iterate all pair ids in the data order."""
+        for pair_id in self.pair_ids:
+            yield int(pair_id)
+
+    def get_pair_positions(self, pair_ids: np.ndarray) -> np.ndarray:
+        """Map an array of pair ids to their positions in the offset table.
+
+        :return:
+            Array of positions, `-1` for pair ids we do not have data for.
+        """
+        pair_ids = np.asarray(pair_ids, dtype=np.int64)
+        if len(self.pair_ids) == 0:
+            return np.full(len(pair_ids), -1, dtype=np.int64)
+        # Pair ids are in ascending order after sort_by_pair_and_timestamp()
+        positions = np.searchsorted(self.pair_ids, pair_ids)
+        clipped = np.minimum(positions, len(self.pair_ids) - 1)
+        return np.where(self.pair_ids[clipped] == pair_ids, clipped, -1)
+
+    def get_rows_at_or_before(
+        self,
+        pair_ids: np.ndarray,
+        when: np.ndarray,
+    ) -> np.ndarray:
+        """Find the last row at or before a timestamp for many pairs at once.
+
+        - Vectorised binary search over the per-pair timestamp ranges,
+          all queries advance in the same `log2(longest pair)` steps
+
+        :param pair_ids:
+            Array of pair ids
+
+        :param when:
+            Array of `datetime64` timestamps, one per pair id
+
+        :return:
+            Array of row numbers in the underlying data.
+
+            `-1` if the pair is unknown or has no data at or before the timestamp.
+        """
+        positions = self.get_pair_positions(pair_ids)
+        known = positions >= 0
+
+        if len(self.pair_ids) == 0:
+            return positions
+
+        # Convert the wanted timestamps to the resolution of our data,
+        # truncation is a floor for post-epoch timestamps
+        when = np.asarray(when, dtype="datetime64[ns]").astype(self.timestamps.dtype)
+
+        starts = np.where(known, self.starts[np.maximum(positions, 0)], 0)
+        lo = starts.copy()
+        hi = np.where(known, self.ends[np.maximum(positions, 0)], 0)
+
+        last_row = max(len(self.timestamps) - 1, 0)
+
+        # Upper bound search: find the first row with timestamp > when
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            go_right = active & (self.timestamps[np.minimum(mid, last_row)] <= when)
+            lo = np.where(go_right, mid + 1, lo)
+            hi = np.where(active & ~go_right, mid, hi)
+
+        rows = lo - 1
+        return np.where(known & (rows >= starts), rows, -1)
+
+    def get_last_rows_where(
+        self,
+        mask: np.ndarray,
+        cache_key: str | None = None,
+    ) -> np.ndarray:
+        """For every row, find the last row at or before it within the same pair where `mask` is set.
+
+        Used e.g. to skip forward-filled rows in lookups.
+
+        :param mask:
+            Boolean array, one entry per row
+
+        :param cache_key:
+            Store the result under this key and reuse it in the subsequent calls
+
+        :return:
+            Array of row numbers, `-1` if the pair has no such row before.
+        """
+        if cache_key is not None and cache_key in self.last_rows_cache:
+            return self.last_rows_cache[cache_key]
+
+        rows = np.arange(len(mask), dtype=np.int64)
+        last_rows = np.maximum.accumulate(np.where(mask, rows, -1))
+
+        # Do not cross the pair boundaries
+        pair_starts = np.repeat(self.starts, self.ends - self.starts)
+        last_rows = np.where(last_rows >= pair_starts, last_rows, -1)
+
+        if cache_key is not None:
+            self.last_rows_cache[cache_key] = last_rows
+
+        return last_rows
@@ -0,0 +1,327 @@
+"""Column array backed lookup index for the pair universe.
+
+- An alternative to transposing the whole pair DataFrame to `pair_id -> dict` mappings
+  with `df.T.to_dict()`, which creates one Python dict per pair for 200k+ pairs
+
+- We keep the DataFrame columns as NumPy arrays and `pair_id -> row position`
+  and `address -> row position` hash maps
+
+- Row dicts are materialised only for the pairs that are actually looked up
+
+See :py:class:`tradingstrategy.pair.PandasPairUniverse`.
+"""
+
+from typing import Dict, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from tradingstrategy.types import PrimaryKey
+
+
+def _to_python_value(value: object, kind: str) -> object:
+    """Convert a NumPy scalar to the same Python value `df.T.to_dict()` would give."""
+    if kind == "M":
+        return pd.Timestamp(value)
+    if kind == "m":
+        return pd.Timedelta(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class PairRowIndex:
+    """Pair id and pool address lookups over the pair DataFrame columns.
+
+    - If the same pair id appears multiple times, the last row wins
+
+    - Column arrays are views to the DataFrame data where pandas allows it
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """Build the pair id index.
+
+        :param df:
+            Pair universe DataFrame with `pair_id` and `address` columns.
+        """
+        self.df = df
+
+        # Duplicate column names are dropped, the same as with df.T.to_dict()
+        self.columns: list[str] = list(dict.fromkeys(df.columns))
+
+        #: pair_id -> row position
+        self.positions: Dict[PrimaryKey, int] = dict(zip(df["pair_id"].tolist(), range(len(df))))
+
+        #: lowercase pool address -> row position, built on the first use
+        self._address_positions: Dict[str, int] | None = None
+
+        #: column name -> (array, dtype kind), read on the first row access
+        self._arrays: Dict[str, tuple[np.ndarray, str]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def get_address_positions(self) -> Dict[str, int]:
+        """Get lowercase pool address -> row position mapping."""
+        if self._address_positions is None:
+            positions = np.fromiter(self.positions.values(), dtype=np.int64, count=len(self.positions))
+            addresses = self.df["address"].to_numpy()[positions]
+            lowercased = pd.Series(addresses, dtype=object).str.lower().tolist()
+            self._address_positions = dict(zip(lowercased, positions.tolist()))
+        return self._address_positions
+
+    def get_row(self, position: int) -> dict:
+        """Materialise one row as a dict.
+
+        :param position:
+            Row position in the DataFrame
+
+        :return:
+            Column name -> Python value dict
+        """
+        if self._arrays is None:
+            arrays = {}
+            for column in self.columns:
+                series = self.df[column]
+                if isinstance(series, pd.DataFrame):
+                    series = series.iloc[:, 0]
+                arrays[column] = (series.to_numpy(), series.dtype.kind)
+            self._arrays = arrays
+
+        return {column: _to_python_value(array[position], kind) for column, (array, kind) in self._arrays.items()}
+
+
+class PairRowMapping(Mapping):
+    """Read-only dict-like view of rows, keyed by pair id or pool address.
+
+    - Used as :py:attr:`tradingstrategy.pair.PandasPairUniverse.pair_map` and
+      :py:attr:`tradingstrategy.pair.PandasPairUniverse.smart_contract_map`,
+      so the existing dict based access keeps working
+
+    - Row dicts are created on every access, callers should cache the objects
+      they construct from them
+    """
+
+    def __init__(self, index: PairRowIndex, by_address=False):
+        self.index = index
+        self.by_address = by_address
+
+    def _get_positions(self) -> Dict:
+        if self.by_address:
+            return self.index.get_address_positions()
+        return self.index.positions
+
+    def __getitem__(self, key) -> dict:
+        return self.index.get_row(self._get_positions()[key])
+
+    def get(self, key, default=None) -> dict | None:
+        position = self._get_positions().get(key)
+        if position is None:
+            return default
+        return self.index.get_row(position)
+
+    def __contains__(self, key) -> bool:
+        return key in self._get_positions()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._get_positions())
+
+    def __len__(self) -> int:
+        return len(self._get_positions())
+
+
+class TokenIndex:
+    """Token lookups over the pair DataFrame columns.
+
+    Built in one vectorised pass over the token columns of all pairs:
+
+    - `(chain_id, address) -> Token` and `address -> Token`
+
+    - lowercase symbol -> tokens with their aggregated 30d volume
+
+    - base token and quote token -> pair ids
+
+    When the same token appears in multiple pairs, token data of the last pair wins,
+    the same as in the original pair-by-pair lookups.
+    :py:class:`tradingstrategy.token.Token` objects are created on the first access.
+    """
+
+    def __init__(self, df: pd.DataFrame, positions: np.ndarray):
+        """Build the index.
+
+        :param df:
+            Pair universe DataFrame.
+
+        :param positions:
+            Row positions of the pairs in the pair iteration order.
+        """
+        pair_count = len(positions)
+
+        def _column(name: str) -> np.ndarray:
+            return df[name].to_numpy()[positions]
+
+        chain_ids = _column("chain_id").astype(np.int64)
+        pair_ids = _column("pair_id")
+        token0_addresses = _column("token0_address")
+        token1_addresses = _column("token1_address")
+        token0_symbols = _column("token0_symbol")
+        token1_symbols = _column("token1_symbol")
+        base_symbols = _column("base_token_symbol")
+        quote_symbols = _column("quote_token_symbol")
+
+        # Token columns interleaved: pair 0 token0, pair 0 token1, pair 1 token0, ...
+        self.chain_ids = np.repeat(chain_ids, 2)
+        self.addresses = np.stack([token0_addresses, token1_addresses], axis=1).ravel()
+        self.symbols = np.stack([token0_symbols, token1_symbols], axis=1).ravel()
+        self.decimals = np.stack([_column("token0_decimals"), _column("token1_decimals")], axis=1).ravel()
+        self.pair_ids = pair_ids
+
+        entries = range(2 * pair_count)
+
+        #: address -> last token entry
+        self.entries_by_address: Dict[str, int] = dict(zip(self.addresses.tolist(), entries))
+
+        #: (chain id, address) -> last token entry
+        self.entries_by_chain_and_address: Dict[tuple[int, str], int] = dict(zip(zip(self.chain_ids.tolist(), self.addresses.tolist()), entries))
+
+        #: entry -> Token cache
+        self.token_cache: Dict[int, "Token"] = {}
+
+        # 30d volume per pair, missing values count as zero
+        volume = np.zeros(pair_count)
+        for column in ("buy_volume_30d", "sell_volume_30d"):
+            if column in df.columns:
+                volume += np.nan_to_num(pd.to_numeric(pd.Series(_column(column)), errors="coerce").to_numpy(dtype=np.float64), nan=0.0)
+
+        # Symbol matches: the pair counts for token0 if its symbol matches,
+        # otherwise for token1
+        lower_symbols = pd.Series(self.symbols, dtype=object).str.lower()
+        token0_lower = lower_symbols.to_numpy()[0::2]
+        token1_lower = lower_symbols.to_numpy()[1::2]
+        counted = np.ones(2 * pair_count, dtype=bool)
+        counted[1::2] = token0_lower != token1_lower
+        counted &= lower_symbols.notna().to_numpy()
+
+        symbol_df = pd.DataFrame({
+            "symbol": lower_symbols.to_numpy()[counted],
+            "chain_id": self.chain_ids[counted],
+            "address": self.addresses[counted],
+            "volume": np.repeat(volume, 2)[counted],
+            "entry": np.arange(2 * pair_count)[counted],
+        })
+        aggregated = (
+            symbol_df.groupby(["symbol", "chain_id", "address"], sort=False)
+            .agg(volume=("volume", "sum"), first_entry=("entry", "min"))
+            .reset_index()
+            .sort_values(["symbol", "first_entry"], kind="stable")
+        )
+
+        #: lowercase symbol -> (chain ids, addresses, volumes) in the first appearance order
+        self.tokens_by_symbol: Dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        symbols = aggregated["symbol"].to_numpy()
+        if len(symbols) > 0:
+            boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(symbols)]))
+            chains = aggregated["chain_id"].to_numpy()
+            addresses = aggregated["address"].to_numpy()
+            volumes = aggregated["volume"].to_numpy()
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self.tokens_by_symbol[symbols[start]] = (chains[start:end], addresses[start:end], volumes[start:end])
+
+        # Base and quote token addresses, same as DEXPair.base_token_address and quote_token_address
+        base_addresses = np.where(token0_symbols == base_symbols, token0_addresses, token1_addresses)
+        quote_addresses = np.where(token0_symbols == quote_symbols, token0_addresses, token1_addresses)
+
+        #: (chain id, address) -> row numbers in pair_ids, for base and quote tokens
+        self.pairs_by_base_token = pd.Series(np.arange(pair_count)).groupby([chain_ids, base_addresses], sort=False).indices
+        self.pairs_by_quote_token = pd.Series(np.arange(pair_count)).groupby([chain_ids, quote_addresses], sort=False).indices
+
+        #: address -> row numbers in pair_ids, for base and quote tokens on any chain
+        self.pairs_by_base_address = pd.Series(np.arange(pair_count)).groupby(base_addresses, sort=False).indices
+        self.pairs_by_quote_address = pd.Series(np.arange(pair_count)).groupby(quote_addresses, sort=False).indices
+
+        base_entry = np.where(token0_symbols == base_symbols, 0, 1) + 2 * np.arange(pair_count)
+        quote_entry = np.where(token0_symbols == quote_symbols, 0, 1) + 2 * np.arange(pair_count)
+        ordered_entries = np.stack([base_entry, quote_entry], axis=1).ravel()
+        ordered_addresses = np.stack([base_addresses, quote_addresses], axis=1).ravel()
+        first = np.sort(pd.Series(ordered_addresses).drop_duplicates().index.to_numpy())
+
+        #: address -> entry where the token first appears as a base or a quote token,
+        #: in the pair iteration order
+        self.first_entries: Dict[str, int] = dict(zip(ordered_addresses[first].tolist(), ordered_entries[first].tolist()))
+
+    def get_token_by_entry(self, entry: int) -> "Token":
+        """Create or get cached :py:class:`Token` for a token entry."""
+        token = self.token_cache.get(entry)
+        if token is None:
+            from tradingstrategy.chain import ChainId
+            from tradingstrategy.token import Token
+            token = Token(
+                ChainId(int(self.chain_ids[entry])),
+                _to_python_value(self.symbols[entry], "O"),
+                self.addresses[entry],
+                _to_python_value(self.decimals[entry], "O"),
+            )
+            self.token_cache[entry] = token
+        return token
+
+    def get_token(self, address: str, chain_id: int | None = None) -> "Token | None":
+        """Get a token by its address.
+
+        :param address:
+            Lowercase token address
+
+        :param chain_id:
+            Match the token on this chain only
+
+        :return:
+            Token or `None` if no pair has the token
+        """
+        if chain_id:
+            entry = self.entries_by_chain_and_address.get((int(chain_id), address))
+        else:
+            entry = self.entries_by_address.get(address)
+        if entry is None:
+            return None
+        return self.get_token_by_entry(entry)
+
+    def get_tokens_by_symbol(self, symbol: str, chain_id: int | None = None) -> list[tuple["Token", float]]:
+        """Get tokens matching a symbol with their total 30d volume over all pairs.
+
+        :param symbol:
+            Lowercase symbol
+
+        :return:
+            (token, volume) list in the first appearance order,
+            tokens with the same address are merged
+        """
+        entry = self.tokens_by_symbol.get(symbol)
+        if entry is None:
+            return []
+        chains, addresses, volumes = entry
+        if chain_id:
+            mask = chains == int(chain_id)
+            chains, addresses, volumes = chains[mask], addresses[mask], volumes[mask]
+
+        matches: dict["Token", float] = {}
+        for address, volume in zip(addresses.tolist(), volumes.tolist()):
+            token = self.get_token(address, chain_id)
+            matches[token] = matches.get(token, 0) + volume
+        return list(matches.items())
+
+    def get_pair_ids_by_token(self, address: str, chain_id: int | None = None, quote=False) -> np.ndarray:
+        """Get pair ids where the token is the base or the quote token.
+
+        :return:
+            Pair ids in the pair iteration order
+        """
+        if chain_id:
+            index = self.pairs_by_quote_token if quote else self.pairs_by_base_token
+            rows = index.get((int(chain_id), address))
+        else:
+            index = self.pairs_by_quote_address if quote else self.pairs_by_base_address
+            rows = index.get(address)
+        if rows is None:
+            return self.pair_ids[0:0]
+        return self.pair_ids[rows]
@@ -126,6 +126,9 @@ POPULAR_NATIVE_TOKENS = {
 #:
 POPULAR_QUOTE_TOKENS = POPULAR_NATIVE_TOKENS | ALL_STABLECOIN_LIKE
 
+#: Matches token symbols with any non-ASCII character, see :py:func:`filter_for_nonascii_tokens`
+NON_ASCII_PATTERN = r"[^\x00-\x7f]"
+
 
 def filter_for_base_tokens(
     pairs: pd.DataFrame,
@@ -331,13 +334,9 @@ def filter_for_nonascii_tokens(
     :return:
         DataFrame with trading pairs filtered to match quote token condition
     """
-    def has_non_ascii(text):
-        return any(ord(char) > 127 for char in text)
-
-    def my_filter(row):
-        return has_non_ascii(row.token0_symbol) or has_non_ascii(row.token1_symbol)
-
-    blacklisted_mask = pairs.apply(my_filter, axis=1)
+    blacklisted_mask = \
+        pairs["token0_symbol"].str.contains(NON_ASCII_PATTERN, regex=True, na=False) | \
+        pairs["token1_symbol"].str.contains(NON_ASCII_PATTERN, regex=True, na=False)
 
     return pairs[~blacklisted_mask]
 
@@ -428,14 +427,12 @@ def filter_for_derivatives(pairs: pd.DataFrame, derivatives=False) -> pd.DataFra
 
     assert isinstance(pairs, pd.DataFrame)
 
-    def row_filter(row):
-        if derivatives:
-            return is_derivative(row["token0_symbol"]) or is_derivative(row["token1_symbol"])
-        else:
-            return (not is_derivative(row["token0_symbol"])) and (not is_derivative(row["token1_symbol"]))
+    derivative_mask = _is_derivative_series(pairs["token0_symbol"]) | _is_derivative_series(pairs["token1_symbol"])
 
-    df =  pairs[pairs.apply(row_filter, axis=1)]
-    return df
+    if derivatives:
+        return pairs[derivative_mask]
+    else:
+        return pairs[~derivative_mask]
 
 
 def filter_for_rebases(pairs: pd.DataFrame, rebase=False) -> pd.DataFrame:
@@ -451,14 +448,12 @@ def filter_for_rebases(pairs: pd.DataFrame, rebase=False) -> pd.DataFrame:
 
     assert isinstance(pairs, pd.DataFrame)
 
-    def row_filter(row):
-        if rebase:
-            return is_rebase(row["token0_symbol"]) or is_rebase(row["token1_symbol"])
-        else:
-            return (not is_rebase(row["token0_symbol"])) and (not is_rebase(row["token1_symbol"]))
+    rebase_mask = _is_rebase_series(pairs["token0_symbol"]) | _is_rebase_series(pairs["token1_symbol"])
 
-    df =  pairs[pairs.apply(row_filter, axis=1)]
-    return df
+    if rebase:
+        return pairs[rebase_mask]
+    else:
+        return pairs[~rebase_mask]
 
 
 def filter_for_chain(
@@ -741,6 +736,19 @@ def is_rebase(token_symbol: TokenSymbol) -> bool:
     return token_symbol.upper() in REBASE_TOKENS
 
 
+def _is_derivative_series(token_symbols: pd.Series) -> pd.Series:
+    """Vectorised :py:func:`is_derivative` over a token symbol column."""
+    return (
+        token_symbols.str.upper().isin(ALL_DERIVATIVE_TOKENS) |
+        token_symbols.str.startswith(tuple(DERIVATIVE_TOKEN_PREFIXES), na=False)
+    )
+
+
+def _is_rebase_series(token_symbols: pd.Series) -> pd.Series:
+    """Vectorised :py:func:`is_rebase` over a token symbol column."""
+    return token_symbols.str.upper().isin(REBASE_TOKENS)
+
+
 def add_base_quote_address_columns(pairs_df: pd.DataFrame) -> pd.DataFrame:
     """Add base_token_address and quote_token_address to pairs data.
 
@@ -868,16 +876,8 @@ def deduplicate_pairs_by_volume(pairs_df: pd.DataFrame) -> pd.DataFrame:
     # We sort by volume and then filter out
     pairs_df = pairs_df.sort_values(by="volume", ascending=False)
 
-    included_set = set()
-
-    def _filter_by_base(row: pd.Series):
-        base_token_symbol = row["base_token_symbol"]
-        if base_token_symbol not in included_set:
-            included_set.add(base_token_symbol)
-            return True
-        return False
-
-    pairs_df = pairs_df[pairs_df.apply(_filter_by_base, axis=1)]
+    # Keep the highest volume pair for each base token
+    pairs_df = pairs_df.drop_duplicates(subset="base_token_symbol", keep="first")
     return pairs_df
 
 
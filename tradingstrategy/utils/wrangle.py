@@ -20,7 +20,7 @@ from pandas.core.groupby import DataFrameGroupBy
 import numpy as np
 
 from .time import naive_utcnow
-from .forward_fill import forward_fill as _forward_fill
+from .forward_fill import forward_fill as _forward_fill, _forward_fill_within_pairs
 from ..pair import PandasPairUniverse
 from ..types import AnyTimestamp
 
@@ -179,14 +179,6 @@ def remove_min_max_price(
     return df
 
 
-def _replace_for_groups(group, replacement_dict):
-    group_name = group.name
-    if group_name in replacement_dict:
-        for col, value in replacement_dict[group_name].items():
-            group[col] = value
-    return group
-
-
 def fix_prices_in_between_time_frames(
     dfgb: pd.DataFrame | DataFrameGroupBy,
     fix_inbetween_threshold: tuple | None = (-0.99, 5.0),
@@ -229,30 +221,34 @@ def fix_prices_in_between_time_frames(
         | Swap                                 | 0.149285130679667947                | $395.92           | ETH         | COMP              | 4,200                              | $199,878.00       | COMP        | Sushiswap   |
         +--------------------------------------+-------------------------------------+-------------------+-------------+-------------------+-------------------------------------+-------------------+-------------+-------------+
 
+    - Healing is done for all pairs at once using :py:func:`heal_anomalies_multipair`,
+      see :py:func:`heal_anomalies` for the single pair logic
+
     :param dfgb:
         Assume grouped by pair_id and MultiLevel index (pair_id, timestamp).
 
+    :return:
+        Healed data grouped by `pair_id_column`.
+
+        The underlying DataFrame is sorted by pair, keeping the original row order within a pair.
     """
     assert isinstance(dfgb, DataFrameGroupBy), f"Currently only implemented for DataFrameGroupBy"
 
-    replacements = {}
+    df = dfgb.obj
 
-    for pair_id, price_df in dfgb:
-        healed_ohlcv_df = heal_anomalies(
-            price_df,
-            low_diff=fix_inbetween_threshold[0],
-            high_diff=fix_inbetween_threshold[1],
-            hint=f"pair {pair_id}"
-        )
-        if healed_ohlcv_df is not None:
-            logger.info("Healed OHLCV data for pair %s - detected issues", pair_id)
-            replacements[pair_id] = healed_ohlcv_df
+    # Make rows of each pair continuous
+    order = np.argsort(df[pair_id_column].to_numpy(), kind="stable")
+    df = df.take(order)
+
+    healed = heal_anomalies_multipair(
+        df,
+        low_diff=fix_inbetween_threshold[0],
+        high_diff=fix_inbetween_threshold[1],
+        pair_id_column=pair_id_column,
+    )
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=FutureWarning)
-        healed = dfgb.apply(lambda x: _replace_for_groups(x, replacements), include_groups=True)
-        healed = healed.set_index("timestamp", drop=False)
-        return healed.groupby(pair_id_column)
+    healed = healed.set_index("timestamp", drop=False)
+    return healed.groupby(pair_id_column)
 
 
 def fix_dex_price_data(
@@ -615,6 +611,116 @@ def heal_anomalies(
     return ohlcv_df
 
 
+def _get_pair_boundaries(pair_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Find the first and the last row of each pair in data where rows of a pair are continuous.
+
+    :return:
+        Tuple (is first row of a pair, is last row of a pair) boolean arrays
+    """
+    first = np.ones(len(pair_ids), dtype=bool)
+    last = np.ones(len(pair_ids), dtype=bool)
+    if len(pair_ids) > 1:
+        change = pair_ids[1:] != pair_ids[:-1]
+        first[1:] = change
+        last[:-1] = change
+    return first, last
+
+
+def _shift_within_pairs(values: np.ndarray, periods: int, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """Shift float values by one row, not crossing the pair boundaries.
+
+    Same as `groupby(pair).shift(periods)` for `periods` 1 or -1.
+    """
+    assert periods in (1, -1), f"Got {periods}"
+    shifted = np.full(len(values), np.nan)
+    if periods == 1:
+        shifted[1:] = values[:-1]
+        shifted[first] = np.nan
+    else:
+        shifted[:-1] = values[1:]
+        shifted[last] = np.nan
+    return shifted
+
+
+def heal_anomalies_multipair(
+    df: pd.DataFrame,
+    high_diff=5.00,
+    low_diff=-0.99,
+    indication_column: str = "close",
+    pair_id_column: str = "pair_id",
+) -> pd.DataFrame:
+    """Fix bad open/close/high/low prices for all pairs at once.
+
+    - Same healing as :py:func:`heal_anomalies`, but for multipair data
+      without per-pair Python loops
+
+    - Uses shifted column arrays where the values are masked at the pair boundaries
+
+    :param df:
+        OHLCV data for multiple pairs.
+
+        Rows of each pair must be continuous and in the time order,
+        e.g. sorted by pair id with a stable sort.
+
+    :param high_diff:
+        A price between days cannot be higher than this multiplier.
+
+    :param low_diff:
+        A price between days cannot be lower than this multiplier.
+
+    :param indication_column:
+        Column name to check.
+
+    :return:
+        A copy of the DataFrame with OHLCV columns manipulated,
+        or the same DataFrame if nothing was done.
+
+        New flag column `healed` added to mark rows we manipulated.
+    """
+    assert isinstance(df, pd.DataFrame), f"Got: {df.__class__}"
+
+    if len(df) == 0:
+        return df
+
+    price = df[indication_column].to_numpy(dtype="float64")
+    first, last = _get_pair_boundaries(df[pair_id_column].to_numpy())
+
+    # Same as pandas pct_change() with its default forward fill
+    padded_price = _forward_fill_within_pairs(price, first)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_change = padded_price / _shift_within_pairs(padded_price, 1, first, last) - 1
+    change_after = _shift_within_pairs(pct_change, -1, first, last)
+
+    # high anomaly = price shoots up
+    # low  anomaly = price shoots down
+    high_anomaly = (pct_change > high_diff) & (change_after < low_diff)
+    low_anomaly = (pct_change < low_diff) & (change_after > high_diff)
+    anomaly = low_anomaly | high_anomaly
+
+    count = anomaly.sum()
+    if count == 0:
+        # Avoid extra work
+        return df
+
+    logger.info("Detected %d anomalies in %d pairs", count, len(np.unique(df[pair_id_column].to_numpy()[anomaly])))
+
+    # Heal anomalies by using avg price and previous volume
+    surrounding_avg = (_shift_within_pairs(price, 1, first, last) + _shift_within_pairs(price, -1, first, last)) / 2
+
+    df = df.copy()
+    for column in ("open", "close", "high", "low"):
+        df[column] = np.where(anomaly, surrounding_avg, df[column].to_numpy())
+
+    if "volume" in df.columns:
+        volume = df["volume"].to_numpy(dtype="float64")
+        df["volume"] = np.where(anomaly, _shift_within_pairs(volume, 1, first, last), volume)
+
+    healed = np.full(len(df), np.nan, dtype=object)
+    healed[anomaly] = True
+    df["healed"] = healed
+    return df
+
+
 def examine_anomalies(
     pair_universe: PandasPairUniverse | None,
     price_df: pd.DataFrame,